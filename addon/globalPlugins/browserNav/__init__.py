@@ -10,6 +10,7 @@
 # https://github.com/mltony/nvda-indent-nav/
 
 import addonHandler
+from array import array
 import api
 import browseMode
 from contextlib import ExitStack
@@ -44,6 +45,7 @@ import textInfos
 import threading
 import time
 import tones
+import treeInterceptorHandler
 import types
 import ui
 from . import utils
@@ -58,8 +60,15 @@ from wx.stc import StyledTextCtrl
 from . addonConfig import *
 from . beeper import *
 from . import quickJump
+from . import benchmark
+from . import reports
 from . import clipboard
+from . import documentIndex
+from .documentState import registry
 from .editor import EditTextDialog
+from .tracing import tracer
+from .watchdog import watchdog
+from .sampler import profiler
 import gc
 import garbageHandler
 from comtypes import COMError
@@ -71,13 +80,6 @@ import globalVars
 from gui import nvdaControls
 import extensionPoints
 
-debug = False
-if debug:
-    f = open("C:\\Users\\tmal\\drp\\1.txt", "w", encoding='utf-8')
-def mylog(s):
-    if debug:
-        print(str(s), file=f)
-        f.flush()
 
 
 def myAssert(condition):
@@ -129,6 +131,14 @@ def initConfiguration():
         "skipRegex" : "string( default='(^Hide or report this$)')",
         "tableNavigateToCell" : "boolean( default=True)",
         "verticalAlignmentMargin" : "integer( default=2, min=0, max=10000)",
+        "scrollToAllStride" : "integer( default=10, min=1, max=1000)",
+        "scriptTimeBudgetMs" : "integer( default=2000, min=0, max=60000)",
+        "abortSlowScripts" : "boolean( default=False)",
+        "liveRegionMinIntervalMs" : "integer( default=1000, min=0, max=60000)",
+        "liveRegionDedupWindowMs" : "integer( default=5000, min=0, max=600000)",
+        "documentCacheBudgetMb" : "integer( default=100, min=1, max=4096)",
+        "tracingEnabled" : "boolean( default=False)",
+        "slowCommandThresholdMs" : "integer( default=1000, min=0, max=60000)",
     }
     config.conf.spec["browsernav"] = confspec
 
@@ -140,6 +150,8 @@ browseModeGestures = {
 
 addonHandler.initTranslation()
 initConfiguration()
+tracer.enabled = getConfig("tracingEnabled")
+watchdog.setThreshold(getConfig("slowCommandThresholdMs") / 1000)
 
 class SettingsDialog(SettingsPanel):
     # Translators: Title for the settings dialog
@@ -233,6 +245,66 @@ class SettingsDialog(SettingsPanel):
             max=10000,
             initial=getConfig("verticalAlignmentMargin"),
         )
+      # Scroll to all stride edit box
+        label = _("Scroll to all: scroll into view every N-th paragraph")
+        self.scrollToAllStrideSpinControl = sHelper.addLabeledControl(
+            label,
+            nvdaControls.SelectOnFocusSpinCtrl,
+            min=1,
+            max=1000,
+            initial=getConfig("scrollToAllStride"),
+        )
+      # Script time budget edit box
+        label = _("Time budget for bookmark scripts in milliseconds (0 to disable)")
+        self.scriptTimeBudgetSpinControl = sHelper.addLabeledControl(
+            label,
+            nvdaControls.SelectOnFocusSpinCtrl,
+            min=0,
+            max=60000,
+            initial=getConfig("scriptTimeBudgetMs"),
+        )
+        label = _("Abort bookmark scripts exceeding time budget; otherwise only log a warning")
+        self.abortSlowScriptsCheckBox = sHelper.addItem(wx.CheckBox(self, label=label))
+        self.abortSlowScriptsCheckBox.Value = getConfig("abortSlowScripts")
+      # Live region throttling edit boxes
+        label = _("Throttled live regions: minimum interval between announcements in milliseconds")
+        self.liveRegionMinIntervalSpinControl = sHelper.addLabeledControl(
+            label,
+            nvdaControls.SelectOnFocusSpinCtrl,
+            min=0,
+            max=60000,
+            initial=getConfig("liveRegionMinIntervalMs"),
+        )
+        label = _("Throttled live regions: drop repeated text within this many milliseconds")
+        self.liveRegionDedupWindowSpinControl = sHelper.addLabeledControl(
+            label,
+            nvdaControls.SelectOnFocusSpinCtrl,
+            min=0,
+            max=600000,
+            initial=getConfig("liveRegionDedupWindowMs"),
+        )
+      # Document cache budget edit box
+        label = _("Memory budget for page caches of all open documents in megabytes")
+        self.documentCacheBudgetSpinControl = sHelper.addLabeledControl(
+            label,
+            nvdaControls.SelectOnFocusSpinCtrl,
+            min=1,
+            max=4096,
+            initial=getConfig("documentCacheBudgetMb"),
+        )
+      # Tracing checkbox
+        label = _("Trace timing of BrowserNav commands for performance report")
+        self.tracingEnabledCheckBox = sHelper.addItem(wx.CheckBox(self, label=label))
+        self.tracingEnabledCheckBox.Value = getConfig("tracingEnabled")
+      # Slow command threshold edit box
+        label = _("Log stack of BrowserNav commands running longer than this many milliseconds (0 to disable)")
+        self.slowCommandThresholdSpinControl = sHelper.addLabeledControl(
+            label,
+            nvdaControls.SelectOnFocusSpinCtrl,
+            min=0,
+            max=60000,
+            initial=getConfig("slowCommandThresholdMs"),
+        )
 
     def onSave(self):
         config.conf["browsernav"]["crackleVolume"] = self.crackleVolumeSlider.Value
@@ -246,6 +318,17 @@ class SettingsDialog(SettingsPanel):
         config.conf["browsernav"]["tableNavigateToCell"] = self.tableNavigateToCellCheckBox.Value
         config.conf["browsernav"]["skipChimeVolume"] = self.skipChimeVolumeSlider.Value
         config.conf["browsernav"]["verticalAlignmentMargin"] = self.verticalMarginSpinControl.GetValue()
+        config.conf["browsernav"]["scrollToAllStride"] = self.scrollToAllStrideSpinControl.GetValue()
+        config.conf["browsernav"]["scriptTimeBudgetMs"] = self.scriptTimeBudgetSpinControl.GetValue()
+        config.conf["browsernav"]["abortSlowScripts"] = self.abortSlowScriptsCheckBox.Value
+        config.conf["browsernav"]["liveRegionMinIntervalMs"] = self.liveRegionMinIntervalSpinControl.GetValue()
+        config.conf["browsernav"]["liveRegionDedupWindowMs"] = self.liveRegionDedupWindowSpinControl.GetValue()
+        config.conf["browsernav"]["documentCacheBudgetMb"] = self.documentCacheBudgetSpinControl.GetValue()
+        config.conf["browsernav"]["tracingEnabled"] = self.tracingEnabledCheckBox.Value
+        config.conf["browsernav"]["slowCommandThresholdMs"] = self.slowCommandThresholdSpinControl.GetValue()
+        quickJump.resetLiveRegionThrottlers()
+        tracer.enabled = getConfig("tracingEnabled")
+        watchdog.setThreshold(getConfig("slowCommandThresholdMs") / 1000)
 
 
 def getMode():
@@ -382,6 +465,112 @@ def unblockAllKeys():
     blockKeysUntil = 0
     beeper.stop()
 
+def makeVkInput(vkCodes):
+    result = []
+    if not isinstance(vkCodes, list):
+        vkCodes = [vkCodes]
+    for vk in vkCodes:
+        input = winUser.Input(type=winUser.INPUT_KEYBOARD)
+        input.ii.ki.wVk = vk
+        result.append(input)
+    for vk in reversed(vkCodes):
+        input = winUser.Input(type=winUser.INPUT_KEYBOARD)
+        input.ii.ki.wVk = vk
+        input.ii.ki.dwFlags = winUser.KEYEVENTF_KEYUP
+        result.append(input)
+    return result
+
+def makeUnicodeInput(s):
+    result = []
+    for c in s:
+        for flags in [winUser.KEYEVENTF_UNICODE, winUser.KEYEVENTF_UNICODE | winUser.KEYEVENTF_KEYUP]:
+            input = winUser.Input(type=winUser.INPUT_KEYBOARD)
+            input.ii.ki.wScan = ord(c)
+            input.ii.ki.dwFlags = flags
+            result.append(input)
+    return result
+
+# Inputs are injected in batches of that many key presses, yielding to the browser in between,
+# since browsers need a while to process every key press.
+goToPositionBatchSize = 100
+
+def goToPositionByArrows(lines, lineNum, columnNum):
+    """
+        Moves caret from the beginning of edit box to given position using arrow keys.
+        Target line is approached from the nearer end of the text,
+        and target column is approached from the nearer end of the line.
+    """
+    inputs = []
+    lastLine = len(lines) - 1
+    lineLength = len(lines[lineNum])
+    if lineNum <= lastLine - lineNum:
+        lineKeys = lineNum
+        # Caret is at column 0 after Control+Home
+        fromEnd = columnNum > lineLength - columnNum
+    else:
+        lineKeys = lastLine - lineNum
+        # Column is unknown after moving up, and Home key jumps to first non-blank character in many code editors,
+        # so always approach from the end of the line.
+        fromEnd = True
+    columnKeys = lineLength - columnNum if fromEnd else columnNum
+    if lineNum <= lastLine - lineNum:
+        inputs.extend(makeVkInput(winUser.VK_DOWN) * lineKeys)
+    else:
+        inputs.extend(makeVkInput([winUser.VK_CONTROL, winUser.VK_END]))
+        inputs.extend(makeVkInput(winUser.VK_UP) * lineKeys)
+    if fromEnd:
+        inputs.extend(makeVkInput(winUser.VK_END))
+        inputs.extend(makeVkInput(winUser.VK_LEFT) * columnKeys)
+    else:
+        inputs.extend(makeVkInput(winUser.VK_RIGHT) * columnKeys)
+    return inputs
+
+def goToPositionMonaco(lines, lineNum, columnNum):
+    # Monaco editor has Go to line command on Control+G that also accepts column.
+    # Only worth it for large texts, since Go to line popup takes a while to appear.
+    if lineNum < 100:
+        return None
+    inputs = []
+    inputs.extend(makeVkInput([winUser.VK_CONTROL, ord('G')]))
+    inputs.extend(makeUnicodeInput(f"{lineNum + 1}:{columnNum + 1}"))
+    inputs.extend(makeVkInput(winUser.VK_RETURN))
+    return inputs
+
+# List of (URL regexp, strategy).
+# Strategy takes lines of text, target line and column, and returns list of inputs that move caret from the beginning of edit box to that position,
+# or None to fall back to arrow keys.
+# Colab cells are Monaco editors too. Jupyter cells are CodeMirror editors, which have no go to line command bound by default,
+# so they rely on arrow keys.
+goToPositionStrategies = [
+    (r"^https://(vscode|github)\.dev/", goToPositionMonaco),
+    (r"^https://colab\.research\.google\.com/", goToPositionMonaco),
+]
+
+def goToPosition(url, lines, lineNum, columnNum):
+    """
+        Generator that moves caret from the beginning of edit box to given line and column.
+        Long movements are sent in batches, so that positions far from both ends of the text are still reached
+        without blocking NVDA.
+    """
+    lineNum = max(0, min(lineNum, len(lines) - 1))
+    columnNum = max(0, min(columnNum, len(lines[lineNum])))
+    inputs = None
+    for urlRegexp, strategy in goToPositionStrategies:
+        if re.search(urlRegexp, url or "") is not None:
+            inputs = strategy(lines, lineNum, columnNum)
+            break
+    if inputs is None:
+        inputs = goToPositionByArrows(lines, lineNum, columnNum)
+    if tracer.enabled:
+        tracer.event(f"Sending {len(inputs)} inputs to go to line={lineNum}, col={columnNum}")
+    # Every key press is two inputs; key combinations only ever come first, so they are never split across batches
+    batchSize = 2 * goToPositionBatchSize
+    for i in range(0, len(inputs), batchSize):
+        if i > 0:
+            yield 1
+        with keyboardHandler.ignoreInjection():
+            winUser.SendInput(inputs[i:i + batchSize])
+
 def getSimpleHorizontalOffset(textInfo):
     try:
         obj = textInfo.NVDAObjectAtStart
@@ -501,7 +690,7 @@ def sonifyTextInfoImpl(textInfo, lastTextInfo, includeCrackle):
                 paragraphs = len(list(span.getTextInChunks(textInfos.UNIT_PARAGRAPH)))
         else:
             # new simplified way:
-            paragraphs = (t2._endOffset - t1._startOffset) // 20
+            paragraphs = documentIndex.estimateParagraphDistance(textInfo.obj, t1._startOffset, t2._endOffset)
         paragraphs = max(0, paragraphs - 2)
         initialDelay = 0 if beepVolume==0 else 50
         beeper.simpleCrackle(paragraphs, volume=getConfig("crackleVolume"), initialDelay=initialDelay)
@@ -562,16 +751,6 @@ def preTableScriptHelper(self, *args, **kwargs):
     sonifyTextInfo(self.selection)
     return result
 
-selectionHistory = {}
-selectionHistoryLock = threading.Lock()
-def purgeSelectionHistory():
-    # Purge expired entries
-    global selectionHistory
-    selectionHistory = {
-        k:v
-        for k,v in selectionHistory.items()
-        if k() is not None
-    }
 def pre_set_selection(self, info):
     try:
         sh = self.selectionHistory
@@ -582,36 +761,106 @@ def pre_set_selection(self, info):
     return original_set_selection(self, info)
 
 class SelectionHistory:
+    """
+        Bounded ring buffer of paragraph start offsets visited in a browse mode document.
+        Along with offsets we store virtual buffer node identifiers, so that entries recorded before buffer update
+        can be remapped to new offsets lazily when we go back to them.
+    """
+    capacity = 1000
+
     def __init__(self):
-        self.entries = []
+        n = self.capacity
+        self.starts = array('l', [0]) * n
+        self.ends = array('l', [0]) * n
+        self.docHandles = array('q', [0]) * n
+        self.ids = array('q', [0]) * n
+        self.generations = array('l', [0]) * n
+        self.head = 0
+        self.count = 0
         self.ptr = -1
 
+    def physical(self, i):
+        return (self.head + i) % self.capacity
+
     def append(self, info):
         if not isinstance(info, Gecko_ia2_TextInfo):
             return
-        try:
-            del self.entries[self.ptr + 1:]
-        except IndexError:
-            pass
+        if 0 <= self.ptr < self.count:
+            # Drop entries after current position like in browser history
+            self.count = self.ptr + 1
         info = info.copy()
         info.expand(textInfos.UNIT_PARAGRAPH)
-        self.entries.append(info._startOffset)
-        self.ptr = len(self.entries)
+        start, end = info._startOffset, info._endOffset
+        generation = documentIndex.getGeneration(info.obj)
+        if self.count > 0:
+            last = self.physical(self.count - 1)
+            if (
+                self.generations[last] == generation
+                and self.starts[last] < end
+                and start < self.ends[last]
+            ):
+                # Overlaps with the last entry - just merge them
+                self.starts[last] = start
+                self.ends[last] = end
+                self.ptr = self.count
+                return
+        try:
+            docHandle, ID = info._getFieldIdentifierFromOffset(start)
+        except Exception:
+            docHandle, ID = 0, 0
+        if self.count == self.capacity:
+            self.head = self.physical(1)
+            self.count -= 1
+        i = self.physical(self.count)
+        self.starts[i] = start
+        self.ends[i] = end
+        self.docHandles[i] = docHandle
+        self.ids[i] = ID
+        self.generations[i] = generation
+        self.count += 1
+        self.ptr = self.count
+
+    def getOffset(self, buf, i):
+        generation = documentIndex.getGeneration(buf)
+        if self.generations[i] != generation:
+            if self.docHandles[i] == 0 and self.ids[i] == 0:
+                return None
+            try:
+                start, end = buf._getOffsetsFromFieldIdentifier(self.docHandles[i], self.ids[i])
+            except LookupError:
+                return None
+            self.starts[i] = start
+            self.ends[i] = end
+            self.generations[i] = generation
+        return self.starts[i]
 
     def goBack(self, info):
+        buf = info.obj
         currentInfo = info.copy()
         currentInfo.expand(textInfos.UNIT_PARAGRAPH)
-        historicalInfo = currentInfo.copy()
         while self.ptr > 0:
             self.ptr -= 1
-            offset = self.entries[self.ptr]
-            historicalInfo._startOffset = historicalInfo._endOffset = offset
+            offset = self.getOffset(buf, self.physical(self.ptr))
+            if offset is None:
+                continue
+            historicalInfo = documentIndex.makeTextInfoAtOffset(buf, offset)
             historicalInfo.expand(textInfos.UNIT_PARAGRAPH)
             if not currentInfo.isOverlapping(historicalInfo):
                 return historicalInfo
         raise IndexError()
 
 
+def tracedScript(script, funcName):
+    def wrapper(selfself, gesture):
+        if not watchdog.enabled and not tracer.enabled:
+            # Don't look up site on every keypress when nobody needs it
+            with profiler.active():
+                return script(selfself, gesture)
+        site = quickJump.getSiteForTracing(quickJump.getUrl(selfself, onlyFromCache=True))
+        with watchdog.command(funcName, site), tracer.command(funcName, site), profiler.active():
+            return script(selfself, gesture)
+    return wrapper
+
 def browserNavPopup(selfself,gesture):
     self = selfself
     gui.mainFrame.prePopup()
@@ -620,6 +869,40 @@ def browserNavPopup(selfself,gesture):
         menu = wx.Menu()
         menu.AppendMenu(wx.ID_ANY, _("&Bookmark"), quickJump.makeBookmarkSubmenu(self, frame))
         menu.AppendMenu(wx.ID_ANY, _("&Website"), quickJump.makeWebsiteSubmenu(self, frame))
+        item = menu.Append(wx.ID_ANY, _("Run performance &benchmark on this page"))
+        frame.Bind(
+            wx.EVT_MENU,
+            lambda evt: benchmark.runPageBenchmark(self),
+            item,
+        )
+        item = menu.Append(wx.ID_ANY, _("Show &memory use of page caches"))
+        frame.Bind(
+            wx.EVT_MENU,
+            lambda evt: reports.runMemoryReport(),
+            item,
+        )
+        item = menu.Append(wx.ID_ANY, _("Show performance &trace of recent commands"))
+        frame.Bind(
+            wx.EVT_MENU,
+            lambda evt: reports.runTraceReport(),
+            item,
+        )
+        item = menu.Append(wx.ID_ANY, _("Show &latency of BrowserNav commands"))
+        frame.Bind(
+            wx.EVT_MENU,
+            lambda evt: reports.runLatencyReport(),
+            item,
+        )
+        if profiler.running:
+            label = _("Stop sampling &profiler and save results")
+        else:
+            label = _("Start sampling &profiler of BrowserNav commands")
+        item = menu.Append(wx.ID_ANY, label)
+        frame.Bind(
+            wx.EVT_MENU,
+            lambda evt: reports.toggleSamplingProfiler(),
+            item,
+        )
         frame.Bind(
             wx.EVT_MENU_CLOSE,
             lambda evt: frame.Close()
@@ -673,9 +956,10 @@ api.postFocusOrURLChange = extensionPoints.Action()
 updateURLLock = threading.Lock()
 def updateURLIfChanged():
     newURL = getFocusedURL()
-    if globalVars.currentURL != newURL:
-        api.postFocusOrURLChange.notify()
+    oldURL = globalVars.currentURL
     globalVars.currentURL = newURL
+    if oldURL != newURL:
+        api.postFocusOrURLChange.notify()
 URL_WATCH_DELAYS_MS = [300, 700, 2000, 7000]
 def watchURLAsync(localUpdateUrlCounter, delays=None):
     delays = delays or URL_WATCH_DELAYS_MS
@@ -705,10 +989,16 @@ def bnSetFocusObject(obj):
 
 def bnVirtualBufferHandleUpdate(self):
     result = originalVirtualBufferHandleUpdate(self)
+    documentIndex.onVirtualBufferUpdate(self)
     watchURL()
     quickJump.onVirtualBufferUpdate(self)
     return result
 
+originalKillTreeInterceptor = None
+def bnKillTreeInterceptor(treeInterceptorObject):
+    registry.terminate(treeInterceptorObject)
+    return originalKillTreeInterceptor(treeInterceptorObject)
+
 originalSpeakTextInfo = None
 def bnSpeakTextInfo(info, *args, **kwargs):
     return  originalSpeakTextInfo(quickJump.adjustTextInfoForSpeech(info), *args, **kwargs)
@@ -748,6 +1038,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         quickJump.originalReportLiveRegion = NVDAHelper.nvdaControllerInternal_reportLiveRegion
         NVDAHelper.nvdaControllerInternal_reportLiveRegion = quickJump.newReportLiveRegion
         NVDAHelper._setDllFuncPointer(NVDAHelper.localLib.dll,"_nvdaControllerInternal_reportLiveRegion", quickJump.newReportLiveRegion)
+        api.postFocusOrURLChange.register(quickJump.updateLiveRegionPolicy)
         while len(gc.callbacks) > 0:
             del gc.callbacks[0]
         garbageHandler.terminate = lambda: None
@@ -759,12 +1050,17 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         global originalSpeakTextInfo
         originalSpeakTextInfo = speech.speakTextInfo
         speech.speakTextInfo = bnSpeakTextInfo
+        global originalKillTreeInterceptor
+        originalKillTreeInterceptor = treeInterceptorHandler.killTreeInterceptor
+        treeInterceptorHandler.killTreeInterceptor = bnKillTreeInterceptor
 
     def createMenu(self):
         gui.settingsDialogs.NVDASettingsDialog.categoryClasses.append(SettingsDialog)
         gui.settingsDialogs.NVDASettingsDialog.categoryClasses.append(quickJump.SettingsDialog)
 
     def terminate(self):
+        watchdog.terminate()
+        profiler.stop()
         gui.settingsDialogs.NVDASettingsDialog.categoryClasses.remove(SettingsDialog)
         gui.settingsDialogs.NVDASettingsDialog.categoryClasses.remove(quickJump.SettingsDialog)
         cursorManager.CursorManager._caretMovementScriptHelper = originalCaretMovementScriptHelper
@@ -778,10 +1074,12 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         browseMode.BrowseModeDocumentTreeInterceptor.event_treeInterceptor_gainFocus = quickJump.original_event_treeInterceptor_gainFocus
         NVDAHelper.nvdaControllerInternal_reportLiveRegion = quickJump.originalReportLiveRegion
         NVDAHelper._setDllFuncPointer(NVDAHelper.localLib.dll,"_nvdaControllerInternal_reportLiveRegion", quickJump.originalReportLiveRegion)
+        api.postFocusOrURLChange.unregister(quickJump.updateLiveRegionPolicy)
         
         api.setFocusObject = originalSetFocusObject
         virtualBuffers.VirtualBuffer._handleUpdate = originalVirtualBufferHandleUpdate
         speech.speakTextInfo = originalSpeakTextInfo
+        treeInterceptorHandler.killTreeInterceptor = originalKillTreeInterceptor
         
 
     def maybeAdjustOperator(self, op):
@@ -908,12 +1206,10 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
         textInfo = selfself.selection.copy()
         textInfo.collapse()
-        mylog(f"start: {textInfo.text}")
         textInfo.expand(textInfos.UNIT_PARAGRAPH)
         origFormatting = extractFormattingFunc(textInfo)
         origIndent = extractIndentFunc(textInfo, origFormatting)
         origStyle = extractStyleFunc(textInfo, origFormatting)
-        mylog(f"origIndent={str(origIndent)}")
         distance = 0
         while True:
             result =textInfo.move(textInfos.UNIT_PARAGRAPH, increment)
@@ -926,10 +1222,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             formatting = extractFormattingFunc(textInfo)
             indent = extractIndentFunc(textInfo, formatting)
             style = extractStyleFunc(textInfo, formatting)
-            mylog(f'@{distance} text: {textInfo.text}')
-            mylog(f'indent={str(indent)}')
             if style == origStyle:
-                mylog("Styles math!")
                 if op(indent, origIndent):
                     self.beeper.simpleCrackle(distance, volume=getConfig("crackleVolume"))
                     speech.speakTextInfo(textInfo, reason=REASON_CARET)
@@ -943,6 +1236,16 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         focus = api.getFocusObject().treeInterceptor
         textInfo = focus.makeTextInfo(textInfos.POSITION_CARET)
         textInfo.expand(textInfos.UNIT_PARAGRAPH)
+        index = documentIndex.getDocumentIndex(focus)
+        if index is not None:
+            def testParagraph(paragraph):
+                if newMethod:
+                    return True
+                obj = paragraph.NVDAObjectAtStart
+                return obj is not None and obj.role in roles
+            def findNext(offset):
+                return index.findRole(roles, offset, direction, innermostOnly=not newMethod)
+            return self.findByIndex(focus, textInfo, direction, findNext, testParagraph, errorMessage)
         distance = 0
         while True:
             distance += 1
@@ -965,34 +1268,104 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                 focus._set_selection(textInfo)
                 return
 
+    def findByIndex(self, focus, textInfo, direction, findNext, testParagraph, errorMessage):
+        # Jumps straight to candidate offsets found in document index instead of walking paragraph by paragraph.
+        # Candidates are verified against the actual paragraph since the index is computed on text chunks, not paragraphs.
+        originalOffset = textInfo._startOffset
+        while True:
+            offset = findNext(textInfo._endOffset if direction > 0 else textInfo._startOffset)
+            if offset is None:
+                endOfDocument(errorMessage)
+                return
+            textInfo = documentIndex.makeTextInfoAtOffset(focus, offset)
+            textInfo.expand(textInfos.UNIT_PARAGRAPH)
+            if testParagraph(textInfo):
+                break
+        distance = documentIndex.estimateParagraphDistance(focus, originalOffset, textInfo._startOffset)
+        textInfo.updateCaret()
+        self.beeper.simpleCrackle(distance, volume=getConfig("crackleVolume"))
+        speech.speakTextInfo(textInfo, reason=REASON_CARET)
+        textInfo.collapse()
+        focus._set_selection(textInfo)
+
+    scrollToAllCounter = 0
+    scrollToAllInProgress = False
     def scrollToAll(self, direction, message):
+        self.scrollToAllCounter += 1
+        if self.scrollToAllInProgress:
+            # Pressing the same gesture again cancels scrolling in progress
+            self.scrollToAllInProgress = False
+            ui.message(_("Scrolling cancelled."))
+            return
         ui.message(message)
         focus = api.getFocusObject().treeInterceptor
-        textInfo = focus.makeTextInfo(textInfos.POSITION_CARET)
-        textInfo.expand(textInfos.UNIT_PARAGRAPH)
-        textInfo.collapse()
-        distance = 0
-        while True:
-            distance += 1
-            #textInfo.collapse()
-            result = textInfo.move(textInfos.UNIT_PARAGRAPH, direction)
-            if result == 0:
-                ui.message(_("Done."))
-                return
-            #textInfo.expand(textInfos.UNIT_PARAGRAPH)
-            textInfo.NVDAObjectAtStart.scrollIntoView()
+        self.scrollToAllInProgress = True
+        utils.executeAsynchronously(self.scrollToAllAsync(focus, direction, self.scrollToAllCounter))
+
+    scrollToAllSliceSeconds = 0.05
+    scrollToAllWaitMs = 500
+    scrollToAllMaxIdleSteps = 3
+    scrollToAllProgressSeconds = 5
+    def scrollToAllAsync(self, focus, direction, counter):
+        """
+            Scrolls into view every N-th paragraph in time-sliced chunks, so that NVDA stays responsive.
+            Once the end of document is reached, keeps scrolling to the last paragraph while the buffer keeps growing,
+            which loads more elements in infinite-scroll feeds.
+        """
+        try:
+            stride = getConfig("scrollToAllStride")
+            textInfo = focus.makeTextInfo(textInfos.POSITION_CARET)
+            textInfo.expand(textInfos.UNIT_PARAGRAPH)
+            textInfo.collapse()
+            scrolled = 0
+            idleSteps = 0
+            nextProgressTime = time.time() + self.scrollToAllProgressSeconds
+            while True:
+                deadline = time.time() + self.scrollToAllSliceSeconds
+                atEnd = False
+                while time.time() < deadline:
+                    result = textInfo.move(textInfos.UNIT_PARAGRAPH, direction * stride)
+                    if result != 0:
+                        obj = textInfo.NVDAObjectAtStart
+                        if obj is not None:
+                            obj.scrollIntoView()
+                            scrolled += 1
+                    if abs(result) < stride:
+                        atEnd = True
+                        break
+                if time.time() > nextProgressTime:
+                    ui.message(_("Scrolled {count} elements").format(count=scrolled))
+                    nextProgressTime = time.time() + self.scrollToAllProgressSeconds
+                if not atEnd:
+                    yield 1
+                else:
+                    generation = documentIndex.getGeneration(focus)
+                    yield self.scrollToAllWaitMs
+                    if documentIndex.getGeneration(focus) == generation:
+                        idleSteps += 1
+                        if idleSteps >= self.scrollToAllMaxIdleSteps:
+                            ui.message(_("Done."))
+                            return
+                    else:
+                        idleSteps = 0
+                if (
+                    counter != self.scrollToAllCounter
+                    or api.getFocusObject().treeInterceptor != focus
+                ):
+                    return
+        finally:
+            if counter == self.scrollToAllCounter:
+                self.scrollToAllInProgress = False
 
     #blacklistKeys = {"_startOfNode", "_endOfNode"}
-    whitelistKeys = "color,font-family,font-size,bold,italic,strikethrough,underline".split(",")
+    whitelistKeys = documentIndex.formatKeys
     def compareFormatFields(self, f1, f2):
         if False:
           for key in set(f1.keys()).union(set(f2.keys())).difference(self.blacklistKeys):
             try:
                 if f1[key] != f2[key]:
-                    mylog(f"Inequality during comparison; key={key} f1={f1[key]} f2={f2[key]}")
                     return False
             except KeyError:
-                mylog(f"KeyError during comparison; key={key} f1={key in f1} f2={key in f2}")
                 return False
         for key in self.whitelistKeys:
             if key not in f1 and key not in f2:
@@ -1001,15 +1374,26 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                 if f1[key] != f2[key]:
                     return False
             except KeyError:
-                mylog(f"KeyError during comparison; key={key} f1={key in f1} f2={key in f2}")
                 return False
 
         return True
 
     def findFormatChange(self, selfself, direction, errorMessage):
-        mylog(f"findFormatChange direction={direction}")
         caretInfo = selfself.makeTextInfo(textInfos.POSITION_CARET)
         caretInfo.collapse()
+        index = documentIndex.getDocumentIndex(selfself)
+        if index is not None:
+            originalKey = index.getFormatKeyAt(caretInfo._startOffset)
+            if originalKey is not None:
+                run = index.findFormatChange(caretInfo._startOffset, direction, originalKey)
+                if run is None:
+                    endOfDocument(_("No next format change!"))
+                    return
+                caretInfo = documentIndex.makeTextInfoAtOffset(selfself, run[0], run[1])
+                caretInfo.updateCaret()
+                selfself.selection = caretInfo
+                speech.speakTextInfo(caretInfo, reason=REASON_CARET)
+                return
         paragraphInfo = caretInfo.copy()
         paragraphInfo.expand(textInfos.UNIT_PARAGRAPH)
         textInfo = paragraphInfo.copy()
@@ -1029,7 +1413,6 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         if len(fields) == 0:
             raise Exception("No formatting information available at the cursor!")
         originalFormat = fields[0]
-        mylog(f"originalFormat={originalFormat}")
         while True:
             fields = textInfo.getTextWithFields(formatConfig)
             fields = [field
@@ -1051,58 +1434,37 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                 if direction < 0:
                     # First we swap the order of each format-string pair
                     # Second we invert the whole list
-                    mylog("Inverting for backward search")
-                    mylog(f"fields={fields}")
                     newFields = []
                     for (p1, p2) in pairUp([
                         (k, list(g))
                         for (k, g) in itertools.groupby(fields, key=type)
                     ]):
-                        mylog(f"p2={p2}")
                         (k1, g1) = p1
                         g1 = list(g1)
-                        mylog(f"p1={p1}")
-                        mylog(f"g1={g1}")
                         if   k1 != textInfos.FieldCommand:
                             raise Exception("Corrupted order of format fields!")
                         if p2 is not None:
-                            mylog("p2 is not None")
                             (k2, g2) = p2
                             if k2 != str:
                                 raise Exception("Corrupted order of format fields!")
                             newFields.extend(list(g2)[::-1])
-                            mylog("After extending g2")
-                            mylog(str(newFields))
                         newFields.extend(list(g1)[::-1])
-                        mylog("After extending g1")
-                        mylog(str(newFields))
 
-                    mylog("Before inversion")
-                    mylog("\n".join(map(str, fields)))
                     fields = newFields[::-1]
-                    mylog("After inversion")
-                    mylog("\n".join(map(str, fields)))
-                    mylog("###")
 
                 adjustment = 0
                 beginAdjustment = endAdjustment = None
                 for field in fields:
                     if isinstance(field, textInfos.FieldCommand):
-                        mylog(f"Field: {field}")
                         #if field != originalFormat:
                         if not self.compareFormatFields(field.field, originalFormat.field):
                             #Bingo! But we still need to keep going to find the end of that piece with different formatting
                             beginAdjustment = adjustment
-                            mylog(f"beginAdjustment={beginAdjustment}")
                     elif isinstance(field, str):
-                        mylog(f"'{field}'")
-                        oldAdjustment = adjustment
                         adjustment += len(field)
-                        mylog(f"old={oldAdjustment} adjustment={adjustment}")
                         if beginAdjustment is not None:
                             # Now really bingo!
                             endAdjustment = adjustment
-                            mylog(f"endAdjustment={endAdjustment}")
                             break
                     else:
                         raise Exception("Impossible!")
@@ -1118,7 +1480,6 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                     return
             if True:
                 # Now move to the next paragraph
-                mylog("nextParagraph!")
                 if direction < 0:
                     # If moving back, then position caret at the beginning of the following paragraph, since we'll be computing adjustment from the end
                     caretInfo = paragraphInfo.copy()
@@ -1128,7 +1489,6 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                     return
                 textInfo = paragraphInfo.copy()
                 textInfo.expand(textInfos.UNIT_PARAGRAPH)
-                mylog(f"paragraph: {textInfo.text}")
                 if direction > 0:
                     caretInfo = paragraphInfo.copy()
 
@@ -1150,6 +1510,14 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         textInfo = focus.makeTextInfo(textInfos.POSITION_CARET)
         textInfo.expand(textInfos.UNIT_PARAGRAPH)
         originalId = getUniqueId(textInfo)
+        index = documentIndex.getDocumentIndex(focus)
+        if index is not None:
+            def testParagraph(paragraph):
+                newId = getUniqueId(paragraph)
+                return newId is not None and newId != originalId
+            def findNext(offset):
+                return index.findControlChange(role, offset, direction, originalId)
+            return self.findByIndex(focus, textInfo, direction, findNext, testParagraph, errorMessage)
         distance = 0
         while True:
             distance += 1
@@ -1262,34 +1630,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                         raise EditBoxUpdateError(_("Browser state has changed. Different element on the page is now focused."))
                 return focus
 
-        def makeVkInput(vkCodes):
-            result = []
-            if not isinstance(vkCodes, list):
-                vkCodes = [vkCodes]
-            for vk in vkCodes:
-                input = winUser.Input(type=winUser.INPUT_KEYBOARD)
-                input.ii.ki.wVk = vk
-                result.append(input)
-            for vk in reversed(vkCodes):
-                input = winUser.Input(type=winUser.INPUT_KEYBOARD)
-                input.ii.ki.wVk = vk
-                input.ii.ki.dwFlags = winUser.KEYEVENTF_KEYUP
-                result.append(input)
-            return result
-
-        def goToPosition(lineNum, columnNum):
-            # This function is too slow for line numbers > 1000.
-            # This is probably due to slow performance of Python's marshalling complex arguments to native Windows DLL
-            # This is a good candidate to rewrite in a native code and supply in a tiny DLL file
-            mylog(f"Pressing arrows to go to line={lineNum}, col={columnNum}")
-            inputs = []
-            inputs.extend(makeVkInput(winUser.VK_DOWN) * lineNum)
-            inputs.extend(makeVkInput(winUser.VK_RIGHT) * columnNum)
-            with keyboardHandler.ignoreInjection():
-                winUser.SendInput(inputs)
-
         def updateText(result, text, hasChanged, cursorLine, cursorColumn, keystroke):
-            mylog(f"hasChanged={hasChanged}")
             global jupyterUpdateInProgress
             jupyterUpdateInProgress = True
             self.lastJupyterText = text
@@ -1371,7 +1712,8 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                         kbdControlC.send()
                   # Step 3.3: Position cursor to synchronize with edit text window cursor
                     kbdControlHome.send()
-                    goToPosition(cursorLine, cursorColumn)
+                    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+                    yield from goToPosition(url, lines, cursorLine, cursorColumn)
                   # Step 3.4: Wait for clipbord to be updated to make sure we can flush clipboard
                     if False:
                         if  hasChanged and not shortTextMode:
@@ -1404,22 +1746,11 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                         if not hasChanged:
                             return
                         if shortTextMode:
-                            yield 1000
-                            self.endInjectingKeystrokes()
+                            core.callLater(1000, self.endInjectingKeystrokes)
                             return
-                        t0 = time.time()
-                        timeout = t0 + 3
                         newLineRegexp = re.compile(r"[\r\n]+")
-                        while time.time() <= timeout:
-                            yield 20
-                            try:
-                                newText = api.getClipData()
-                            except PermissionError:
-                                continue
-                            if newText == text:
-                                # still same text in clipboard => wait a bit longer
-                                continue
-                            elif (
+                        def onClipboardChanged(newText):
+                            if (
                                 newText == firstChar
                                 or (
                                     newLineRegexp.match(firstChar) is not None
@@ -1427,20 +1758,21 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                                 )
                             ):
                                 # Bingo! First char has appeared in clipboard. Restoring original clipboard state and exiting
-                                result = clipboard.deleteEntryFromClipboardHistory(firstChar, maxEntries=1)
-                                if False and result:
-                                    core.callLater(1000, tones.beep, 100, 1000)
+                                clipboard.deleteEntryFromClipboardHistory(firstChar, maxEntries=1)
                                 self.endInjectingKeystrokes()
-                                return
                             else:
                                 # Something else found in clipboard - likely user has already copied something there. So just exit without restoring state
-                                log.error(f"asdf something else in clipboard!")
-                                log.error(f"text='{text}'")
-                                log.error(f"newText='{newText}'")
-                                log.error(f"firstChar='{firstChar}'")
-                                return
-                        log.error(f"asdf Timeout")
-                    utils.executeAsynchronously(watchAndRestoreClipboard())
+                                log.error(f"Unexpected text in clipboard while waiting for first character of edit box")
+                        def onTimeout():
+                            log.error(f"Timed out while waiting for first character of edit box to appear in clipboard")
+                        # Still same text in clipboard means edit box hasn't processed our keystrokes yet
+                        clipboard.getClipboardSync().waitFor(
+                            lambda newText: newText != text,
+                            onClipboardChanged,
+                            onTimeout,
+                            timeoutMs=3000,
+                        )
+                    watchAndRestoreClipboard()
                     
               # Step 4: send the original keystroke, e.g. Control+Enter
                 if keystroke is not None:
@@ -1519,6 +1851,9 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
     def getSelection(self):
         self.copyToClip(controlCharacter)
+        backend = clipboard.getBackend()
+        # Only open the clipboard after its sequence number has changed, so that we don't compete with the browser writing to it
+        sequenceNumber = backend.getSequenceNumber()
         t0 = time.time()
         timeout = t0+3
         lastControlCTimestamp = 0
@@ -1528,20 +1863,20 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                 kbdControlC.send()
             if time.time() > timeout:
                 raise NoSelectionError("Time out while trying to copy data out of application.")
-
+            newSequenceNumber = backend.getSequenceNumber()
+            if newSequenceNumber == sequenceNumber:
+                wx.Yield()
+                time.sleep(10/1000)
+                continue
             try:
                 data = api.getClipData()
             except PermissionError:
                 wx.Yield()
                 continue
+            sequenceNumber = newSequenceNumber
             if data != controlCharacter:
-                # Sleep for testing - otherwise clipboard history doesn't even notice new item
-                #time.sleep(1)
-                #core.callLater(1000, clipboard.deleteEntryFromClipboardHistory, data)
-                result = clipboard.deleteEntryFromClipboardHistory(data, maxEntries=1)
+                clipboard.deleteEntryFromClipboardHistory(data, maxEntries=1)
                 # self.endInjectingKeystrokes() will be called outside 
-                if False and  result:
-                    core.callLater(1000, tones.beep, 1000, 1000)
                 return data
             wx.Yield()
             time.sleep(10/1000)
@@ -1580,6 +1915,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         if script is None:
             gpFunc = getattr(gp, scriptFuncName)
             script = lambda selfself, gesture: gpFunc(gesture, selfself)
+        script = tracedScript(script, funcName)
         script.__name__ = scriptFuncName
         script.category = "BrowserNav"
         if doc is not None:
@@ -0,0 +1,62 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Diffing of text matched by AutoSpeak bookmarks.
+# Decides what to speak and whether to chime when matched text changes; actual speaking and playing is up to the caller.
+# This module doesn't depend on NVDA, so that it can be tested without it.
+
+import difflib as dl
+from enum import Enum
+
+class AutoSpeakMode(Enum):
+    OFF = 'off'
+    PARAGRAPH_DIFF = 'paragraph_diff'
+    WORD_DIFF = 'word_diff'
+    CHIME_ON_ADD = 'chime_on_add'
+    CHIME_ON_REMOVE = 'chime_on_remove'
+    CHIME_ON_CHANGE = 'chime_on_change'
+
+# Kinds of diff lines that trigger chime in each chime mode
+chimeFilters = {
+    AutoSpeakMode.CHIME_ON_ADD: "+",
+    AutoSpeakMode.CHIME_ON_REMOVE: "-",
+    AutoSpeakMode.CHIME_ON_CHANGE: "+-!",
+}
+
+def diffAndExtractInterestingLines(s1, s2):
+    """
+        Yields lines of context diff between s1 and s2, that are either strings or lists of lines:
+        "+ " and "! " lines are new or changed lines of s2, "- " lines are lines removed from s1.
+    """
+    if isinstance(s1, str):
+        s1 = s1.splitlines()
+    if isinstance(s2, str):
+        s2 = s2.splitlines()
+    mode = '0'
+    for line in dl.context_diff(s1, s2):
+        if line.startswith('***'):
+            mode = 'old'
+        elif line.startswith('---'):
+            mode = 'new'
+        elif mode == 'new' and len(line) > 0 and line[0] in {'!', '+'}:
+            yield line
+        elif mode == 'old' and len(line) > 0 and line[0] in {'-'}:
+            yield line
+
+def computeAutoSpeakUpdate(mode, oldLines, newLines):
+    """
+        Returns (linesToSpeak, chime) for an AutoSpeak bookmark in given mode whose matched text changed from oldLines to newLines.
+    """
+    if mode == AutoSpeakMode.PARAGRAPH_DIFF:
+        return [
+            line[2:]
+            for line in diffAndExtractInterestingLines(oldLines, newLines)
+            if line[0] in "!+"
+        ], False
+    filter = chimeFilters.get(mode, None)
+    if filter is not None:
+        chime = any(line[0] in filter for line in diffAndExtractInterestingLines(oldLines, newLines))
+        return [], chime
+    return [], False
@@ -0,0 +1,128 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Performance benchmarks of BrowserNav hot paths.
+# Benchmarks run inside NVDA against the live browse mode document, so that timings include real buffer round trips.
+# Document scans and AutoSpeak diff can also be benchmarked without NVDA, see tests/benchmarkHeadless.py and tests/benchmarkDiff.py.
+
+import textInfos
+import time
+
+from . import documentIndex
+from . import quickJump
+from .reports import showReport
+from .quickJump import BookmarkCategory
+
+def formatMs(seconds):
+    return f"{seconds * 1000:.2f}"
+
+class LatencyStats:
+    def __init__(self, name):
+        self.name = name
+        self.samples = []
+
+    def add(self, elapsed):
+        self.samples.append(elapsed)
+
+    def timed(self):
+        return Timer(self)
+
+    def percentile(self, p):
+        samples = sorted(self.samples)
+        i = min(len(samples) - 1, int(len(samples) * p / 100))
+        return samples[i]
+
+    def format(self):
+        if len(self.samples) == 0:
+            return f"{self.name}: no samples"
+        return (
+            f"{self.name}: n={len(self.samples)}"
+            f" p50={formatMs(self.percentile(50))}"
+            f" p90={formatMs(self.percentile(90))}"
+            f" p99={formatMs(self.percentile(99))}"
+            f" max={formatMs(max(self.samples))}"
+            f" total={formatMs(sum(self.samples))} ms"
+        )
+
+class Timer:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.stats.add(time.perf_counter() - self.start)
+        return False
+
+benchmarkCategories = [
+    BookmarkCategory.QUICK_JUMP,
+    BookmarkCategory.QUICK_JUMP_2,
+    BookmarkCategory.QUICK_JUMP_3,
+    BookmarkCategory.SKIP_CLUTTER,
+    BookmarkCategory.QUICK_CLICK,
+    BookmarkCategory.QUICK_SPEAK,
+    BookmarkCategory.HIERARCHICAL,
+]
+
+def benchmarkPage(browse, maxParagraphs=2000, repeats=3):
+    """
+        Measures latency of document indexing and of bookmark matching on every paragraph of current page.
+        Script and numeric script bookmarks are never executed, since they might perform actions on the page.
+    """
+    lines = []
+    url = quickJump.getUrl(browse)
+    config = quickJump.globalConfig
+    if documentIndex.isIndexable(browse):
+        for name, factory in [
+            ("DocumentIndex build", documentIndex.DocumentIndex),
+            ("DocumentText build", documentIndex.DocumentText),
+        ]:
+            stats = LatencyStats(name)
+            for _ in range(repeats):
+                with stats.timed():
+                    factory(browse)
+            lines.append(stats.format())
+    for category in benchmarkCategories:
+        bookmarks = quickJump.findApplicableBookmarks(config, url, category)
+        if len(bookmarks) == 0:
+            continue
+        matchStats = LatencyStats(f"{category.name} matchTextAndAttributes ({len(bookmarks)} bookmarks)")
+        scriptStats = LatencyStats(f"{category.name} matchAndScript")
+        moveStats = LatencyStats(f"{category.name} move paragraph")
+        textInfo = browse.makeTextInfo(textInfos.POSITION_ALL)
+        textInfo.collapse()
+        textInfo.expand(textInfos.UNIT_PARAGRAPH)
+        for _ in range(maxParagraphs):
+            with matchStats.timed():
+                list(quickJump.matchTextAndAttributes(bookmarks, textInfo))
+            with scriptStats.timed():
+                quickJump.matchAndScript(bookmarks, [], textInfo)
+            with moveStats.timed():
+                result = quickJump.moveParagraph(textInfo, 1)
+            if result == 0:
+                break
+        lines.extend([matchStats.format(), scriptStats.format(), moveStats.format()])
+        if category == BookmarkCategory.HIERARCHICAL:
+            stats = LatencyStats("scanLevelsSync")
+            try:
+                with stats.timed():
+                    levels = quickJump.scanLevelsSync(browse, config, bookmarks)
+            except Exception as e:
+                lines.append(f"scanLevelsSync failed: {e}")
+                continue
+            lines.append(stats.format())
+            stats = LatencyStats("HierarchicalLevelsInfo")
+            with stats.timed():
+                quickJump.HierarchicalLevelsInfo(levels.offsets)
+            lines.append(stats.format())
+    if len(lines) == 0:
+        lines.append(_("No bookmarks configured for current website."))
+    return lines
+
+def runPageBenchmark(browse):
+    lines = benchmarkPage(browse)
+    showReport(_("BrowserNav benchmark"), lines)
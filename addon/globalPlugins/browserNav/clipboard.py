@@ -4,15 +4,20 @@
 #See the file LICENSE  for more details.
 
 import api
+import core
 import ctypes
 import gui
+from logHandler import log
 import time
 import tones
 import ui
+import windowUtils
 import winUser
 import wx
 import os,sys
 
+from .clipboardSync import ClipboardSync, deleteEntryFromHistory
+
 def initWinRT():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     site_packages = os.path.join(script_dir, "site-packages")
@@ -45,37 +50,148 @@ def ephemeralCopyToClipAndRestore(text: str):
         ephemeralSetClipboard(oldClipboardValue)
         
 TEXT_FORMAT = "Text"
-def deleteEntryFromClipboardHistory(textToDelete, maxEntries=10):
-    #from .pywinsdk.relative import winsdk
-    from winrt.windows.applicationmodel.datatransfer import Clipboard
+WM_CLIPBOARDUPDATE = 0x031D
+SEQUENCE_POLL_MS = 50
+
+def whenCompleted(operation, onCompleted):
+    """
+    Calls onCompleted(results) on the main thread once WinRT async operation completes,
+    or onCompleted(None) if the operation failed or has been cancelled.
+    """
     from winrt.windows.foundation import AsyncStatus
-    
-    def dummyAwait(result):
-        while result.status == AsyncStatus.STARTED:
-            wx.Yield()
-        if result.status == AsyncStatus.COMPLETED:
-            return result
-        raise RuntimeError(f"Bad async status {result.status}")
-
-    history = dummyAwait(Clipboard.get_history_items_async())
-    items = history.get_results()
-    itemTuples = []    
-    result = False
-    for i in range(maxEntries):
+    def handler(op, status):
+        try:
+            results = op.get_results() if status == AsyncStatus.COMPLETED else None
+        except OSError:
+            results = None
+        wx.CallAfter(onCompleted, results)
+    operation.completed = handler
+
+class ClipboardListenerWindow(windowUtils.CustomWindow):
+    className = "BrowserNavClipboardListener"
+
+    def __init__(self, onUpdate):
+        super().__init__("BrowserNav clipboard listener")
+        self.onUpdate = onUpdate
+        if not ctypes.windll.user32.AddClipboardFormatListener(self.handle):
+            super().destroy()
+            raise ctypes.WinError()
+
+    def windowProc(self, hwnd, msg, wParam, lParam):
+        if msg == WM_CLIPBOARDUPDATE:
+            self.onUpdate()
+            return 0
+
+    def destroy(self):
+        ctypes.windll.user32.RemoveClipboardFormatListener(self.handle)
+        super().destroy()
+
+class WindowsClipboardBackend:
+    """
+    Clipboard backend for clipboardSync.ClipboardSync.
+    Clipboard updates are delivered via WM_CLIPBOARDUPDATE.
+    If clipboard listener cannot be registered, we fall back to polling clipboard sequence number,
+    which is still much cheaper than opening the clipboard.
+    """
+    def __init__(self):
+        self.callbacks = []
+        self.window = None
+        self.pollTimer = None
+        self.lastSequenceNumber = None
+
+    def getText(self):
+        return api.getClipData()
+
+    def getSequenceNumber(self):
+        return ctypes.windll.user32.GetClipboardSequenceNumber()
+
+    def callLater(self, ms, func, *args):
+        return core.callLater(ms, func, *args)
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        if len(self.callbacks) > 1:
+            return
+        try:
+            self.window = ClipboardListenerWindow(self.notify)
+        except OSError:
+            log.warning("Failed to register clipboard listener, falling back to polling clipboard sequence number", exc_info=True)
+            self.lastSequenceNumber = self.getSequenceNumber()
+            self.pollTimer = core.callLater(SEQUENCE_POLL_MS, self.poll)
+
+    def unsubscribe(self, callback):
+        self.callbacks.remove(callback)
+        if len(self.callbacks) > 0:
+            return
+        if self.window is not None:
+            self.window.destroy()
+            self.window = None
+        if self.pollTimer is not None:
+            self.pollTimer.Stop()
+            self.pollTimer = None
+
+    def notify(self):
+        for callback in list(self.callbacks):
+            callback()
+
+    def poll(self):
+        if len(self.callbacks) == 0:
+            return
+        sequenceNumber = self.getSequenceNumber()
+        if sequenceNumber != self.lastSequenceNumber:
+            self.lastSequenceNumber = sequenceNumber
+            self.notify()
+        if len(self.callbacks) > 0:
+            self.pollTimer = core.callLater(SEQUENCE_POLL_MS, self.poll)
+
+    def getHistoryItems(self, onDone):
+        from winrt.windows.applicationmodel.datatransfer import Clipboard
+        def onHistory(history):
+            onDone(None if history is None else history.items)
+        whenCompleted(Clipboard.get_history_items_async(), onHistory)
+
+    def getHistoryItemText(self, item, onDone):
         try:
-            item = items.items[i]
+            content = item.content
+            avf = content.available_formats
+            formats = [avf.get_at(j) for j in range(avf.size)]
         except OSError:
-            continue
-        content = item.content
-        avf = content.available_formats
-        avf2 = [avf.get_at(j) for j in range(avf.size)]
-        if TEXT_FORMAT not in avf2:
-            continue
-        itemTuples.append((item,content.get_text_async()))
-    for item, text in itemTuples:
-        text = dummyAwait(text)
-        value = text.get_results()
-        if value == textToDelete:
-            r = Clipboard.delete_item_from_history(item)
-            result = result or r
-    return result
+            onDone(None)
+            return
+        if TEXT_FORMAT not in formats:
+            onDone(None)
+            return
+        whenCompleted(content.get_text_async(), onDone)
+
+    def deleteHistoryItem(self, item):
+        from winrt.windows.applicationmodel.datatransfer import Clipboard
+        return Clipboard.delete_item_from_history(item)
+
+backend = None
+clipboardSync = None
+
+def getBackend():
+    global backend
+    if backend is None:
+        backend = WindowsClipboardBackend()
+    return backend
+
+def getClipboardSync():
+    global clipboardSync
+    if clipboardSync is None:
+        clipboardSync = ClipboardSync(getBackend())
+    return clipboardSync
+
+def deleteEntryFromClipboardHistory(textToDelete, maxEntries=10, onDone=None):
+    """
+    Asynchronously deletes entry with given text from clipboard history.
+    onDone(result) is called on the main thread when finished.
+    """
+    def finish(result):
+        if onDone is not None:
+            onDone(result)
+    try:
+        deleteEntryFromHistory(getBackend(), textToDelete, maxEntries, finish)
+    except OSError:
+        log.error("Failed to delete entry from clipboard history", exc_info=True)
+        finish(False)
@@ -0,0 +1,124 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Event-driven waiting for clipboard changes and lazy clipboard history cleanup.
+# This module doesn't depend on NVDA or Windows: all platform calls go through a backend object,
+# so that the logic can be exercised against a fake clipboard.
+# Backend must provide:
+#   getText() - returns clipboard text; may raise OSError if clipboard is locked by another process.
+#   callLater(ms, func, *args) - schedules func on main thread; returns an object with Stop() method.
+#   subscribe(callback), unsubscribe(callback) - clipboard update notifications, delivered on main thread.
+#   getHistoryItems(onDone) - calls onDone(items) with a sequence of history items, newest first, or onDone(None).
+#   getHistoryItemText(item, onDone) - calls onDone(text), or onDone(None) if item has no text.
+#   deleteHistoryItem(item) - returns True on success.
+
+RETRY_LOCKED_MS = 10
+
+class ClipboardWaiter:
+    def __init__(self, sync, predicate, onMatch, onTimeout):
+        self.sync = sync
+        self.predicate = predicate
+        self.onMatch = onMatch
+        self.onTimeout = onTimeout
+        self.timer = None
+        self.done = False
+
+    def cancel(self):
+        self.sync.remove(self)
+
+class ClipboardSync:
+    """
+        Waits until clipboard text satisfies a predicate.
+        Clipboard is only read when backend reports a clipboard update, instead of being polled.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.waiters = []
+        self.retryTimer = None
+
+    def waitFor(self, predicate, onMatch, onTimeout=None, timeoutMs=3000):
+        """
+            Calls onMatch(text) once clipboard text satisfies predicate, or onTimeout() if that doesn't happen within timeoutMs.
+            Current clipboard text is checked right away, since it might have changed before we started waiting.
+            Returns ClipboardWaiter that can be cancelled.
+        """
+        waiter = ClipboardWaiter(self, predicate, onMatch, onTimeout)
+        self.waiters.append(waiter)
+        if len(self.waiters) == 1:
+            self.backend.subscribe(self.onClipboardUpdate)
+        waiter.timer = self.backend.callLater(timeoutMs, self.onWaiterTimeout, waiter)
+        self.onClipboardUpdate()
+        return waiter
+
+    def remove(self, waiter):
+        if waiter.done:
+            return
+        waiter.done = True
+        if waiter.timer is not None:
+            waiter.timer.Stop()
+        self.waiters.remove(waiter)
+        if len(self.waiters) == 0:
+            self.backend.unsubscribe(self.onClipboardUpdate)
+            if self.retryTimer is not None:
+                self.retryTimer.Stop()
+                self.retryTimer = None
+
+    def onWaiterTimeout(self, waiter):
+        if waiter.done:
+            return
+        self.remove(waiter)
+        if waiter.onTimeout is not None:
+            waiter.onTimeout()
+
+    def onClipboardUpdate(self):
+        if self.retryTimer is not None:
+            # Either retry timer has fired or clipboard has been updated again before that; clipboard is read right away in both cases
+            self.retryTimer.Stop()
+            self.retryTimer = None
+        if len(self.waiters) == 0:
+            return
+        try:
+            text = self.backend.getText()
+        except OSError:
+            # Clipboard is still open by the application that has just updated it
+            if self.retryTimer is None:
+                self.retryTimer = self.backend.callLater(RETRY_LOCKED_MS, self.onClipboardUpdate)
+            return
+        for waiter in list(self.waiters):
+            if waiter.done:
+                continue
+            if waiter.predicate(text):
+                self.remove(waiter)
+                waiter.onMatch(text)
+
+def deleteEntryFromHistory(backend, textToDelete, maxEntries=10, onDone=None):
+    """
+        Deletes the most recent entry with given text among the first maxEntries entries of clipboard history.
+        Texts of history entries are fetched one at a time and only until a match is found.
+        Calls onDone(result) when finished, result being True if an entry has been deleted.
+    """
+    def finish(result):
+        if onDone is not None:
+            onDone(result)
+
+    def onItems(items):
+        if items is None:
+            finish(False)
+            return
+        checkItem(items, 0)
+
+    def checkItem(items, i):
+        if i >= min(maxEntries, len(items)):
+            finish(False)
+            return
+        item = items[i]
+        def onText(text):
+            if text == textToDelete:
+                finish(bool(backend.deleteHistoryItem(item)))
+            else:
+                checkItem(items, i + 1)
+        backend.getHistoryItemText(item, onText)
+
+    backend.getHistoryItems(onItems)
@@ -0,0 +1,515 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Whole-document indices built from a single getTextWithFields() pass over the virtual buffer.
+# Indices are cached per buffer generation: generation is bumped every time virtual buffer is updated,
+# so that stale indices are rebuilt lazily on next lookup.
+
+from array import array
+import bisect
+from collections import defaultdict
+import config
+import functools
+import re
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:
+    import sre_parse, sre_constants
+import sys
+import textInfos
+import textInfos.offsets
+import virtualBuffers
+import weakref
+
+from . import utils
+from .documentState import registry
+
+bufferGenerations = weakref.WeakKeyDictionary()
+
+def onVirtualBufferUpdate(buf):
+    bufferGenerations[buf] = bufferGenerations.get(buf, 0) + 1
+
+def getGeneration(buf):
+    return bufferGenerations.get(buf, 0)
+
+def isIndexable(buf):
+    # Only virtual buffers notify us about updates via _handleUpdate.
+    # For other browse mode documents we cannot tell when the index becomes stale.
+    return isinstance(buf, virtualBuffers.VirtualBuffer)
+
+def makeTextInfoAtOffset(buf, offset, endOffset=None):
+    if endOffset is None:
+        endOffset = offset
+    return buf.makeTextInfo(textInfos.offsets.Offsets(offset, endOffset))
+
+_NO_VALUE = object()
+_MISSING = object()
+
+# Format attributes that define a format run; same keys as used by findFormatChange
+formatKeys = "color,font-family,font-size,bold,italic,strikethrough,underline".split(",")
+
+def getFormatKey(formatField):
+    return tuple(
+        formatField.get(key, _MISSING)
+        for key in formatKeys
+    )
+
+class IntervalList:
+    """
+        Sorted list of disjoint [start, end) intervals of buffer offsets, each carrying an optional value.
+        Adjacent intervals with the same value are merged on insert.
+        Intervals must be added in increasing order of offsets.
+    """
+    def __init__(self):
+        self.starts = array('l')
+        self.ends = array('l')
+        self.values = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start, end, value=None):
+        if len(self.ends) > 0 and self.ends[-1] == start and self.values[-1] == value:
+            self.ends[-1] = end
+            return
+        self.starts.append(start)
+        self.ends.append(end)
+        self.values.append(value)
+
+    def valueAt(self, offset):
+        i = bisect.bisect_right(self.starts, offset) - 1
+        if i >= 0 and offset < self.ends[i]:
+            return self.values[i]
+        return None
+
+    def findIndex(self, offset, direction, exclude=_NO_VALUE):
+        """
+            Forward: returns index of the first interval ending after offset.
+            Backward: returns index of the last interval starting before offset.
+            Intervals whose value equals exclude are skipped.
+            Returns None if nothing found.
+        """
+        n = len(self.starts)
+        if direction > 0:
+            i = bisect.bisect_right(self.ends, offset)
+            while i < n:
+                if self.values[i] != exclude:
+                    return i
+                i += 1
+        else:
+            i = bisect.bisect_left(self.starts, offset) - 1
+            while i >= 0:
+                if self.values[i] != exclude:
+                    return i
+                i -= 1
+        return None
+
+    def find(self, offset, direction, exclude=_NO_VALUE):
+        """
+            Forward: returns the smallest offset >= offset covered by an interval.
+            Backward: returns the largest offset < offset covered by an interval.
+        """
+        i = self.findIndex(offset, direction, exclude)
+        if i is None:
+            return None
+        if direction > 0:
+            return max(self.starts[i], offset)
+        else:
+            return min(self.ends[i], offset) - 1
+
+    def getInterval(self, i):
+        return (self.starts[i], self.ends[i], self.values[i])
+
+    def estimateSize(self):
+        return (
+            self.starts.itemsize * len(self.starts)
+            + self.ends.itemsize * len(self.ends)
+            + sys.getsizeof(self.values)
+        )
+
+class DocumentIndex:
+    def __init__(self, buf):
+        self.generation = getGeneration(buf)
+        # role -> intervals covered by at least one control of that role
+        self.roleIntervals = defaultdict(IntervalList)
+        # role -> intervals where the innermost control has that role
+        self.innermostRoleIntervals = defaultdict(IntervalList)
+        # role -> intervals labeled with uniqueID of the outermost control of that role
+        self.controlIntervals = defaultdict(IntervalList)
+        # Runs of text with identical format key
+        self.formatRuns = IntervalList()
+        info = buf.makeTextInfo(textInfos.POSITION_ALL)
+        self.startOffset = info._startOffset
+        self.endOffset = info._endOffset
+        formatConfig = config.conf['documentFormatting']
+        self.build(info.getTextWithFields(formatConfig))
+
+    def build(self, fields):
+        stack = []
+        offset = self.startOffset
+        formatKey = None
+        for field in fields:
+            if isinstance(field, str):
+                length = utils.wcharLength(field)
+                if length == 0:
+                    continue
+                end = offset + length
+                self.onText(offset, end, stack)
+                if formatKey is not None:
+                    self.formatRuns.add(offset, end, formatKey)
+                offset = end
+            elif isinstance(field, textInfos.FieldCommand):
+                if field.command == "controlStart":
+                    stack.append(field.field)
+                elif field.command == "controlEnd":
+                    if len(stack) > 0:
+                        stack.pop()
+                elif field.command == "formatChange":
+                    formatKey = getFormatKey(field.field)
+
+    def onText(self, start, end, stack):
+        seenRoles = set()
+        for control in stack:
+            role = control.get('role')
+            if role is None or role in seenRoles:
+                continue
+            seenRoles.add(role)
+            self.roleIntervals[role].add(start, end)
+            self.controlIntervals[role].add(start, end, control.get('uniqueID', 0))
+        if len(stack) > 0:
+            role = stack[-1].get('role')
+            if role is not None:
+                self.innermostRoleIntervals[role].add(start, end)
+
+    def findRole(self, roles, offset, direction, innermostOnly=False):
+        intervals = self.innermostRoleIntervals if innermostOnly else self.roleIntervals
+        candidates = [
+            intervals[role].find(offset, direction)
+            for role in roles
+            if role in intervals
+        ]
+        candidates = [c for c in candidates if c is not None]
+        if len(candidates) == 0:
+            return None
+        return min(candidates) if direction > 0 else max(candidates)
+
+    def findControlChange(self, role, offset, direction, originalId):
+        intervals = self.controlIntervals.get(role)
+        if intervals is None:
+            return None
+        return intervals.find(offset, direction, exclude=originalId)
+
+    def estimateSize(self):
+        return sum(
+            intervals.estimateSize()
+            for intervalsByRole in [self.roleIntervals, self.innermostRoleIntervals, self.controlIntervals]
+            for intervals in intervalsByRole.values()
+        ) + self.formatRuns.estimateSize()
+
+    def getFormatKeyAt(self, offset):
+        return self.formatRuns.valueAt(offset)
+
+    def findFormatChange(self, offset, direction, originalKey):
+        """
+            Returns (startOffset, endOffset) of the nearest format run in given direction whose format differs from originalKey.
+        """
+        i = self.formatRuns.findIndex(offset, direction, exclude=originalKey)
+        if i is None:
+            return None
+        start, end, key = self.formatRuns.getInterval(i)
+        return (start, end)
+
+def getDocumentIndex(buf):
+    """
+        Returns up to date DocumentIndex for given browse mode document, or None if buffer cannot be indexed.
+    """
+    if not isIndexable(buf):
+        return None
+    index = registry.get(buf, "documentIndex")
+    if index is None or index.generation != getGeneration(buf):
+        index = DocumentIndex(buf)
+        registry.set(buf, "documentIndex", index)
+    return index
+
+def extractRequiredLiteral(regex):
+    """
+        Returns the longest literal string that must be present in any text matched by given compiled regex,
+        or None if no such literal can be easily found.
+        Only top level concatenation and top level groups are analyzed.
+    """
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return None
+    runs = []
+    def collect(subpattern):
+        run = []
+        for op, av in subpattern:
+            if op == sre_constants.LITERAL:
+                run.append(chr(av))
+                continue
+            if len(run) > 0:
+                runs.append("".join(run))
+                run = []
+            if op == sre_constants.SUBPATTERN:
+                group, addFlags, delFlags, p = av
+                if addFlags == 0 and delFlags == 0:
+                    collect(p)
+        if len(run) > 0:
+            runs.append("".join(run))
+    collect(parsed)
+    if len(runs) == 0:
+        return None
+    return max(runs, key=len)
+
+def hasContextAssertions(subpattern):
+    """
+        Tells whether parsed regex contains anchors, word boundaries or lookarounds,
+        whose outcome depends on text surrounding the match.
+    """
+    for op, av in subpattern:
+        if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            return True
+        stack = [av]
+        while len(stack) > 0:
+            item = stack.pop()
+            if isinstance(item, sre_parse.SubPattern):
+                if hasContextAssertions(item):
+                    return True
+            elif isinstance(item, (tuple, list)):
+                stack.extend(item)
+    return False
+
+@functools.lru_cache()
+def getScanRegexp(regexp):
+    """
+        Returns regexp to be run over the whole document text, such that every match of regexp within paragraph text
+        starts on the same line as a hit of scan regexp or further; or None if every line must be checked.
+        Paragraph text is a slice of document text, so regexp itself can be used unless its outcome depends on surrounding text:
+        anchors and word boundaries might be satisfied at a paragraph boundary in the middle of a line.
+        Such regexps are scanned for their required literal instead.
+        Hits are only candidates and must be verified against the original regexp on paragraph text.
+    """
+    try:
+        parsed = sre_parse.parse(regexp.pattern, regexp.flags)
+    except Exception:
+        return None
+    if not hasContextAssertions(parsed):
+        return regexp
+    literal = extractRequiredLiteral(regexp)
+    if literal is None:
+        return None
+    return re.compile(re.escape(literal), regexp.flags & re.IGNORECASE)
+
+astralRegexp = re.compile("[\U00010000-\U0010FFFF]")
+class DocumentText:
+    """
+        Snapshot of the whole text of a virtual buffer together with line start table.
+        Lines are split on newline characters. They are only an approximation of paragraphs:
+        a buffer paragraph can span several lines or end in the middle of one, so use iterParagraphsInRange to find real paragraphs.
+        Python string indices differ from buffer offsets for characters outside of BMP, so we keep track of those too.
+    """
+    def __init__(self, buf):
+        self.generation = getGeneration(buf)
+        info = buf.makeTextInfo(textInfos.POSITION_ALL)
+        self.startOffset = info._startOffset
+        text = info.text
+        self.text = text
+        self._lowerText = None
+        self.lineStarts = array('l', [0])
+        self.lineStarts.extend(m.end() for m in re.finditer("\n", text) if m.end() < len(text))
+        self.astralIndices = array('l', (m.start() for m in astralRegexp.finditer(text)))
+        self.astralOffsets = array('l', (index + k for k, index in enumerate(self.astralIndices)))
+
+    def toOffset(self, index):
+        return self.startOffset + index + bisect.bisect_left(self.astralIndices, index)
+
+    def toIndex(self, offset):
+        offset -= self.startOffset
+        return offset - bisect.bisect_left(self.astralOffsets, offset)
+
+    def getText(self, startOffset, endOffset):
+        return self.text[self.toIndex(startOffset):self.toIndex(endOffset)]
+
+    def getLineBounds(self, i):
+        start = self.lineStarts[i]
+        if i + 1 < len(self.lineStarts):
+            return start, self.lineStarts[i + 1]
+        return start, len(self.text)
+
+    def getLineIndex(self, index):
+        return bisect.bisect_right(self.lineStarts, index) - 1
+
+    def countLines(self, startOffset, endOffset):
+        return self.getLineIndex(self.toIndex(endOffset)) - self.getLineIndex(self.toIndex(startOffset))
+
+    def getLineText(self, i):
+        start, end = self.getLineBounds(i)
+        return self.text[start:end]
+
+    def iterCandidateLines(self, regexp, offset, direction):
+        """
+            Yields indices of lines that might contain a match of regexp, nearest first.
+            Forward: lines starting with the one containing offset.
+            Backward: lines starting with the one containing the character just before offset.
+        """
+        index = self.toIndex(offset)
+        starts = self.lineStarts
+        n = len(starts)
+        scanRegexp = getScanRegexp(regexp)
+        if direction > 0:
+            i = max(0, self.getLineIndex(index))
+            while i < n:
+                if scanRegexp is not None:
+                    m = scanRegexp.search(self.text, starts[i])
+                    if m is None:
+                        return
+                    i = self.getLineIndex(m.start())
+                yield i
+                i += 1
+        else:
+            if index <= 0:
+                return
+            last = self.getLineIndex(index - 1)
+            if scanRegexp is None:
+                candidates = range(last + 1)
+            else:
+                candidates = []
+                endIndex = self.getLineBounds(last)[1]
+                i = 0
+                while i <= last:
+                    m = scanRegexp.search(self.text, starts[i], endIndex)
+                    if m is None:
+                        break
+                    i = self.getLineIndex(m.start())
+                    candidates.append(i)
+                    i += 1
+            yield from reversed(candidates)
+
+    def estimateSize(self):
+        size = sys.getsizeof(self.text)
+        if self._lowerText:
+            size += sys.getsizeof(self._lowerText)
+        for a in [self.lineStarts, self.astralIndices, self.astralOffsets]:
+            size += a.itemsize * len(a)
+        return size
+
+    def getLowerText(self):
+        if self._lowerText is None:
+            lowerText = self.text.lower()
+            # Lowercasing can change length of some strings, then indices would be off
+            self._lowerText = lowerText if len(lowerText) == len(self.text) else False
+        return self._lowerText
+
+    def findText(self, needle, offset, caseSensitive=False, reverse=False):
+        """
+            Returns (startOffset, endOffset) of the nearest occurrence of needle, or None if not found.
+            Raises LookupError if case insensitive search cannot be performed on this snapshot.
+        """
+        text = self.text
+        if not caseSensitive:
+            text = self.getLowerText()
+            if text is False:
+                raise LookupError()
+            needle = needle.lower()
+        index = self.toIndex(offset)
+        if reverse:
+            i = text.rfind(needle, 0, index)
+        else:
+            i = text.find(needle, index)
+        if i < 0:
+            return None
+        return self.toOffset(i), self.toOffset(i + len(needle))
+
+def getDocumentText(buf):
+    """
+        Returns up to date DocumentText for given browse mode document, or None if buffer cannot be indexed.
+    """
+    if not isIndexable(buf):
+        return None
+    snapshot = registry.get(buf, "documentText")
+    if snapshot is None or snapshot.generation != getGeneration(buf):
+        snapshot = DocumentText(buf)
+        registry.set(buf, "documentText", snapshot)
+    return snapshot
+
+def iterParagraphsInRange(buf, startOffset, endOffset, direction):
+    """
+        Yields expanded textInfos of all paragraphs of buf overlapping given offset range, in given direction.
+        Takes one call to the buffer per paragraph.
+    """
+    offset = startOffset if direction > 0 else endOffset - 1
+    while startOffset <= offset < endOffset:
+        info = makeTextInfoAtOffset(buf, offset)
+        info.expand(textInfos.UNIT_PARAGRAPH)
+        yield info
+        if direction > 0:
+            if info._endOffset <= offset:
+                return
+            offset = info._endOffset
+        else:
+            if info._startOffset > offset:
+                return
+            offset = info._startOffset - 1
+
+def iterMatchingParagraphs(buf, snapshot, regexp, offset, direction):
+    """
+        Yields (textInfo, text) of paragraphs matching regexp, nearest first.
+        Forward: paragraphs starting at or after offset. Backward: paragraphs ending at or before offset.
+        Snapshot only tells which lines might contain a match; each of them is mapped to the real paragraphs overlapping it,
+        whose text is then taken from the snapshot and checked.
+    """
+    # Paragraphs up to that offset have been checked already, since a paragraph can span several candidate lines
+    checked = offset
+    for i in snapshot.iterCandidateLines(regexp, offset, direction):
+        start, end = snapshot.getLineBounds(i)
+        start, end = snapshot.toOffset(start), snapshot.toOffset(end)
+        if direction > 0:
+            start = max(start, checked)
+        else:
+            end = min(end, checked)
+        for info in iterParagraphsInRange(buf, start, end, direction):
+            if direction > 0:
+                checked = info._endOffset
+                if info._startOffset < offset:
+                    continue
+            else:
+                checked = info._startOffset
+                if info._endOffset > offset:
+                    continue
+            text = snapshot.getText(info._startOffset, info._endOffset)
+            if regexp.search(text) is not None:
+                yield info, text
+
+def iterCandidateParagraphs(buf, snapshot, regexps):
+    """
+        Yields expanded textInfos of paragraphs whose text might match any of regexps, in document order.
+        Paragraphs are only candidates and must be verified by the caller, but no matching paragraph is left out.
+    """
+    lines = set()
+    for regexp in regexps:
+        lines.update(snapshot.iterCandidateLines(regexp, snapshot.startOffset, 1))
+    checked = snapshot.startOffset
+    for i in sorted(lines):
+        start, end = snapshot.getLineBounds(i)
+        for info in iterParagraphsInRange(buf, max(snapshot.toOffset(start), checked), snapshot.toOffset(end), 1):
+            checked = info._endOffset
+            yield info
+
+# Rough average length of a paragraph in characters, used to estimate paragraph distance
+# when no up to date text snapshot of the document is available.
+AVERAGE_PARAGRAPH_LENGTH = 20
+
+def estimateParagraphDistance(buf, startOffset, endOffset):
+    """
+        Returns estimated number of paragraph boundaries between two offsets.
+        Uses line table of cached text snapshot if it is up to date; never builds a new snapshot,
+        since this is called on every caret movement.
+    """
+    if isIndexable(buf):
+        snapshot = registry.get(buf, "documentText")
+        if snapshot is not None and snapshot.generation == getGeneration(buf):
+            return abs(snapshot.countLines(startOffset, endOffset))
+    return abs(endOffset - startOffset) // AVERAGE_PARAGRAPH_LENGTH
@@ -0,0 +1,155 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Registry owning all per-document caches of BrowserNav.
+# Caches of all documents share a single memory budget:
+# once it is exceeded, caches of least recently used documents are evicted.
+# Pinned entries hold state rather than caches and are only freed when document is terminated.
+
+from collections import OrderedDict
+import sys
+import threading
+import weakref
+
+from .addonConfig import getConfig
+
+def estimateSize(value):
+    """
+        Rough estimate of memory used by value in bytes.
+        Objects can provide their own estimateSize() method; containers are estimated recursively.
+        Dict keys are not counted, since in our caches they are shared objects such as bookmarks.
+    """
+    estimate = getattr(value, 'estimateSize', None)
+    if estimate is not None:
+        return estimate()
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimateSize(v) for v in value.values())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimateSize(v) for v in value)
+    return sys.getsizeof(value)
+
+class DocumentState:
+    def __init__(self, ref):
+        self.ref = ref
+        self.entries = {}
+        self.sizes = {}
+        self.pinned = set()
+        # Names of entries evicted due to memory budget
+        self.evicted = set()
+
+    def getSize(self):
+        return sum(self.sizes.values())
+
+class DocumentStateRegistry:
+    def __init__(self, getBudget):
+        self.getBudget = getBudget
+        self.lock = threading.RLock()
+        # id(document) -> DocumentState, least recently used first
+        self.states = OrderedDict()
+
+    def _getState(self, doc, create):
+        key = id(doc)
+        state = self.states.get(key, None)
+        if state is not None and state.ref() is not doc:
+            # Document has been garbage collected and its id reused
+            del self.states[key]
+            state = None
+        if state is None:
+            if not create:
+                return None
+            state = DocumentState(weakref.ref(doc, lambda ref, key=key: self._onDead(key, ref)))
+            self.states[key] = state
+        self.states.move_to_end(key)
+        return state
+
+    def _onDead(self, key, ref):
+        with self.lock:
+            state = self.states.get(key, None)
+            if state is not None and state.ref is ref:
+                del self.states[key]
+
+    def get(self, doc, name, default=None):
+        with self.lock:
+            state = self._getState(doc, create=False)
+            if state is None:
+                return default
+            return state.entries.get(name, default)
+
+    def set(self, doc, name, value, pinned=False):
+        size = estimateSize(value)
+        with self.lock:
+            state = self._getState(doc, create=True)
+            state.entries[name] = value
+            state.sizes[name] = size
+            state.evicted.discard(name)
+            if pinned:
+                state.pinned.add(name)
+            self._enforceBudget(state)
+
+    def updateSize(self, doc, name):
+        """
+            Must be called after an entry has grown in place.
+        """
+        with self.lock:
+            state = self._getState(doc, create=False)
+            if state is None or name not in state.entries:
+                return
+            state.sizes[name] = estimateSize(state.entries[name])
+            self._enforceBudget(state)
+
+    def wasEvicted(self, doc, name):
+        with self.lock:
+            state = self._getState(doc, create=False)
+            return state is not None and name in state.evicted
+
+    def terminate(self, doc):
+        with self.lock:
+            state = self.states.get(id(doc), None)
+            if state is not None and state.ref() is doc:
+                del self.states[id(doc)]
+
+    def _enforceBudget(self, currentState):
+        budget = self.getBudget()
+        total = sum(state.getSize() for state in self.states.values())
+        if total <= budget:
+            return
+        # Never evict current document, otherwise its caches would be rebuilt over and over again
+        for state in list(self.states.values()):
+            if state is currentState:
+                continue
+            for name in list(state.entries.keys()):
+                if name in state.pinned:
+                    continue
+                total -= state.sizes.pop(name)
+                del state.entries[name]
+                state.evicted.add(name)
+            if total <= budget:
+                return
+
+    def getReport(self, describe):
+        """
+            Returns list of lines describing memory used by each document, most recently used first.
+        """
+        lines = []
+        total = 0
+        with self.lock:
+            items = [
+                (state.ref(), state)
+                for state in reversed(self.states.values())
+            ]
+            for doc, state in items:
+                if doc is None:
+                    continue
+                size = state.getSize()
+                total += size
+                entries = ", ".join(
+                    f"{name} {state.sizes[name] // 1024} KiB"
+                    for name in sorted(state.entries.keys())
+                )
+                lines.append(f"{describe(doc)}: {size // 1024} KiB ({entries})")
+        lines.insert(0, f"Total: {total // 1024} KiB in {len(lines)} documents, budget {self.getBudget() // 1024} KiB")
+        return lines
+
+registry = DocumentStateRegistry(lambda: getConfig("documentCacheBudgetMb") * 1024 * 1024)
@@ -10,7 +10,9 @@
 
 import addonHandler
 import api
+from array import array
 from . beeper import *
+import bisect
 import browseMode
 from contextlib import ExitStack
 import controlTypes
@@ -54,6 +56,42 @@ import winUser
 import wx
 from wx.stc import StyledTextCtrl
 from . import clipboard
+
+class LineIndex:
+    """
+        Table of line start indices of text, with line endings normalized to \n.
+        Allows to convert between string indices and (line, column) pairs in O(log n).
+    """
+    def __init__(self, text):
+        self.text = text
+        self.lineStarts = array('l', [0])
+        self.lineStarts.extend(m.end() for m in re.finditer("\n", text))
+
+    def toIndex(self, line, column):
+        return self.lineStarts[line] + column
+
+    def toLineAndColumn(self, index):
+        line = bisect.bisect_right(self.lineStarts, index) - 1
+        return line, index - self.lineStarts[line]
+
+def searchBackward(regexp, text, index, chunkSize=4096):
+    """
+        Returns the last match of regexp that ends at or before index, or None.
+        Scans windows of doubling size backwards from index, so that a match close to index is found without scanning the whole text.
+        Windows start at line boundaries, so that matches within a line are the same as when scanning from the beginning.
+    """
+    start = index
+    while True:
+        start = text.rfind("\n", 0, max(0, start - chunkSize)) + 1
+        chunkSize *= 2
+        lastMatch = None
+        for m in regexp.finditer(text, start):
+            if m.end() > index:
+                break
+            lastMatch = m
+        if lastMatch is not None or start == 0:
+            return lastMatch
+
 class GoToLineDialog(wx.Dialog):
     def __init__(self, parent, lineNum):
         # Translators: Title of Go To Line dialog
@@ -137,6 +175,8 @@ class EditTextDialog(wx.Dialog):
         self.textCtrl.Bind(wx.EVT_CHAR, self.onChar)
         self.Bind(wx.EVT_CHAR_HOOK, self.OnKeyUP)
         self.textCtrl.Bind(wx.EVT_TEXT_PASTE, self.onClipboardPaste2)
+        self.textCtrl.Bind(wx.EVT_TEXT, self.onTextChanged)
+        self.lineIndex = None
         sHelper.addItem(self.textCtrl)
         
         # For some reason when text is large, this causes the first typed character to be eaten. Instead setting text incrementally
@@ -160,13 +200,28 @@ class EditTextDialog(wx.Dialog):
         core.callLater(1, self.textCtrl.SetInsertionPoint, pos)
 
 
+    def onTextChanged(self, event):
+        self.lineIndex = None
+        event.Skip()
+
+    def getLineIndex(self):
+        # Rebuilt lazily at most once per modification of text, so that repeated searches don't need to fetch text from the control again
+        if self.lineIndex is None:
+            text = self.textCtrl.GetValue().replace("\r\n", "\n").replace("\r", "\n")
+            self.lineIndex = LineIndex(text)
+        return self.lineIndex
+
+    def getCaretIndex(self, lineIndex):
+        dummy, columnNum, lineNum = self.textCtrl.PositionToXY(self.textCtrl.GetInsertionPoint())
+        return lineIndex.toIndex(lineNum, columnNum)
+
     def onGoTo(self, event):
         curPos = self.textCtrl.GetInsertionPoint()
         dummy, columnNum, lineNum = self.textCtrl.PositionToXY(curPos)
         d = GoToLineDialog(self, lineNum + 1)
         result = d.ShowModal()
         if result == wx.ID_OK:
-            lineNum = d.result - 1
+            lineNum = min(d.result, self.textCtrl.GetNumberOfLines()) - 1
             pos = self.textCtrl.XYToPosition(0, lineNum)
             self.textCtrl.SetInsertionPoint(pos)
 
@@ -177,25 +232,18 @@ class EditTextDialog(wx.Dialog):
             self.doFind(1)
 
     def doFind(self, direction):
-        cursorPos = self.textCtrl.GetInsertionPoint()
-        allText = self.textCtrl.GetRange(0, -1)
-        preText = self.textCtrl.GetRange( 0, cursorPos)
-        allText = allText.replace("\r\n", "\n").replace("\r", "\n")
-        preText = preText.replace("\r\n", "\n").replace("\r", "\n")
+        lineIndex = self.getLineIndex()
+        caretIndex = self.getCaretIndex(lineIndex)
         r = re.compile(lastRegexSearch, re.IGNORECASE)
-        matches = list(re.finditer(r, allText))
         if direction > 0:
-            matches = [m for m in matches if m.start(0) > len(preText)]
+            match = r.search(lineIndex.text, caretIndex + 1)
         else:
-            matches = [m for m in matches if m.end(0) <= len(preText)]
-        if len(matches) == 0:
+            match = searchBackward(r, lineIndex.text, caretIndex)
+        if match is None:
             endOfDocument(_("No match!"))
             return
-        mindex = 0 if direction > 0 else -1
-        match = matches[mindex]
-        preMatch = allText[:match.start(0)]
-        preMatchLines = preMatch.split("\n")
-        pos = self.textCtrl.XYToPosition(len(preMatchLines[-1]), len(preMatchLines) - 1)
+        lineNum, columnNum = lineIndex.toLineAndColumn(match.start(0))
+        pos = self.textCtrl.XYToPosition(columnNum, lineNum)
         self.textCtrl.SetInsertionPoint(pos)
 
     def reindent(self, string, direction):
@@ -210,7 +258,6 @@ class EditTextDialog(wx.Dialog):
         shift = event.ShiftDown()
         alt = event.AltDown()
         keyCode = event.GetKeyCode ()
-        #mylog(f"vk={keyCode} a{alt} c{control} s{shift}")
         if event.GetKeyCode() in [10, 13]:
             # 13 means Enter
             # 10 means Control+Enter
@@ -220,8 +267,7 @@ class EditTextDialog(wx.Dialog):
             if not any(modifiers):
                 # Just pure enter without any modifiers
                 # Perform Autoindent
-                curPos = self.textCtrl.GetInsertionPoint
-                lineNum = len(self.textCtrl.GetRange( 0, self.textCtrl.GetInsertionPoint() ).split("\n")) - 1
+                dummy, columnNum, lineNum = self.textCtrl.PositionToXY(self.textCtrl.GetInsertionPoint())
                 lineText = self.textCtrl.GetLineText(lineNum)
                 m = re.search("^\s*", lineText)
                 if m:
@@ -258,33 +304,32 @@ class EditTextDialog(wx.Dialog):
                     # Shift+Tab
                     curPos = self.textCtrl.GetInsertionPoint()
                     dummy, curCol, curLine = self.textCtrl.PositionToXY(curPos)
-                    beginLinePos = self.textCtrl.XYToPosition(0, curLine)
-                    allText = self.textCtrl.Value
-                    allText = allText.replace("\r\n", "\n").replace("\r", "\n")
-                    allLines = allText.split("\n")
-                    lineStr = allLines[curLine]
+                    lineStr = self.textCtrl.GetLineText(curLine)
                     preLine = lineStr[:curCol]
                     if preLine.endswith(self.tabValue):
+                        # Only the removed indentation is touched, the rest of the text stays in the control
                         newCurCol = curCol - len(self.tabValue)
-                        lineStr = lineStr[:newCurCol] + lineStr[curCol:]
-                        allLines[curLine] = lineStr
-                        allText = "\n".join(allLines)
-                        self.textCtrl.Value = allText
+                        self.textCtrl.Remove(self.textCtrl.XYToPosition(newCurCol, curLine), curPos)
                         pos = self.textCtrl.XYToPosition(newCurCol, curLine)
                         self.textCtrl.SetInsertionPoint(pos)
 
                 else:
-                    allText = self.textCtrl.Value
-                    allText = allText.replace("\r\n", "\n").replace("\r", "\n")
-                    allLines = allText.split("\n")
                     dummy, col1, line1 = self.textCtrl.PositionToXY(pos1)
                     dummy, col2, line2 = self.textCtrl.PositionToXY(pos2)
                     if col2 == 0 and line2 > line1:
                         line2 -= 1
-                    for index in range(line1, line2+1):
-                        allLines[index]  = self.reindent(allLines[index], -1 if  shift else 1)
-                    allText = "\n".join(allLines)
-                    self.textCtrl.Value = allText
+                    # Replace only selected lines instead of resetting the whole text
+                    lines = [
+                        self.textCtrl.GetLineText(index)
+                        for index in range(line1, line2+1)
+                    ]
+                    lines = [
+                        self.reindent(line, -1 if  shift else 1)
+                        for line in lines
+                    ]
+                    startPos = self.textCtrl.XYToPosition(0, line1)
+                    endPos = self.textCtrl.XYToPosition(0, line2) + self.textCtrl.GetLineLength(line2)
+                    self.textCtrl.Replace(startPos, endPos, "\n".join(lines))
                     pos1 = self.textCtrl.XYToPosition(0, line1)
                     pos2 = self.textCtrl.XYToPosition(0, line2 + 1)
                     self.textCtrl.SetSelection(pos1, pos2)
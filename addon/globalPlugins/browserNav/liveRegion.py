@@ -0,0 +1,91 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Throttling, de-duplication and coalescing of live region announcements.
+# Live region updates arrive on NVDA's RPC thread, so this module keeps its own lock and doesn't touch NVDA objects.
+
+import threading
+import time
+
+politenessOrder = ["off", "polite", "assertive"]
+
+def maxPoliteness(p1, p2):
+    try:
+        return p1 if politenessOrder.index(p1) >= politenessOrder.index(p2) else p2
+    except ValueError:
+        return p1
+
+class LiveRegionThrottler:
+    """
+        Rate limits live region announcements of a website.
+        Text identical to a text announced less than dedupWindow seconds ago is dropped.
+        Updates arriving less than minInterval seconds after the previous utterance are held back,
+        and all of them are coalesced into a single utterance once minInterval elapses.
+        At most maxPending updates are held back; older ones are dropped, since during a storm only latest updates matter.
+        emit(text, politeness) speaks an utterance; schedule(delayMs, func) calls func later.
+    """
+    def __init__(self, emit, schedule, minInterval, dedupWindow, maxPending=10, clock=time.monotonic):
+        self.emit = emit
+        self.schedule = schedule
+        self.minInterval = minInterval
+        self.dedupWindow = dedupWindow
+        self.maxPending = maxPending
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.lastEmitTime = None
+        # Maps text to the last time it was seen
+        self.recentTexts = {}
+        self.pending = []
+        self.pendingPoliteness = "off"
+        self.flushScheduled = False
+
+    def isDuplicate(self, text, now):
+        if self.dedupWindow <= 0:
+            return False
+        if len(self.recentTexts) > 100:
+            self.recentTexts = {
+                t: seen
+                for t, seen in self.recentTexts.items()
+                if now - seen < self.dedupWindow
+            }
+        seen = self.recentTexts.get(text)
+        self.recentTexts[text] = now
+        return seen is not None and now - seen < self.dedupWindow
+
+    def submit(self, text, politeness):
+        """
+            Returns True if text has been spoken or queued, and False if it has been dropped.
+        """
+        with self.lock:
+            now = self.clock()
+            if self.isDuplicate(text, now):
+                return False
+            if not self.flushScheduled and (self.lastEmitTime is None or now - self.lastEmitTime >= self.minInterval):
+                self.lastEmitTime = now
+                utterance = (text, politeness)
+            else:
+                utterance = None
+                self.pending.append(text)
+                del self.pending[:-self.maxPending]
+                self.pendingPoliteness = maxPoliteness(self.pendingPoliteness, politeness)
+                if not self.flushScheduled:
+                    self.flushScheduled = True
+                    delay = self.minInterval - (now - self.lastEmitTime)
+                    self.schedule(max(1, int(delay * 1000)), self.flush)
+        if utterance is not None:
+            self.emit(*utterance)
+        return True
+
+    def flush(self):
+        with self.lock:
+            self.flushScheduled = False
+            if len(self.pending) == 0:
+                return
+            text = "\n".join(self.pending)
+            politeness = self.pendingPoliteness
+            self.pending = []
+            self.pendingPoliteness = "off"
+            self.lastEmitTime = self.clock()
+        self.emit(text, politeness)
@@ -4,12 +4,14 @@
 #See the file LICENSE  for more details.
 
 import baseObject
+import functools
 import re
 import textInfos
 import controlTypes
 import api
 
 from . import quickJump
+from . import documentIndex
 
 class ScriptError(RuntimeError):
     pass
@@ -57,6 +59,10 @@ def getFocusTextInfo():
 def getFocusParagraph():
     return Paragraph(getFocusTextInfo())
 
+@functools.lru_cache(maxsize=1000)
+def compileRegexp(regexp, caseSensitive=False):
+    return re.compile(regexp, flags=0 if caseSensitive else re.IGNORECASE)
+
 class Paragraph(baseObject.AutoPropertyObject):
     def __init__(self, textInfo, _normalize=True, _end=None):
         info = textInfo.copy()
@@ -64,8 +70,30 @@ class Paragraph(baseObject.AutoPropertyObject):
             info.collapse()
             info.expand(textInfos.UNIT_PARAGRAPH)
         self.textInfo = info
+        self._buf = info.obj
         # _end can be True, False, or None
         self._end = _end
+        self._cacheGeneration = None
+        self._text = None
+        self._textWithFields = None
+        self._attributes = None
+
+    @classmethod
+    def _fromOffsets(cls, buf, startOffset, endOffset, snapshot=None):
+        # Creates paragraph without any calls to virtual buffer; its textInfo is only created when asked for.
+        # Text is taken from snapshot if given.
+        p = cls.__new__(cls)
+        p._buf = buf
+        p._offsets = (startOffset, endOffset)
+        p._end = None
+        p._cacheGeneration = None
+        p._text = None
+        p._textWithFields = None
+        p._attributes = None
+        if snapshot is not None:
+            p._cacheGeneration = snapshot.generation
+            p._text = snapshot.getText(startOffset, endOffset)
+        return p
         
     def move(self, offset: int, errorMsg=None):
         info = self.textInfo.copy()
@@ -88,17 +116,47 @@ class Paragraph(baseObject.AutoPropertyObject):
         return self.move(-1, errorMsg=_("Previous paragraph not found: current position is at the beginning of the document."))
 
     def _get_textInfo(self):
-        return self.textInfo.copy()
+        # Only reached by paragraphs created by _fromOffsets, since textInfo instance attribute takes precedence over this getter
+        self.textInfo = documentIndex.makeTextInfoAtOffset(self._buf, *self._offsets)
+        return self.textInfo
+
+    def _isCacheValid(self):
+        # Cached values are valid until the underlying virtual buffer is updated
+        buf = self._buf
+        if not documentIndex.isIndexable(buf):
+            return False
+        generation = documentIndex.getGeneration(buf)
+        if self._cacheGeneration != generation:
+            self._cacheGeneration = generation
+            self._text = None
+            self._textWithFields = None
+            self._attributes = None
+        return True
 
     def _get_text(self):
-        return self.textInfo.text
+        if not self._isCacheValid():
+            return self.textInfo.text
+        if self._text is None:
+            self._text = self.textInfo.text
+        return self._text
 
     def _get_textWithFields(self):
-        return self.textInfo.getTextWithFields()
+        if not self._isCacheValid():
+            return self.textInfo.getTextWithFields()
+        if self._textWithFields is None:
+            self._textWithFields = self.textInfo.getTextWithFields()
+        return self._textWithFields
 
     def _get_attributes(self):
+        if not self._isCacheValid():
+            return self._computeAttributes()
+        if self._attributes is None:
+            self._attributes = self._computeAttributes()
+        return self._attributes
+
+    def _computeAttributes(self):
         result = {}
-        for attr in quickJump.extractAttributesSet(self.textInfo):
+        for attr in quickJump.extractAttributesSetFromFields(self.textWithFields):
             try:
                 l = result[attr.attribute]
             except KeyError:
@@ -135,6 +193,21 @@ class Paragraph(baseObject.AutoPropertyObject):
     def find(self, text, caseSensitive=False,reverse=False):
         info = self.textInfo.copy()
         info.collapse(end=not reverse)
+        snapshot = documentIndex.getDocumentText(info.obj)
+        if snapshot is not None:
+            try:
+                result = snapshot.findText(text, info._startOffset, caseSensitive=caseSensitive, reverse=reverse)
+            except LookupError:
+                pass
+            else:
+                if result is not None:
+                    return documentIndex.makeTextInfoAtOffset(info.obj, *result)
+                raise NotFoundError(
+                    _("Plain text not found: tried to search for '{text}' {direction}.").format(
+                        text=text,
+                        direction=_("backward") if reverse else _("forward")
+                    )
+                )
         if info.find(text, caseSensitive=caseSensitive, reverse=reverse):
             info.move(textInfos.UNIT_CHARACTER, len(text), endPoint='end')
             return info
@@ -145,25 +218,94 @@ class Paragraph(baseObject.AutoPropertyObject):
                     direction=_("backward") if reverse else _("forward")
                 )
             )
-            
+
     def findRegexp(self, regexp, caseSensitive=False,reverse=False):
+        for p in self.findAllRegexp(regexp, caseSensitive=caseSensitive, reverse=reverse):
+            return p
+        raise NotFoundError(
+            _("Regexp text not found: tried to search for '{text}' {direction}.").format(
+                text=regexp,
+                direction=_("backward") if reverse else _("forward")
+            )
+        )
+
+    def findAllRegexp(self, regexp, caseSensitive=False,reverse=False):
+        """
+            Yields all paragraphs matching regexp in given direction, starting from the paragraph next to this one.
+            In virtual buffers a cached snapshot of document text tells which lines might match,
+            so that only paragraphs overlapping those lines are retrieved from the buffer.
+        """
         if isinstance(regexp, str):
-            regexp = re.compile(regexp, flags=0 if caseSensitive else re.IGNORECASE)
+            regexp = compileRegexp(regexp, caseSensitive)
         direction = -1 if reverse else 1
-        p = self
-        while True:
-            try:
-                p = p.move(direction)
-            except NotFoundError:
-                raise NotFoundError(
-                    _("Regexp text not found: tried to search for '{text}' {direction}.").format(
-                        text=regexp,
-                        direction=_("backward") if reverse else _("forward")
-                    )
-                )
-            if regexp.search(p.text) is not None:
-                return p
-            
+        buf = self.textInfo.obj
+        snapshot = documentIndex.getDocumentText(buf)
+        if snapshot is None:
+            p = self
+            while True:
+                try:
+                    p = p.move(direction)
+                except NotFoundError:
+                    return
+                if regexp.search(p.text) is not None:
+                    yield p
+        offset = self.textInfo._endOffset if direction > 0 else self.textInfo._startOffset
+        for info, text in documentIndex.iterMatchingParagraphs(buf, snapshot, regexp, offset, direction):
+            p = Paragraph(info, _normalize=False)
+            p._cacheGeneration = snapshot.generation
+            p._text = text
+            yield p
+
+    def _iter(self, direction, limit=None, predicate=None):
+        """
+            Steps over paragraphs exactly like repeated move(direction), moving a single textInfo along.
+            In virtual buffers yielded paragraphs take their text from cached document snapshot
+            and only create their own textInfo when it is asked for.
+        """
+        buf = self._buf
+        count = 0
+        if not documentIndex.isIndexable(buf):
+            p = self
+            while limit is None or count < limit:
+                count += 1
+                try:
+                    p = p.move(direction)
+                except NotFoundError:
+                    return
+                if predicate is None or predicate(p):
+                    yield p
+            return
+        info = self.textInfo.copy()
+        offset = direction
+        if self._end is False:
+            # At home position the first paragraph is reached without moving, see move()
+            if direction < 0:
+                return
+            offset = 0
+        while limit is None or count < limit:
+            count += 1
+            if info.move(textInfos.UNIT_PARAGRAPH, offset) != offset:
+                return
+            offset = direction
+            info.expand(textInfos.UNIT_PARAGRAPH)
+            p = Paragraph._fromOffsets(buf, info._startOffset, info._endOffset, documentIndex.getDocumentText(buf))
+            if predicate is None or predicate(p):
+                yield p
+
+    def iterForward(self, limit=None, predicate=None):
+        """
+            Yields paragraphs following this one.
+            limit - maximum number of paragraphs to step over.
+            predicate - if specified, only paragraphs for which it returns True are yielded.
+        """
+        return self._iter(1, limit=limit, predicate=predicate)
+
+    def iterBackward(self, limit=None, predicate=None):
+        """
+            Yields paragraphs preceding this one, nearest first. See iterForward.
+        """
+        return self._iter(-1, limit=limit, predicate=predicate)
+
     def quickNavGenerator(self, itemType, reverse=False):
         info = self.textInfo.copy()
         info.collapse(end=not reverse)
@@ -172,6 +314,18 @@ class Paragraph(baseObject.AutoPropertyObject):
         iterFactory = vBuf._iterNodesByType(itemType,direction=direction,pos=info)
         return iterFactory
 
+    def iterQuickNav(self, itemType, reverse=False, limit=None, predicate=None):
+        """
+            Yields QuickNav items of given type, such as "heading" or "link", in given direction.
+            limit - maximum number of items to step over.
+        """
+        gen = self.quickNavGenerator(itemType, reverse)
+        for count, item in enumerate(gen):
+            if limit is not None and count >= limit:
+                return
+            if predicate is None or predicate(item):
+                yield item
+
     def findQuickNav(self, itemType, reverse=False):
         gen = self.quickNavGenerator(itemType, reverse)
         try:
@@ -5,7 +5,7 @@
 
 import api
 import browseMode
-from collections import namedtuple, defaultdict
+from collections import namedtuple, defaultdict, OrderedDict
 from contextlib import ExitStack
 import controlTypes
 from controlTypes import OutputReason
@@ -14,7 +14,6 @@ import core
 import dataclasses
 from dataclasses import dataclass
 import diffHandler
-import difflib as dl
 from enum import Enum
 import functools
 import globalVars
@@ -28,6 +27,7 @@ from logHandler import log
 import math
 import os
 import re
+import sys
 import textInfos
 import threading
 import time
@@ -39,7 +39,6 @@ import wx
 import addonHandler
 from .addonConfig import getConfig
 import uuid
-import requests
 import scriptHandler
 
 addonHandler.initTranslation()
@@ -49,8 +48,17 @@ sonifyTextInfo = None # Due to import error we set this value from __init__
 from .constants import *
 from . beeper import *
 from . import utils
+from .autoSpeakDiff import AutoSpeakMode, diffAndExtractInterestingLines, computeAutoSpeakUpdate
+from . import documentIndex
+from .documentState import registry
+from . import liveRegion
 from .editor import EditTextDialog
 from .paragraph import Paragraph, NotFoundError, ScriptError, textInfoRange, pump, retry, getFocusTextInfo, getFocusParagraph
+from . import scriptProfiler
+from .tracing import tracer
+from .watchdog import watchdog
+from .sampler import profiler
+from .websiteStore import WebsiteStore
 import types
 import ast
 import inspect
@@ -62,17 +70,6 @@ except AttributeError:
 
 
 
-debug = False
-if debug:
-    def mylog(s):
-        if debug:
-            f = open("C:\\Users\\tony\\od\\2.txt", "a", encoding='utf-8')
-            print(str(s), file=f)
-            f.flush()
-            f.close()
-else:
-    def mylog(s):
-        pass
 
 
 class QuickJumpScriptException(Exception):
@@ -172,13 +169,22 @@ focusModeNames = {
 class LiveRegionMode(Enum):
     UNCHANGED = 0
     MUTE_LIVE_REGION = 1
+    THROTTLE_LIVE_REGION = 2
 
 
 liveRegionModeNames = {
     LiveRegionMode.UNCHANGED: _("Speak live regions"),
     LiveRegionMode.MUTE_LIVE_REGION: _("Mute live regions"),
+    LiveRegionMode.THROTTLE_LIVE_REGION: _("Throttle live regions: drop repeated updates and combine bursts"),
 }
 
+# When several sites match, the most restrictive mode wins
+liveRegionModePriority = [
+    LiveRegionMode.UNCHANGED,
+    LiveRegionMode.THROTTLE_LIVE_REGION,
+    LiveRegionMode.MUTE_LIVE_REGION,
+]
+
 class DebugBeepMode(Enum):
     NO_BEEPS = 0
     ON_FOCUS = 1
@@ -213,14 +219,6 @@ class ParagraphAttribute(Enum):
     BOLD = 'bold'
     ITALIC = 'italic'
 
-class AutoSpeakMode(Enum):
-    OFF = 'off'
-    PARAGRAPH_DIFF = 'paragraph_diff'
-    WORD_DIFF = 'word_diff'
-    CHIME_ON_ADD = 'chime_on_add'
-    CHIME_ON_REMOVE = 'chime_on_remove'
-    CHIME_ON_CHANGE = 'chime_on_change'
-
 autoSpeakModeNames = {
     AutoSpeakMode.OFF: _("AutoSpeak disabled"),
     AutoSpeakMode.PARAGRAPH_DIFF: _("Speak changed paragraphs"),
@@ -468,9 +466,9 @@ class QJBookmark(QJImmutable):
         if not self.isSnippetEmpty():
             execLocals = {}
             try:
-                compiled = compile(wrapPythonCode(self.snippet), "<bookmarkScript>", 'exec', ast.PyCF_ONLY_AST)
+                compiled = compile(wrapPythonCode(self.snippet), scriptProfiler.SCRIPT_FILENAME, 'exec', ast.PyCF_ONLY_AST)
                 ast.increment_lineno(compiled, -1)
-                bytecode = compile(compiled, "<bookmarkScript>", 'exec', dont_inherit=True)
+                bytecode = compile(compiled, scriptProfiler.SCRIPT_FILENAME, 'exec', dont_inherit=True)
                 exec(bytecode, execGlobals, execLocals)
                 scriptFunc = execLocals['quickJumpScript']
                 #bytecode = compile(wrapPythonCode(self.snippet), "<bookmarkScript>", "exec")
@@ -666,10 +664,8 @@ defaultRulesFileName = os.path.join(
 def loadConfig():
     try:
         rulesConfig = open(rulesFileName, "r").read()
-        mylog(rulesFileName)
     except FileNotFoundError:
         rulesConfig = open(defaultRulesFileName, "r").read()
-        mylog(defaultRulesFileName)
     result = QJConfig(json.loads(rulesConfig))
     saveConfig(result)
     return result
@@ -765,11 +761,10 @@ def getLiveRegionMode(url, config):
     sites = findSites(url, config)
     if len(sites) == 0:
         return LiveRegionMode.UNCHANGED
-    mode = max([
-        site.liveRegionMode.value
-        for site in sites
-    ])
-    return LiveRegionMode(mode)
+    return max(
+        [site.liveRegionMode for site in sites],
+        key=liveRegionModePriority.index,
+    )
 
 
 def getDebugBeepModes(url, config):
@@ -837,15 +832,11 @@ def getSuppressTreeLevel(url, config):
 def getUrl(self=None, onlyFromCache=False):
     return api.getCurrentURL() or ""
 
-@functools.lru_cache()
-def getBookmarksWithKeystrokesForUrl(url, config, keystroke, category=None):
-    sites = findSites(url, config)
-    result = []
-    for site in sites:
-        for bookmark in getBookmarksWithKeystrokesForSite(site).get(keystroke, []):
-            if category is None or category == bookmark.category:
-                result.append(bookmark)
-    return result
+def getSiteForTracing(url):
+    # Domains rather than full URLs, so that histograms are aggregated per site
+    if not url:
+        return "-"
+    return getDomain(url) or url
 
 @functools.lru_cache()
 def getBookmarksWithKeystrokesForSite(site):
@@ -900,12 +891,28 @@ def new_event_gainFocus(self, obj, nextHandler):
     return original_event_gainFocus(self, obj, nextHandler)
 
 originalReportLiveRegion = None
-@ctypes.WINFUNCTYPE(ctypes.c_long, ctypes.c_wchar_p, ctypes.c_wchar_p)
-def newReportLiveRegion(text: str, politeness: str):
-    # We need to figure out current URL, however this can only be done from the main thread.
-    # And this callback is not running in the main thread.
-    # I haven't found a way to schedule a call to main thread, since core.callLater runs in a different thread.
-    # So we use cached value since there is no other good option.
+
+class LiveRegionPolicy:
+    def __init__(self, url, config):
+        self.url = url
+        self.config = config
+        self.beep = url is not None and DebugBeepMode.ON_LIVE_REGION in getDebugBeepModes(url, config)
+        self.mode = LiveRegionMode.UNCHANGED if url is None else getLiveRegionMode(url, config)
+        self.throttler = None
+        if self.mode == LiveRegionMode.THROTTLE_LIVE_REGION:
+            self.throttler = getLiveRegionThrottler(tuple(findSites(url, config)))
+
+@functools.lru_cache(maxsize=16)
+def getLiveRegionThrottler(sites):
+    return liveRegion.LiveRegionThrottler(
+        emit=lambda text, politeness: originalReportLiveRegion(text, politeness),
+        # Flushing from the main thread, since timers can only be started there
+        schedule=lambda delayMs, func: wx.CallAfter(core.callLater, delayMs, func),
+        minInterval=getConfig("liveRegionMinIntervalMs") / 1000,
+        dedupWindow=getConfig("liveRegionDedupWindowMs") / 1000,
+    )
+
+def computeLiveRegionPolicy():
     obj = api.getFocusObject()
     url = None
     try:
@@ -914,19 +921,73 @@ def newReportLiveRegion(text: str, politeness: str):
             url = getUrl(interceptor, onlyFromCache=True)
     except AttributeError:
         pass
-    if url is not None:
-        if DebugBeepMode.ON_LIVE_REGION in getDebugBeepModes(url, globalConfig):
-            tones.beep(500, 50)
-        if LiveRegionMode.MUTE_LIVE_REGION == getLiveRegionMode(url, globalConfig):
-            # Skipping!
-            return -1
+    return LiveRegionPolicy(url, globalConfig)
+
+# Live region policy of currently focused document.
+# Recomputed on the main thread on every focus or URL change, and read without locking from the RPC thread:
+# assigning a reference is atomic.
+liveRegionPolicy = None
+
+def updateLiveRegionPolicy():
+    global liveRegionPolicy
+    liveRegionPolicy = computeLiveRegionPolicy()
+
+def resetLiveRegionThrottlers():
+    getLiveRegionThrottler.cache_clear()
+    updateLiveRegionPolicy()
+
+@ctypes.WINFUNCTYPE(ctypes.c_long, ctypes.c_wchar_p, ctypes.c_wchar_p)
+def newReportLiveRegion(text: str, politeness: str):
+    # This callback is not running in the main thread, and current URL can only be figured out from the main thread.
+    # So we use policy cached on last focus change; if config has been edited since then, we compute it here using cached URL.
+    policy = liveRegionPolicy
+    if policy is None or policy.config is not globalConfig:
+        policy = computeLiveRegionPolicy()
+    if policy.beep:
+        tones.beep(500, 50)
+    if policy.mode == LiveRegionMode.MUTE_LIVE_REGION:
+        # Skipping!
+        return -1
+    if policy.throttler is not None:
+        return 0 if policy.throttler.submit(text, politeness) else -1
     return originalReportLiveRegion(text, politeness)
 
 asyncAutoclickCounter = 0
+class RecentIds:
+    """
+        Set that only remembers maxSize most recently added IDs, so that it doesn't grow forever on long-lived pages.
+    """
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.ids = OrderedDict()
+
+    def __contains__(self, id):
+        return id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, id):
+        self.ids[id] = None
+        self.ids.move_to_end(id)
+        while len(self.ids) > self.maxSize:
+            self.ids.popitem(last=False)
+
+maxClickedIds = 5000
+
 def asyncAutoclick(self, asyncAutoclickCounterLocal, site):
+    """
+        In continuous mode a pass is skipped unless virtual buffer has been updated since the previous pass.
+        Every pass scans only paragraphs whose text might match a bookmark according to text snapshot.
+        Objects that have already been clicked are remembered by IA2UniqueID and not clicked again,
+        so that a new element is clicked even if an old one with the same text is still on the page;
+        only the most recent maxClickedIds of them are remembered.
+    """
     global asyncAutoclickCounter
     yield site.autoClickOnFocusDelay
     category = site.autoClickCategory
+    lastGeneration = None
+    clickedIds = RecentIds(maxClickedIds)
     while True:
         if asyncAutoclickCounter != asyncAutoclickCounterLocal:
             return
@@ -936,12 +997,29 @@ def asyncAutoclick(self, asyncAutoclickCounterLocal, site):
                 return
         except AttributeError:
             return
-        autoClick(
+        paragraphs = None
+        bookmarks = findApplicableBookmarks(category=category, site=site)
+        # A single pass scans the whole document anyway, so text snapshot is only worth building in continuous mode
+        snapshot = documentIndex.getDocumentText(self) if site.autoClickContinuous else None
+        if snapshot is not None:
+            if snapshot.generation == lastGeneration:
+                yield site.autoClickContinuousDelay
+                continue
+            lastGeneration = snapshot.generation
+            paragraphs = documentIndex.iterCandidateParagraphs(self, snapshot, [
+                regex
+                for regex in map(compileBookmarkRegex, bookmarks)
+                if regex is not None
+            ])
+        _autoClick(
             self,
             gesture=None,
-            category=category,
+            bookmarks=bookmarks,
             site=site,
-            automated=True
+            automated=True,
+            category=category,
+            paragraphs=paragraphs,
+            clickedIds=clickedIds if site.autoClickContinuous else None,
         )
         if site.autoClickContinuous:
             yield site.autoClickContinuousDelay
@@ -974,7 +1052,19 @@ class AutoSpeakCacheEntry:
         self.lines = lines
         self.enabled = True
 
-AutoSpeakCache = weakref.WeakKeyDictionary()
+    def estimateSize(self):
+        return sum(sys.getsizeof(line) for line in self.lines)
+
+class AutoSpeakCache(dict):
+    """
+        Maps autoSpeak bookmark to AutoSpeakCacheEntry.
+        If previous cache of the document has been evicted due to memory budget,
+        the first pass only records lines, otherwise all matching lines would be spoken as new.
+    """
+    def __init__(self, rebaseline=False):
+        super().__init__()
+        self.rebaseline = rebaseline
+
 def onVirtualBufferUpdate(browse):
     url = getUrl(browse, onlyFromCache=True)
     if url is None:
@@ -984,11 +1074,10 @@ def onVirtualBufferUpdate(browse):
         return
     launchAutoSpeak = False
     with AutoSpeakStatesLock:
-        try:
-            state = AutoSpeakStates[browse]
-        except KeyError:
+        state = registry.get(browse, "autoSpeakState")
+        if state is None:
             state = AutoSpeakState(isVirtualBufferUpdated=False, isAutoSpeakHandlerRunning=False)
-            AutoSpeakStates[browse] = state
+            registry.set(browse, "autoSpeakState", state, pinned=True)
         flag = state.isVirtualBufferUpdated
         isRunning = state.isAutoSpeakHandlerRunning
         state.isVirtualBufferUpdated = True
@@ -997,11 +1086,10 @@ def onVirtualBufferUpdate(browse):
             return
         else:
             # Launch autoSpeak function
-            try:
-                cacheEntry = AutoSpeakCache[browse]
-            except KeyError:
-                cacheEntry = {}
-                AutoSpeakCache[browse] = cacheEntry
+            cacheEntry = registry.get(browse, "autoSpeakCache")
+            if cacheEntry is None:
+                cacheEntry = AutoSpeakCache(rebaseline=registry.wasEvicted(browse, "autoSpeakCache"))
+                registry.set(browse, "autoSpeakCache", cacheEntry)
             state.isAutoSpeakHandlerRunning = True
             launchAutoSpeak = True
     if launchAutoSpeak:
@@ -1010,47 +1098,17 @@ def onVirtualBufferUpdate(browse):
 def processAutoSpeakbookmark(browse, bookmark, textToSpeak, cachedLines):
     if not cachedLines.enabled:
         return
-
-    firstUtterance = True
-    if bookmark.autoSpeakMode == AutoSpeakMode.PARAGRAPH_DIFF:
-        for line in diffAndExtractInterestingLines(cachedLines.lines, textToSpeak):
-            if line[0] in "!+":
-                line = line[1:]
-                def speak(firstUtterance):
-                    if firstUtterance:
-                        speech.cancelSpeech()
-                    speech.speakText(line)
-                wx.CallAfter(speak, firstUtterance)
-    elif bookmark.autoSpeakMode.value.startswith("chime"):
-        filterByType = {
-            AutoSpeakMode.CHIME_ON_ADD: "+",
-            AutoSpeakMode.CHIME_ON_REMOVE: "-",
-            AutoSpeakMode.CHIME_ON_CHANGE: "+-!"
-        }
-        filter = filterByType[bookmark.autoSpeakMode]
-        passes = any(line[0] in filter for line in diffAndExtractInterestingLines(cachedLines.lines, textToSpeak))
-        if passes:
-            playBiw(bookmark)
-
-
+    linesToSpeak, chime = computeAutoSpeakUpdate(bookmark.autoSpeakMode, cachedLines.lines, textToSpeak)
+    if len(linesToSpeak) > 0:
+        def speakLines(lines):
+            speech.cancelSpeech()
+            for line in lines:
+                speech.speakText(line)
+        wx.CallAfter(speakLines, linesToSpeak)
+    if chime:
+        playBiw(bookmark)
     cachedLines.lines = textToSpeak
 
-def diffAndExtractInterestingLines(s1, s2):
-    if isinstance(s1, str):
-        s1 = s1.splitlines()
-    if isinstance(s2, str):
-        s2 = s2.splitlines()
-    mode = '0'
-    for line in dl.context_diff(s1, s2):
-        if line.startswith('***'):
-            mode = 'old'
-        elif line.startswith('---'):
-            mode = 'new'
-        elif mode == 'new' and len(line) > 0 and line[0] in {'!', '+'}:
-            yield line
-        elif mode == 'old' and len(line) > 0 and line[0] in {'-'}:
-            yield line
-
 def playBiw(bookmark=None, earcon=None, volume=None):
     thread = threading.Thread(target=lambda: playBiwInThread(bookmark, earcon, volume))
     thread.start()
@@ -1098,10 +1156,9 @@ def getTextFast(info):
     return "\r\n".join(text)
 
 
-wpdCache = weakref.WeakKeyDictionary()
 WPDCacheEntry = namedtuple('WPDCacheEntry', ['text'])
 def processWholePageDiff(browse, url):
-    entry = wpdCache.get(browse, None)
+    entry = registry.get(browse, "wholePageDiff")
     info = browse.makeTextInfo(textInfos.POSITION_ALL)
     c1 = time.time()
     #newText = info.clipboardText
@@ -1127,7 +1184,7 @@ def processWholePageDiff(browse, url):
             modify='!' in kinds,
             delete='-' in kinds,
         )
-    wpdCache[browse] = WPDCacheEntry(text = newText)
+    registry.set(browse, "wholePageDiff", WPDCacheEntry(text = newText))
 
 earconDelete = "3d/center.wav"
 earconModify = "3d/search-hit.wav"
@@ -1212,43 +1269,104 @@ def getKeystrokeFromGesture(gesture):
     return keystroke
 
 
+KeystrokeAction = namedtuple('KeystrokeAction', ['quickJumpBookmarks', 'quickJumpDirection', 'quickClickBookmarks', 'quickSpeakBookmarks', 'scriptBookmarks'])
+
+keystrokeHandlerGroups = ["QUICK_JUMP", "QUICK_CLICK", "QUICK_SPEAK", "SCRIPT"]
+categoryHandlerGroups = {
+    category: next((group for group in keystrokeHandlerGroups if category.name.startswith(group)), None)
+    for category in BookmarkCategory
+}
+
+class KeystrokeDispatchTable:
+    """
+        Maps keystrokes to bookmarks of a set of sites, grouped by handler.
+        Table is keyed by keystroke with shift stripped, since shift reverses QuickJump direction.
+        This way keystrokes without any bookmarks cost a single dict miss.
+    """
+    def __init__(self, sites):
+        self.bookmarksByKeystroke = {}
+        for site in sites:
+            for keystroke, bookmarks in getBookmarksWithKeystrokesForSite(site).items():
+                self.bookmarksByKeystroke.setdefault(keystroke, []).extend(bookmarks)
+        # Maps keystroke with shift stripped to actions of exact keystrokes
+        self.table = {}
+        for keystroke in self.bookmarksByKeystroke:
+            self.table.setdefault(keystroke.replace('shift+', ''), {})[keystroke] = self.makeAction(keystroke)
+
+    def makeAction(self, keystroke):
+        bookmarks = self.bookmarksByKeystroke.get(keystroke, [])
+        if "shift+" in keystroke:
+            quickJumpDirection = -1
+            quickJumpBookmarks = self.bookmarksByKeystroke.get(keystroke.replace('shift+', ''), [])
+        else:
+            quickJumpDirection = 1
+            quickJumpBookmarks = bookmarks
+        groups = {group: [] for group in keystrokeHandlerGroups}
+        for bookmark in quickJumpBookmarks:
+            if categoryHandlerGroups[bookmark.category] == "QUICK_JUMP":
+                groups["QUICK_JUMP"].append(bookmark)
+        for bookmark in bookmarks:
+            group = categoryHandlerGroups[bookmark.category]
+            if group is not None and group != "QUICK_JUMP":
+                groups[group].append(bookmark)
+        if not any(groups.values()):
+            return None
+        return KeystrokeAction(
+            quickJumpBookmarks=tuple(groups["QUICK_JUMP"]),
+            quickJumpDirection=quickJumpDirection,
+            quickClickBookmarks=tuple(groups["QUICK_CLICK"]),
+            quickSpeakBookmarks=tuple(groups["QUICK_SPEAK"]),
+            scriptBookmarks=tuple(groups["SCRIPT"]),
+        )
+
+    def getAction(self, keystroke):
+        actions = self.table.get(keystroke.replace('shift+', ''))
+        if actions is None:
+            return None
+        try:
+            return actions[keystroke]
+        except KeyError:
+            # Shifted variant of a keystroke that only has unshifted bookmarks
+            action = self.makeAction(keystroke)
+            actions[keystroke] = action
+            return action
+
+@functools.lru_cache(maxsize=64)
+def getKeystrokeDispatchTableForSites(sites):
+    return KeystrokeDispatchTable(sites)
+
+@functools.lru_cache(maxsize=128)
+def getKeystrokeDispatchTable(url, config):
+    return getKeystrokeDispatchTableForSites(tuple(findSites(url, config)))
+
 originalGetAlternativeScript = None
 def postGetAlternativeScript(self,gesture,script):
     result = originalGetAlternativeScript(self,gesture,script)
-    bookmarkExecuted = False
-    keystroke = getKeystrokeFromGesture(gesture)
     url = getUrl(self, onlyFromCache=True)
     if url is None:
         return result
-    bookmarks = getBookmarksWithKeystrokesForUrl(url, globalConfig, keystroke)
-    mylog(f"{keystroke} >> {url} b={len(bookmarks)}")
-    if "shift+" in keystroke:
-        quickJumpKeystroke = keystroke.replace('shift+', '')
-        quickJumpDirection = -1
-        quickJumpBookmarks = getBookmarksWithKeystrokesForUrl(url, globalConfig, quickJumpKeystroke)
-    else:
-        quickJumpDirection = 1
-        quickJumpBookmarks = bookmarks
-
-    quickJumpBookmarks = tuple(b for b in quickJumpBookmarks if b.category.name.startswith("QUICK_JUMP"))
-    quickClikBookmarks = tuple(b for b in bookmarks if b.category.name.startswith("QUICK_CLICK"))
-    quickSpeakBookmarks = tuple(b for b in bookmarks if b.category.name.startswith("QUICK_SPEAK"))
-    scriptBookmarks = tuple(b for b in bookmarks if b.category.name.startswith("SCRIPT"))
+    keystroke = getKeystrokeFromGesture(gesture)
+    action = getKeystrokeDispatchTable(url, globalConfig).getAction(keystroke)
+    if action is None:
+        return result
 
     def keystroke_script(gesture):
-        if len(quickJumpBookmarks) > 0:
-            _quickJump(self, gesture, quickJumpBookmarks, direction=quickJumpDirection, errorMsg=_("No next QuickJump result. To configure QuickJump rules, please go to BrowserNav settings in NVDA configuration window."))
-        if len(quickClikBookmarks) > 0:
-            _autoClick(self, gesture, quickClikBookmarks, category=quickClikBookmarks[0].category)
-        if len(quickSpeakBookmarks) > 0:
-            _autoClick(self, gesture, quickSpeakBookmarks, category=quickSpeakBookmarks[0].category)
-        if len(scriptBookmarks) > 0:
-            _runScriptBookmarks(self, gesture, scriptBookmarks)
+        name = f"keystroke {keystroke}"
+        site = getSiteForTracing(url) if watchdog.enabled or tracer.enabled else None
+        with watchdog.command(name, site), tracer.command(name, site), profiler.active():
+            runKeystrokeAction(gesture)
+
+    def runKeystrokeAction(gesture):
+        if len(action.quickJumpBookmarks) > 0:
+            _quickJump(self, gesture, action.quickJumpBookmarks, direction=action.quickJumpDirection, errorMsg=_("No next QuickJump result. To configure QuickJump rules, please go to BrowserNav settings in NVDA configuration window."))
+        if len(action.quickClickBookmarks) > 0:
+            _autoClick(self, gesture, action.quickClickBookmarks, category=action.quickClickBookmarks[0].category)
+        if len(action.quickSpeakBookmarks) > 0:
+            _autoClick(self, gesture, action.quickSpeakBookmarks, category=action.quickSpeakBookmarks[0].category)
+        if len(action.scriptBookmarks) > 0:
+            _runScriptBookmarks(self, gesture, action.scriptBookmarks)
     keystroke_script.__doc__ = _("BrowserNav temporary action configured only for this website.")
-    if len(quickJumpBookmarks) + len(quickClikBookmarks) + len(quickSpeakBookmarks) + len(scriptBookmarks) > 0:
-        return keystroke_script
-    else:
-        return result
+    return keystroke_script
 
 @functools.lru_cache()
 def getRegexForBookmark(rule):
@@ -1261,83 +1379,95 @@ def getRegexForBookmark(rule):
     else:
         raise Exception("Impossible!")
 
-NAMED_REGEX_PREFIX = "QJ_"
 BookmarkMatch = namedtuple('BookmarkMatch', ['bookmark', 'text', 'start', 'end'])
+
+@functools.lru_cache(maxsize=1000)
+def compileBookmarkRegex(bookmark):
+    try:
+        return re.compile(getRegexForBookmark(bookmark))
+    except re.error:
+        log.error(f"Failed to compile regular expression for bookmark {bookmark.getDisplayName()}", exc_info=True)
+        return None
+
+class BookmarkMatcher:
+    """
+        Matches a tuple of bookmarks against paragraph text.
+        Each bookmark pattern is compiled separately, so that its own flags apply.
+        Bookmarks requiring a literal that is absent from the text are rejected by a plain substring check without running their regex.
+    """
+    def __init__(self, bookmarks):
+        self.entries = []
+        for i, bookmark in enumerate(bookmarks):
+            regex = compileBookmarkRegex(bookmark)
+            if regex is None:
+                continue
+            literal = documentIndex.extractRequiredLiteral(regex)
+            ignoreCase = (regex.flags & re.IGNORECASE) != 0
+            if literal is not None and ignoreCase:
+                # Case insensitive prefiltering is only reliable for ASCII
+                literal = literal.lower() if literal.isascii() else None
+            self.entries.append((i, bookmark, regex, literal, ignoreCase))
+
+    def matchAll(self, text):
+        lowerText = None
+        matches = []
+        for i, bookmark, regex, literal, ignoreCase in self.entries:
+            if literal is not None:
+                if ignoreCase:
+                    if lowerText is None:
+                        lowerText = text.lower()
+                    if literal not in lowerText:
+                        continue
+                elif literal not in text:
+                    continue
+            m = regex.search(text)
+            if m is None:
+                continue
+            matches.append((m.start(), i, BookmarkMatch(
+                bookmark=bookmark,
+                text=m.group(0),
+                start=m.start(),
+                end=m.end(),
+            )))
+        # Leftmost match first; bookmarks matching at the same position are ordered as configured
+        matches.sort(key=lambda item: item[:2])
+        return [match for _start, _i, match in matches]
+
 @functools.lru_cache()
-def makeCompositeRegex(bookmarks):
-    # Using named groups in regular expression to identify which bookmark has matched
-    re_string = "|".join([
-        f"(?P<{NAMED_REGEX_PREFIX}{i}>{getRegexForBookmark(bookmark)})"
-        for i,bookmark in enumerate(bookmarks)
-    ])
-    mylog(f"re_string={re_string}")
-    return re_compile(re_string)
+def getBookmarkMatcher(bookmarks):
+    return BookmarkMatcher(bookmarks)
 
 def matchWidthCompositeRegex(bookmarks, text):
-    m = makeCompositeRegex(bookmarks).search(text)
-    if m is None:
+    matches = getBookmarkMatcher(bookmarks).matchAll(text)
+    if len(matches) == 0:
         return None
-    matchIndices = [
-        int(key[len(NAMED_REGEX_PREFIX):])
-        for key, value in m.groupdict().items()
-        if key.startswith(NAMED_REGEX_PREFIX)
-            and value is not None
-    ]
-    #mylog(f"matchIndices={matchIndices}")
-    if len(matchIndices) == 0:
-        return
-    i = matchIndices[0]
-
-    groupName = f"{NAMED_REGEX_PREFIX}{i}"
-    #mylog(f"i={i}")
-    #mylog(f"groupName={groupName}")
-    return BookmarkMatch(
-        bookmark=bookmarks[i],
-        text=m.group(groupName),
-        start=m.start(groupName),
-        end=m.end(groupName),
-    )
+    return matches[0]
+
 def matchAllWidthCompositeRegex(bookmarks, text):
-    result = []
-    while True:
-        m = matchWidthCompositeRegex(bookmarks, text)
-        if not m:
-            return result
-        result.append(m)
-        bookmarks = tuple([
-            b
-            for b in bookmarks
-            if b != m.bookmark
-        ])
+    return getBookmarkMatcher(bookmarks).matchAll(text)
 
 def matchTextAndAttributes(bookmarks, textInfo, distance=None):
-    text = textInfo.text
-    text = text.rstrip("\r\n")
-    #mylog(f"matchTextAndAttributes '{text}'")
-    matches = matchAllWidthCompositeRegex(bookmarks, text)
+    with tracer.span("match"):
+        text = textInfo.text
+        text = text.rstrip("\r\n")
+        matches = matchAllWidthCompositeRegex(bookmarks, text)
     attrs = None
     for m in matches:
         bookmark = m.bookmark
-        #mylog(f"bookmark={bookmark.getDisplayName()}")
-        #mylog(f"bookmark has {len(bookmark.attributes)} attribute filters.")
-        #mylog(f"Bookmark is snippet empty: {bookmark.isSnippetEmpty()}")
         if distance is not None and bookmark.offset * distance < 0:
             # offset is in the opposite direction to current movement direction
             if abs(distance) <= abs(bookmark.offset):
-                #mylog("# We don't want to hit the anchor of current bookmark again")
                 # We don't want to hit the anchor of current bookmark again
                 continue
         if len(bookmark.attributes) > 0:
             if attrs is None:
-                attrs = extractAttributesSet(textInfo)
+                with tracer.span("attributes"):
+                    attrs = extractAttributesSet(textInfo)
         if all([
             am.matches(attrs)
             for am in bookmark.attributes
         ]):
-            #mylog("Yield!")
             yield m
-        #mylog("Didn't match attributes")
-    #mylog("Done matchTextAndAttributes")
 
 @functools.lru_cache()
 def findApplicableBookmarks(
@@ -1380,8 +1510,10 @@ def findApplicableBookmarksOrderedByOffset(*args, **kwargs):
         result[bookmark.offset] = l
     return {k:tuple(v) for k,v in result.items()}
 def extractAttributesSet(textInfo):
+    return extractAttributesSetFromFields(textInfo.getTextWithFields())
+
+def extractAttributesSetFromFields(fields):
     result = set()
-    fields = textInfo.getTextWithFields()
     for field in fields:
         if not isinstance(field, textInfos.FieldCommand):
             continue
@@ -1445,8 +1577,9 @@ def extractDefaultAttributeMatches(textInfo):
     return result
 
 def moveParagraph(textInfo, offset):
-    result = textInfo.move(textInfos.UNIT_PARAGRAPH, offset)
-    textInfo.expand(textInfos.UNIT_PARAGRAPH)
+    with tracer.span("scan"):
+        result = textInfo.move(textInfos.UNIT_PARAGRAPH, offset)
+        textInfo.expand(textInfos.UNIT_PARAGRAPH)
     return result
 
 def shouldSkipClutter(textInfo, allBookmarks):
@@ -1508,19 +1641,15 @@ def runScriptAndApplyOffset(textInfo, match, skipClutterBookmarks=None, level=No
     """
     bookmark = match.bookmark
     textInfo = textInfo.copy()
-    mylog(f"q has bytecode {bookmark.bytecode is not None}")
     if bookmark.scriptFunc is None:
         offset = bookmark.offset
-        mylog(f"q offset={offset}")
         if offset == 0:
             textInfo.collapse()
             textInfo.move(textInfos.UNIT_CHARACTER, match.start)
             textInfo.move(textInfos.UNIT_CHARACTER, len(match.text), endPoint='end')
             return (textInfo, bookmark.message, textInfo)
         else:
-            mylog("q3")
             result = moveParagraphWithSkipClutter(None, textInfo, offset, skipClutterBookmarks=skipClutterBookmarks)
-            mylog(f"q4 {result}")
             if result == offset:
                 return (textInfo, bookmark.message, textInfo)
 
@@ -1529,7 +1658,6 @@ def runScriptAndApplyOffset(textInfo, match, skipClutterBookmarks=None, level=No
             e = QuickJumpScriptException(f"Please set offset to 0 for bookmark '{bookmark.getDisplayName()}' in order to execute script.")
             log.error(e)
             raise e
-        mylog(f"q compileError present: {bookmark.compileError is not None}")
         if bookmark.compileError is not None:
             e = QuickJumpScriptException(f"Failed to compile snippet for  bookmark '{bookmark.getDisplayName()}'.", bookmark.compileError)
             log.error(e)
@@ -1557,7 +1685,13 @@ def runScriptAndApplyOffset(textInfo, match, skipClutterBookmarks=None, level=No
         try:
             #exec(bookmark.bytecode, thisExecGlobals, execLocals)
             scriptFunc = bookmark.scriptFunc
-            result = scriptFunc(p=p, t=t, match=match, level=level, modifiers=modifiers)
+            budget = scriptProfiler.ScriptBudget(bookmark)
+            if inspect.isgeneratorfunction(scriptFunc):
+                # Generator scripts don't run until iterated
+                result = budget.timeSteps(scriptFunc(p=p, t=t, match=match, level=level, modifiers=modifiers))
+            else:
+                with budget:
+                    result = scriptFunc(p=p, t=t, match=match, level=level, modifiers=modifiers)
             if isinstance(result, types.GeneratorType):
                 allowGeneratorScripts = bookmark.category in [
                     BookmarkCategory.SCRIPT,
@@ -1639,15 +1773,11 @@ def runScriptAndApplyOffset(textInfo, match, skipClutterBookmarks=None, level=No
     return (None, None, None)
 
 def matchAndScript(bookmarks, skipClutterBookmarks, textInfo):
-    #mylog("matchAndScript start")
     for match in matchTextAndAttributes(bookmarks, textInfo):
-        #mylog("q1")
-        result, message, xLocation = runScriptAndApplyOffset(textInfo, match, skipClutterBookmarks)
-        #mylog("q2")
+        with tracer.span("script"):
+            result, message, xLocation = runScriptAndApplyOffset(textInfo, match, skipClutterBookmarks)
         if result  is not None:
-            #mylog("matchAndScript Result is not None :(")
             return result, message, xLocation, match
-    #mylog("matchAndScript Result is  None :(")
     return None, None, None, None
 
 def isMatchInRightDirection(oldSelection, direction, textInfo):
@@ -1661,8 +1791,9 @@ def isMatchInRightDirection(oldSelection, direction, textInfo):
     return direction * cmp < 0
 
 def getBookmarksForCategory(self, category):
-    url = getUrl(self)
-    bookmarks = findApplicableBookmarks(globalConfig, url, category)
+    with tracer.span("lookup"):
+        url = getUrl(self)
+        bookmarks = findApplicableBookmarks(globalConfig, url, category)
     return bookmarks
 
 def quickJump(self, gesture, category, direction, errorMsg):
@@ -1692,9 +1823,10 @@ def _quickJump(self, gesture, bookmarks, direction, errorMsg):
             if not isMatchInRightDirection(oldSelection, direction, matchInfo):
                 continue
             textInfo = matchInfo
-            utils.speakMessage(message)
-            textInfo.updateCaret()
-            speech.speakTextInfo(textInfo, reason=REASON_CARET)
+            with tracer.span("speak"):
+                utils.speakMessage(message)
+                textInfo.updateCaret()
+                speech.speakTextInfo(textInfo, reason=REASON_CARET)
             textInfo.collapse()
             self._set_selection(textInfo)
             self.selection = textInfo
@@ -1712,9 +1844,90 @@ def isSkipClutterEnabledForThisUnit(unit):
         )
     )
 
+class ClutterMaskEntry:
+    __slots__ = ["startOffset", "endOffset", "skip"]
+
+    def __init__(self, startOffset, endOffset, skip):
+        self.startOffset = startOffset
+        self.endOffset = endOffset
+        self.skip = skip
+
+class ClutterMask:
+    """
+        Remembers which paragraphs or lines of a virtual buffer are clutter for a given set of skip clutter bookmarks.
+        Known clutter runs allow to hop over them without moving textInfos unit by unit.
+        Entries are only valid within a single buffer generation:
+        clutter decisions depend on attributes, roles and neighbouring paragraphs, which can change while text of a unit stays the same,
+        so the whole mask is dropped once the buffer is updated.
+    """
+    maxEntries = 20000
+
+    def __init__(self, bookmarks):
+        self.bookmarks = bookmarks
+        self.generation = None
+        self.byStart = {}
+        self.byEnd = {}
+
+    def estimateSize(self):
+        # Entry objects and two dict slots per entry
+        return 200 * len(self.byStart)
+
+    def clear(self):
+        self.byStart.clear()
+        self.byEnd.clear()
+
+    def shouldSkip(self, textInfo, generation):
+        if generation != self.generation:
+            self.clear()
+            self.generation = generation
+        start, end = textInfo._startOffset, textInfo._endOffset
+        entry = self.byStart.get(start, None)
+        if entry is not None and entry.endOffset == end:
+            return entry.skip
+        skip = shouldSkipClutter(textInfo, self.bookmarks)
+        if len(self.byStart) >= self.maxEntries:
+            self.clear()
+        entry = ClutterMaskEntry(start, end, skip)
+        self.byStart[start] = entry
+        self.byEnd[end] = entry
+        return skip
+
+    def findLastInRun(self, textInfo, direction):
+        """
+            Given a clutter unit, follows adjacent units known to be clutter.
+            Returns startOffset of the farthest one.
+        """
+        entry = self.byStart[textInfo._startOffset]
+        while True:
+            if direction > 0:
+                nextEntry = self.byStart.get(entry.endOffset, None)
+            else:
+                nextEntry = self.byEnd.get(entry.startOffset, None)
+            if nextEntry is None or not nextEntry.skip:
+                return entry.startOffset
+            entry = nextEntry
+
+def getClutterMask(self, unit, bookmarks):
+    if not documentIndex.isIndexable(self):
+        return None
+    masks = registry.get(self, "clutterMasks")
+    if masks is None:
+        masks = {}
+        registry.set(self, "clutterMasks", masks)
+    else:
+        registry.updateSize(self, "clutterMasks")
+    mask = masks.get(unit, None)
+    if mask is None or mask.bookmarks is not bookmarks:
+        mask = ClutterMask(bookmarks)
+        masks[unit] = mask
+    return mask
+
 def caretMovementWithAutoSkip(self, gesture,unit, direction=None,posConstant=textInfos.POSITION_SELECTION, *args, **kwargs):
     url = getUrl(self)
     bookmarks = findApplicableBookmarksOrderedByOffset(globalConfig, url, BookmarkCategory.SKIP_CLUTTER)
+    skipEnabled = isSkipClutterEnabledForThisUnit(unit)
+    mask = getClutterMask(self, unit, bookmarks) if skipEnabled else None
+    generation = documentIndex.getGeneration(self)
     skipped = False
     oldInfo=self.makeTextInfo(posConstant)
     info=oldInfo.copy()
@@ -1730,15 +1943,23 @@ def caretMovementWithAutoSkip(self, gesture,unit, direction=None,posConstant=tex
             break
         expandInfo = info.copy()
         expandInfo.expand(unit)
-        expandText = expandInfo.text
-        if isSkipClutterEnabledForThisUnit(unit) and shouldSkipClutter(expandInfo, bookmarks):
+        if mask is not None:
+            if mask.shouldSkip(expandInfo, generation):
+                skipped = True
+                lastOffset = mask.findLastInRun(expandInfo, direction)
+                if lastOffset != expandInfo._startOffset:
+                    info = documentIndex.makeTextInfoAtOffset(self, lastOffset)
+                continue
+            break
+        if skipEnabled and shouldSkipClutter(expandInfo, bookmarks):
             skipped = True
             continue
         break
     selection = info.copy()
     info.expand(unit)
     infoToSpeak = info
-    speech.speakTextInfo(infoToSpeak, unit=unit, reason=REASON_CARET)
+    with tracer.span("speak"):
+        speech.speakTextInfo(infoToSpeak, unit=unit, reason=REASON_CARET)
     if not oldInfo.isCollapsed:
         speech.speakSelectionChange(oldInfo, selection)
     self.selection = selection
@@ -1757,19 +1978,31 @@ def adjustTextInfoForSpeech(info):
 
 
 def autoClick(self, gesture, category, site=None, automated=False):
-    if site is None:
-        bookmarks = findApplicableBookmarks(globalConfig, getUrl(self), category)
-    else:
-        bookmarks = findApplicableBookmarks(category=category, site=site)
+    with tracer.span("lookup"):
+        if site is None:
+            bookmarks = findApplicableBookmarks(globalConfig, getUrl(self), category)
+        else:
+            bookmarks = findApplicableBookmarks(category=category, site=site)
     return _autoClick(self, gesture, bookmarks, site, automated, category=category)
 
-AutoSpeakTextCache = weakref.WeakKeyDictionary()
-def _autoClick(self, gesture, bookmarks, site=None, automated=False, category=None):
+def iterDocumentParagraphs(self):
+    textInfo = self.makeTextInfo(textInfos.POSITION_ALL)
+    textInfo.collapse()
+    textInfo.expand(textInfos.UNIT_PARAGRAPH)
+    while True:
+        yield textInfo
+        result = moveParagraph(textInfo, 1)
+        if result == 0:
+            return
+
+def _autoClick(self, gesture, bookmarks, site=None, automated=False, category=None, paragraphs=None, clickedIds=None):
     """
         Sorry for confusing name.
         This function handles both quick_click and quick_speak bookmarks.
         But not autospeak bookmarks - these are handled in _autoSpeak.
         Also AutoClick kind of has been deprecated.
+        paragraphs limits the scan to given paragraph textInfos instead of the whole document.
+        If clickedIds set or RecentIds is given, objects with IA2UniqueID in it are not clicked, and newly clicked objects are added to it.
     """
     isSpeak = category == BookmarkCategory.QUICK_SPEAK
     isClick = category.name.startswith("QUICK_CLICK")
@@ -1777,35 +2010,30 @@ def _autoClick(self, gesture, bookmarks, site=None, automated=False, category=No
         raise RuntimeError(f"Invalid category {category.name}")
 
 
-    mylog(f"Autoclick Found {len(bookmarks)} bookmarks")
     if len(bookmarks) == 0:
         return endOfDocument(
             _('No {category} bookmarks configured for current website. Please add {category} bookmarks in BrowserNav settings in NVDA settings window.').format(
                 category=BookmarkCategoryShortNames[category],
             )
         )
-    textInfo = self.makeTextInfo(textInfos.POSITION_ALL)
-    textInfo.collapse()
-    textInfo.expand(textInfos.UNIT_PARAGRAPH)
+    if paragraphs is None:
+        paragraphs = iterDocumentParagraphs(self)
     distance = 0
     message = None
     focusableErrorMsg = None
     focusables = []
     textToSpeak = []
     textToSpeakByBookmark = {}
-    while True:
+    for textInfo in paragraphs:
         matchInfo, thisMessage, __, match = matchAndScript(bookmarks, skipClutterBookmarks=[], textInfo=textInfo)
         if matchInfo is not None:
             thisInfo = matchInfo
             if isClick:
-                mylog(f"Autoclick Match {distance} {thisInfo.text}")
                 focusable = thisInfo.focusableNVDAObjectAtStart
                 if focusable is None or focusable.role in {ROLE_DOCUMENT, ROLE_DIALOG}:
                     if focusableErrorMsg is None:
-                        mylog("Bookmark points to non-focusable NVDA object, cannot click it.")
                         focusableErrorMsg = _("Bookmark points to non-focusable NVDA object, cannot click it.")
                 else:
-                    mylog("Verification skipped since offset is non-zero")
                     focusables.append(focusable)
                     if message is None and thisMessage  is not None and len(thisMessage) > 0:
                         message = thisMessage
@@ -1825,18 +2053,21 @@ def _autoClick(self, gesture, bookmarks, site=None, automated=False, category=No
             else:
                 error_hahaha
         distance += 1
-        result = moveParagraph(textInfo, 1)
-        if result == 0:
-            break
     if isClick:
         numSuccessfulClicks = 0
         for focusable in focusables:
+            uniqueID = getattr(focusable, 'IA2UniqueID', None)
+            if clickedIds is not None and uniqueID is not None and uniqueID in clickedIds:
+                continue
             try:
                 focusable.doAction()
                 numSuccessfulClicks += 1
             except NotImplementedError as e:
                 # Not sure why this is occasionally thrown
                 pass
+            else:
+                if clickedIds is not None and uniqueID is not None:
+                    clickedIds.add(uniqueID)
         if numSuccessfulClicks == 0:
             if not automated:
                 endOfDocument(focusableErrorMsg or _("No bookmarks matched!"))
@@ -1854,12 +2085,9 @@ def _autoClick(self, gesture, bookmarks, site=None, automated=False, category=No
     elif isSpeak:
         if automated:
             return textToSpeakByBookmark
-        mylog(f"  tts1 = {textToSpeak}")
         textToSpeak = [s for s in textToSpeak if s is not None and len(s) > 0]
         if len(textToSpeak) > 0:
-            mylog(f"  tts2 = {textToSpeak}")
             textToSpeak = "\n".join(textToSpeak)
-            mylog(f"  calling speak {textToSpeak}")
             #tones.beep(500, 50)
             def speak():
                 speech.cancelSpeech()
@@ -1874,7 +2102,6 @@ class AutoSpeakState:
     isVirtualBufferUpdated: bool
     isAutoSpeakHandlerRunning: bool
 
-AutoSpeakStates = weakref.WeakKeyDictionary()
 AutoSpeakStatesLock = threading.Lock()
 
 AUTO_SPEAK_TIME_QUANT_MS = 100 # millis
@@ -1889,13 +2116,14 @@ def _autoSpeak(self, gesture, bookmarks, site=None, automated=True, category=Non
         raise RuntimeError(f"Invalid category {category.name}")
     if not (isSpeak and not isClick):
         raise RuntimeError("This function only supports autoSpeak bookmarks")
+    state = registry.get(self, "autoSpeakState")
     try:
         while True:
             with AutoSpeakStatesLock:
-                flag = AutoSpeakStates[self].isVirtualBufferUpdated
+                flag = state.isVirtualBufferUpdated
                 if not flag:
                     return
-                AutoSpeakStates[self].isVirtualBufferUpdated = False
+                state.isVirtualBufferUpdated = False
     
             textInfo = self.makeTextInfo(textInfos.POSITION_ALL)
             textInfo.collapse()
@@ -1920,14 +2148,11 @@ def _autoSpeak(self, gesture, bookmarks, site=None, automated=True, category=Non
                 if matchInfo is not None:
                     thisInfo = matchInfo
                     if isClick:
-                        mylog(f"Autoclick Match {distance} {thisInfo.text}")
                         focusable = thisInfo.focusableNVDAObjectAtStart
                         if focusable is None or focusable.role in {ROLE_DOCUMENT, ROLE_DIALOG}:
                             if focusableErrorMsg is None:
-                                mylog("Bookmark points to non-focusable NVDA object, cannot click it.")
                                 focusableErrorMsg = _("Bookmark points to non-focusable NVDA object, cannot click it.")
                         else:
-                            mylog("Verification skipped since offset is non-zero")
                             focusables.append(focusable)
                             if message is None and thisMessage  is not None and len(thisMessage) > 0:
                                 message = thisMessage
@@ -1958,12 +2183,17 @@ def _autoSpeak(self, gesture, bookmarks, site=None, automated=True, category=Non
                 except KeyError:
                     cachedLines = AutoSpeakCacheEntry([])
                     cacheEntry[bookmark] = cachedLines
-                processAutoSpeakbookmark(self, bookmark, textToSpeak, cachedLines)
+                if cacheEntry.rebaseline:
+                    cachedLines.lines = textToSpeak
+                else:
+                    processAutoSpeakbookmark(self, bookmark, textToSpeak, cachedLines)
+            cacheEntry.rebaseline = False
+            registry.updateSize(self, "autoSpeakCache")
     except Exception as e:
         log.exception("Exception during virtual buffer update processing in BrowserNav QuickJump", e)
     finally:
         with AutoSpeakStatesLock:
-            AutoSpeakStates[self].isAutoSpeakHandlerRunning = False
+            state.isAutoSpeakHandlerRunning = False
 
 
 class HierarchicalLevelsInfo:
@@ -2007,7 +2237,6 @@ class HierarchicalLevelsInfo:
                 return i
         return None
 
-hierarchicalCache = weakref.WeakKeyDictionary()
 def getIndentFunc(textInfo, documentHolder, future):
     try:
         x = utils.getGeckoParagraphIndent(textInfo, documentHolder)
@@ -2020,7 +2249,6 @@ def scanLevelsSync(self, config, bookmarks):
     direction = 1
     try:
         category = BookmarkCategory.HIERARCHICAL
-        mylog(f"sltf bookmarks={len(bookmarks)} url=?")
         if len(bookmarks) == 0:
             future.set([])
             return
@@ -2030,7 +2258,6 @@ def scanLevelsSync(self, config, bookmarks):
         document = utils.getIA2Document(textInfo)
         documentHolder = utils.DocumentHolder(document)
         distance = 0
-        #mylog(f"loop:sltf->matchTextAndAttributes({len(bookmarks)})")
         while True:
             matchInfo, message, xLocation, dummyMatch = matchAndScript(bookmarks, skipClutterBookmarks=[], textInfo=textInfo)
             if matchInfo is not None:
@@ -2057,14 +2284,15 @@ def scanLevelsSync(self, config, bookmarks):
         raise e
 
 def scanLevels(self, bookmarks):
-    global globalConfig, hierarchicalCache
+    global globalConfig
     result = scanLevelsSync(self, globalConfig, bookmarks)
     return result
 
 def hierarchicalQuickJump(self, gesture, category, direction, level, unbounded, errorMsg):
-    url = getUrl(self)
-    hierarchicalBookmarks = findApplicableBookmarks(globalConfig, url, BookmarkCategory.HIERARCHICAL)
-    numericScriptBookmarks = findApplicableBookmarks(globalConfig, url, BookmarkCategory.NUMERIC_SCRIPT)
+    with tracer.span("lookup"):
+        url = getUrl(self)
+        hierarchicalBookmarks = findApplicableBookmarks(globalConfig, url, BookmarkCategory.HIERARCHICAL)
+        numericScriptBookmarks = findApplicableBookmarks(globalConfig, url, BookmarkCategory.NUMERIC_SCRIPT)
     if len(hierarchicalBookmarks) > 0:
         if len(numericScriptBookmarks) > 0:
             ui.message(_("Both hierarchical and numeric script bookmarks are configured for this website. This is not supported; please disable either hierarchical or numeric script bookmarks."))
@@ -2077,26 +2305,18 @@ def hierarchicalQuickJump(self, gesture, category, direction, level, unbounded,
             return endOfDocument(_('No hierarchical quickJump bookmarks or numeric script bookmarks configured for current website. Please add QuickJump bookmarks in BrowserNav settings in NVDA settings window.'))
 
 def _hierarchicalQuickJump(self, gesture, category, direction, level, unbounded, errorMsg):
-    global hierarchicalCache
     oldSelection = self.selection
     url = getUrl(self)
     bookmarks = findApplicableBookmarks(globalConfig, url, category)
-    mylog(f"hqj bookmarks={len(bookmarks)} url={url}")
-    skipClutterBookmarks = findApplicableBookmarks(globalConfig, url, BookmarkCategory.SKIP_CLUTTER)
     if len(bookmarks) == 0:
         return endOfDocument(_('No hierarchical quickJump bookmarks configured for current website. Please add QuickJump bookmarks in BrowserNav settings in NVDA settings window.'))
-    try:
-        levelsInfo = hierarchicalCache[self][globalConfig]
-    except KeyError:
-        levelsInfo = None
+    # Only levels computed for current config are kept
+    cached = registry.get(self, "hierarchicalLevels")
+    if cached is not None and cached[0] is globalConfig:
+        levelsInfo = cached[1]
+    else:
         levelsInfo = scanLevels(self, bookmarks)
-        try:
-            innerDict = hierarchicalCache[self]
-        except KeyError:
-            innerDict = {}
-            hierarchicalCache[self] = innerDict
-        innerDict[globalConfig] = levelsInfo
-    mylog(f"level={level} levelsInfo={levelsInfo.offsets}")
+        registry.set(self, "hierarchicalLevels", (globalConfig, levelsInfo))
     textInfo = self.makeTextInfo(textInfos.POSITION_CARET)
     textInfo.collapse()
     textInfo.expand(textInfos.UNIT_PARAGRAPH)
@@ -2104,18 +2324,13 @@ def _hierarchicalQuickJump(self, gesture, category, direction, level, unbounded,
     documentHolder = utils.DocumentHolder(document)
     distance = 0
     adjustedDistance = 0
-    mylog(f"hqj->loop:matchTextAndAttributes(skipClutter:{len(skipClutterBookmarks)}")
-    mylog(f"hqj->loop:matchTextAndAttributes({len(bookmarks)}")
     while True:
         result = moveParagraph(textInfo, direction)
         if result == 0:
-            #mylog("end of document")
             endOfDocument(errorMsg)
             return
         distance += 1
         adjustedDistance += 1
-        #mylog("hqj->matchTextAndAttributes2")
-        mylog("HQJ calling matchAndScript")
         matchInfo, message, xLocation, dummyMatch = matchAndScript(bookmarks, [], textInfo)
         if matchInfo is not None:
             if not isMatchInRightDirection(oldSelection, direction, matchInfo):
@@ -2127,8 +2342,6 @@ def _hierarchicalQuickJump(self, gesture, category, direction, level, unbounded,
                 offset = xLocation
             else:
                 raise RuntimeError(f"Invalid type of xLocation: {type(xLocation)}")
-            mylog(f"thisInfo={thisInfo.text}")
-            mylog(f"offset={offset}")
             currentLevel = levelsInfo.index(offset)
             if (
                 levelsInfo is None
@@ -2139,7 +2352,6 @@ def _hierarchicalQuickJump(self, gesture, category, direction, level, unbounded,
                     currentLevel == level
                 )
             ):
-                mylog("Perfect")
                 if (
                     level is None
                     and levelsInfo is not None
@@ -2147,10 +2359,11 @@ def _hierarchicalQuickJump(self, gesture, category, direction, level, unbounded,
                 ):
                     announceLevel = levelsInfo.index(offset) + 1
                     ui.message(_("Level {announceLevel}").format(announceLevel=announceLevel))
-                if message is not None and len(message) > 0:
-                    ui.message(message)
-                thisInfo.updateCaret()
-                speech.speakTextInfo(thisInfo, reason=REASON_CARET)
+                with tracer.span("speak"):
+                    if message is not None and len(message) > 0:
+                        ui.message(message)
+                    thisInfo.updateCaret()
+                    speech.speakTextInfo(thisInfo, reason=REASON_CARET)
                 thisInfo.collapse()
                 self._set_selection(thisInfo)
                 self.selection = thisInfo
@@ -2159,17 +2372,15 @@ def _hierarchicalQuickJump(self, gesture, category, direction, level, unbounded,
             #elif offset not in levelsInfo.offsets:
             elif currentLevel is None:
                 # Something must have happened that current level is not recorded in the previous scan. Rescan after this script.
-                mylog("offset not in levelsInfo")
+                tracer.event("Hierarchical levels are out of date, rescanning")
                 scanLevels(self, bookmarks)
                 endOfDocument(_("BrowserNav error: inconsistent indents in the document. Recomputing indents, please try again."))
                 return
             #elif levelsInfo.offsets.index(offset) > level:            
             elif currentLevel > level:
-                #mylog("levelsInfo.offsets.index(offset) > level")
                 continue
             #elif levelsInfo.offsets.index(offset) < level:
             elif currentLevel < level:
-                #mylog("levelsInfo.offsets.index(offset) < level")
                 if unbounded:
                     continue
                 else:
@@ -2251,16 +2462,13 @@ def editOrCreateSite(self, site=None, url=None, domain=None):
     entryDialog=EditSiteDialog(None, knownSites=knownSites, site=site, url=url, domain=domain, config=config)
     if entryDialog.ShowModal()==wx.ID_OK:
         sites = list(config.sites)
-        mylog(f"len(sites) = {len(sites)} index={index}")
         if index is not None:
             sites[index] = entryDialog.site
         else:
             sites.append(entryDialog.site)
-        mylog(f"Afterwards len(sites) = {len(sites)} new name = {entryDialog.site.getDisplayName()}")
         config = config.updateSites(sites)
         globalConfig = config
         saveConfig()
-        mylog(f"Config saved!")
 def makeWebsiteSubmenu(self, frame):
     url = getUrl(self)
     sites = findSites(url, globalConfig)
@@ -2949,6 +3157,95 @@ class EditBookmarkDialog(wx.Dialog):
                 self.newSite = newSite
                 evt.Skip()
 
+class FilteredList:
+    """
+        Model behind a virtual list control with type-to-filter.
+        Lowercase search text of every item is computed once and kept parallel to items,
+        so that filtering doesn't touch the items themselves.
+        List indices refer to visible items, model indices refer to all items.
+    """
+    def __init__(self, items, getSearchText):
+        self.getSearchText = getSearchText
+        self.words = []
+        self.reset(items)
+
+    def reset(self, items):
+        self.items = list(items)
+        self.searchTexts = [self.getSearchText(item).lower() for item in self.items]
+        self.refilter()
+
+    def setFilter(self, text):
+        self.words = text.lower().split()
+        self.refilter()
+
+    def refilter(self):
+        self.visible = [
+            i
+            for i, searchText in enumerate(self.searchTexts)
+            if all(word in searchText for word in self.words)
+        ]
+
+    def __len__(self):
+        return len(self.visible)
+
+    def __getitem__(self, listIndex):
+        return self.items[self.visible[listIndex]]
+
+    def toModelIndex(self, listIndex):
+        return self.visible[listIndex]
+
+    def toListIndex(self, modelIndex):
+        try:
+            return self.visible.index(modelIndex)
+        except ValueError:
+            return -1
+
+    def replace(self, listIndex, item):
+        i = self.visible[listIndex]
+        self.items[i] = item
+        self.searchTexts[i] = self.getSearchText(item).lower()
+
+    def append(self, item):
+        """
+            Returns list index of the new item; filter is cleared if the new item wouldn't be visible otherwise.
+        """
+        self.items.append(item)
+        self.searchTexts.append(self.getSearchText(item).lower())
+        self.refilter()
+        if self.visible[-1:] != [len(self.items) - 1]:
+            self.setFilter("")
+        return len(self.visible) - 1
+
+    def remove(self, listIndex):
+        i = self.visible[listIndex]
+        del self.items[i]
+        del self.searchTexts[i]
+        self.refilter()
+
+    def move(self, listIndex, increment):
+        """
+            Swaps item with its visible neighbour; returns new list index or None.
+        """
+        newListIndex = listIndex + increment
+        if not (0 <= newListIndex < len(self.visible)):
+            return None
+        i, j = self.visible[listIndex], self.visible[newListIndex]
+        self.items[i], self.items[j] = self.items[j], self.items[i]
+        self.searchTexts[i], self.searchTexts[j] = self.searchTexts[j], self.searchTexts[i]
+        return newListIndex
+
+    def sort(self, key):
+        order = sorted(range(len(self.items)), key=lambda i: key(self.items[i]))
+        self.items = [self.items[i] for i in order]
+        self.searchTexts = [self.searchTexts[i] for i in order]
+        self.refilter()
+
+def getBookmarkSearchText(bookmark):
+    return f"{bookmark.getDisplayName()} {bookmark.pattern} {BookmarkCategoryShortNames[bookmark.category]}"
+
+def getSiteSearchText(site):
+    return f"{site.getDisplayName()} {site.domain}"
+
 class BookmarksListDialog(
     gui.dpiScalingHelper.DpiScalingHelperMixinWithoutInit,
     wx.Dialog,
@@ -2957,10 +3254,15 @@ class BookmarksListDialog(
         title=_("Edit bookmarks for %s") % site.getDisplayName()
         super(BookmarksListDialog,self).__init__(parent,title=title)
         self.site = site
-        self.bookmarks = list(site.bookmarks)
+        self.filteredBookmarks = FilteredList(site.bookmarks, getBookmarkSearchText)
         self.config = config
+        # Bookmarks moved to other sites; applied to config at once when dialog is closed
+        self.movedBookmarks = defaultdict(list)
         mainSizer=wx.BoxSizer(wx.VERTICAL)
         sHelper = guiHelper.BoxSizerHelper(self, orientation=wx.VERTICAL)
+      # Filter edit box
+        self.filterTextCtrl = sHelper.addLabeledControl(_("&Filter"), wx.TextCtrl)
+        self.filterTextCtrl.Bind(wx.EVT_TEXT, self.onFilterChange)
       # Bookmarks table
         rulesText = _("&Bookmarks")
         self.rulesList = sHelper.addLabeledControl(
@@ -2977,7 +3279,7 @@ class BookmarksListDialog(
         self.rulesList.InsertColumn(3, _("Category"))
         self.rulesList.InsertColumn(4, _("Enabled"))
         self.rulesList.Bind(wx.EVT_LIST_ITEM_FOCUSED, self.onListItemFocused)
-        self.rulesList.ItemCount = len(self.bookmarks)
+        self.rulesList.ItemCount = len(self.filteredBookmarks)
 
         bHelper = sHelper.addItem(guiHelper.ButtonHelper(orientation=wx.HORIZONTAL))
       # Buttons
@@ -2995,10 +3297,15 @@ class BookmarksListDialog(
         self.sortButton.Bind(wx.EVT_BUTTON, self.OnSortClick)
       # OK/Cancel buttons
         sHelper.addDialogDismissButtons(self.CreateButtonSizer(wx.OK|wx.CANCEL))
+        self.Bind(wx.EVT_BUTTON,self.onOk,id=wx.ID_OK)
         self.rulesList.SetFocus()
 
+    @property
+    def bookmarks(self):
+        return self.filteredBookmarks.items
+
     def getItemTextForList(self, item, column):
-        bookmark = self.bookmarks[item]
+        bookmark = self.filteredBookmarks[item]
         if column == 0:
             return bookmark.getDisplayName()
         elif column == 1:
@@ -3012,11 +3319,22 @@ class BookmarksListDialog(
         else:
             raise ValueError("Unknown column: %d" % column)
 
+    def refreshList(self, index=None):
+        self.rulesList.ItemCount = len(self.filteredBookmarks)
+        self.rulesList.Refresh()
+        if index is not None and 0 <= index < len(self.filteredBookmarks):
+            self.rulesList.Select(index)
+            self.rulesList.Focus(index)
+
+    def onFilterChange(self, evt):
+        self.filteredBookmarks.setFilter(self.filterTextCtrl.GetValue())
+        self.refreshList(0)
+
     def onListItemFocused(self, evt):
         if self.rulesList.GetSelectedItemCount()!=1:
             return
         index=self.rulesList.GetFirstSelected()
-        bookmark = self.bookmarks[index]
+        bookmark = self.filteredBookmarks[index]
 
     def OnAddClick(self,evt):
         entryDialog=EditBookmarkDialog(
@@ -3025,11 +3343,10 @@ class BookmarksListDialog(
             site=self.site,
         )
         if entryDialog.ShowModal()==wx.ID_OK:
-            self.bookmarks.append(entryDialog.bookmark)
-            self.rulesList.ItemCount = len(self.bookmarks)
-            index = self.rulesList.ItemCount - 1
-            self.rulesList.Select(index)
-            self.rulesList.Focus(index)
+            index = self.filteredBookmarks.append(entryDialog.bookmark)
+            if len(self.filterTextCtrl.GetValue()) > 0 and len(self.filteredBookmarks.words) == 0:
+                self.filterTextCtrl.ChangeValue("")
+            self.refreshList(index)
             # We don't get a new focus event with the new index.
             self.rulesList.sendListItemFocusedEvent(index)
             self.rulesList.SetFocus()
@@ -3043,7 +3360,7 @@ class BookmarksListDialog(
             return
         entryDialog=EditBookmarkDialog(
             self,
-            bookmark=self.bookmarks[editIndex],
+            bookmark=self.filteredBookmarks[editIndex],
             config=self.config,
             site=self.site,
             allowSiteSelection=True,
@@ -3051,28 +3368,21 @@ class BookmarksListDialog(
         if entryDialog.ShowModal()==wx.ID_OK:
             if self.site != entryDialog.newSite:
                 # moving to newSite!
-                del self.bookmarks[editIndex]
-                #self.rulesList.DeleteItem(editIndex)
-                self.rulesList.ItemCount = len(self.bookmarks)
-                newSite = entryDialog.newSite
-                bookmarks = list(newSite.bookmarks)
-                bookmarks.append(entryDialog.bookmark)
-                newSite2 = newSite.updateBookmarks(bookmarks)
-                sites = list(self.config.sites)
-                index = sites.index(newSite)
-                sites[index] = newSite2
-                self.config = self.config.updateSites(sites)
+                self.filteredBookmarks.remove(editIndex)
+                self.refreshList()
+                self.movedBookmarks[entryDialog.newSite].append(entryDialog.bookmark)
             else:
-                self.bookmarks[editIndex] = entryDialog.bookmark
+                self.filteredBookmarks.replace(editIndex, entryDialog.bookmark)
+                self.rulesList.RefreshItem(editIndex)
             self.rulesList.SetFocus()
         entryDialog.Destroy()
 
     def OnRemoveClick(self,evt):
         index=self.rulesList.GetFirstSelected()
-        while index>=0:
-            self.rulesList.DeleteItem(index)
-            del self.bookmarks[index]
-            index=self.rulesList.GetNextSelected(index)
+        if index<0:
+            return
+        self.filteredBookmarks.remove(index)
+        self.refreshList(min(index, len(self.filteredBookmarks) - 1))
         self.rulesList.SetFocus()
 
     def OnMoveClick(self,evt, increment):
@@ -3081,21 +3391,24 @@ class BookmarksListDialog(
         index=self.rulesList.GetFirstSelected()
         if index<0:
             return
-        newIndex = index + increment
-        if 0 <= newIndex < len(self.bookmarks):
-            # Swap
-            tmp = self.bookmarks[index]
-            self.bookmarks[index] = self.bookmarks[newIndex]
-            self.bookmarks[newIndex] = tmp
-            self.rulesList.Select(newIndex)
-            self.rulesList.Focus(newIndex)
-        else:
+        newIndex = self.filteredBookmarks.move(index, increment)
+        if newIndex is None:
             return
+        self.refreshList(newIndex)
 
     def OnSortClick(self,evt):
-        self.bookmarks.sort(key=QJSite.getDisplayName)
+        self.filteredBookmarks.sort(key=QJBookmark.getDisplayName)
+        self.refreshList(0)
 
     def onOk(self,evt):
+        if len(self.movedBookmarks) > 0:
+            sites = [
+                site.updateBookmarks(list(site.bookmarks) + self.movedBookmarks[site])
+                if site in self.movedBookmarks
+                else site
+                for site in self.config.sites
+            ]
+            self.config = self.config.updateSites(sites)
         evt.Skip()
 
 class EditSiteDialog(wx.Dialog):
@@ -3274,6 +3587,9 @@ class EditSiteDialog(wx.Dialog):
       # Export button
         self.exportButton = sHelper.addItem (wx.Button (self, label = _("E&xport site and all bookmarks")))
         self.exportButton.Bind(wx.EVT_BUTTON, self.OnExportButtonClick)
+      # Script performance report button
+        self.scriptReportButton = sHelper.addItem (wx.Button (self, label = _("Script &performance report")))
+        self.scriptReportButton.Bind(wx.EVT_BUTTON, self.OnScriptReportClick)
       #  OK/cancel buttons
         sHelper.addDialogDismissButtons(self.CreateButtonSizer(wx.OK|wx.CANCEL))
 
@@ -3358,7 +3674,6 @@ class EditSiteDialog(wx.Dialog):
         return site
 
     def OnEditRulesClick(self,evt):
-        mylog(f"EditSiteDialog.editBookmarks nb={len(self.site.bookmarks)}")
         entryDialog=BookmarksListDialog(
             self,
             site=self.site,
@@ -3367,7 +3682,6 @@ class EditSiteDialog(wx.Dialog):
         if entryDialog.ShowModal()==wx.ID_OK:
             self.site = self.site.updateBookmarks(entryDialog.bookmarks)
             self.config = entryDialog.config
-            mylog(f"EditSiteDialog.editBookmarks2 nb={len(self.site.bookmarks)}")
         entryDialog.Destroy()
 
     def OnEditDescriptionClick(self,evt):
@@ -3378,6 +3692,14 @@ class EditSiteDialog(wx.Dialog):
             self.description = dlg.GetValue()
         dlg.Destroy()
 
+    def OnScriptReportClick(self,evt):
+        title = _("Script performance report")
+        report = scriptProfiler.getReport(self.site.bookmarks)
+        dlg = wx.TextEntryDialog(gui.mainFrame, title, title, style = wx.OK | wx.TE_MULTILINE | wx.TE_READONLY)
+        dlg.SetValue(report)
+        dlg.ShowModal()
+        dlg.Destroy()
+
     def OnExportButtonClick(self,evt):
         site = self.make()
         if site is None:
@@ -3540,6 +3862,121 @@ class OverwriteSiteDialog(wx.Dialog):
         result = super().ShowModal()
         return result
 
+class MergeAction(Enum):
+    NEW = 1
+    OVERWRITE = 2
+    MERGE_BOOKMARKS = 3
+    RENAME = 4
+    SKIP = 5
+
+MergePlanItem = namedtuple("MergePlanItem", ["action", "site", "existingIndex", "name", "error"])
+
+def mergeBookmarks(existingBookmarks, newBookmarks):
+    """
+        Bookmarks are lists of dicts.
+        Bookmarks with matching UUIDs are replaced in place, other new bookmarks are appended.
+    """
+    result = list(existingBookmarks)
+    uuidToIndex = {bookmark['uuid']: i for i, bookmark in enumerate(result)}
+    for bookmark in newBookmarks:
+        i = uuidToIndex.get(bookmark['uuid'], None)
+        if i is None:
+            uuidToIndex[bookmark['uuid']] = len(result)
+            result.append(bookmark)
+        else:
+            result[i] = bookmark
+    return result
+
+def makeUniqueName(name, existingNames):
+    for i in range(2, 10000):
+        newName = f"{name} ({i})"
+        if newName not in existingNames:
+            return newName
+    raise RuntimeError(f"Cannot find a unique name for website {name}")
+
+def computeMergePlan(sites, payloads, conflictAction):
+    """
+        Computes how a batch of website payloads would be merged into sites without modifying anything.
+        sites is a sequence of QJSite, payloads is a sequence of site dicts.
+        conflictAction is applied to every payload having the same name as an existing site
+        or as an earlier payload in the same batch.
+    """
+    nameToIndex = {site.name: i for i, site in enumerate(sites)}
+    # Sites appended by this plan are indexed after existing sites
+    nextIndex = len(sites)
+    plan = []
+    for payload in payloads:
+        name = payload.get('name', "")
+        if len(name) == 0:
+            plan.append(MergePlanItem(MergeAction.SKIP, payload, None, name, _("Website doesn't have a name")))
+            continue
+        if len(payload.get('version', "")) == 0:
+            plan.append(MergePlanItem(MergeAction.SKIP, payload, None, name, _("Website doesn't have a version")))
+            continue
+        existingIndex = nameToIndex.get(name, None)
+        if existingIndex is None:
+            action = MergeAction.NEW
+        else:
+            action = conflictAction
+        if action == MergeAction.RENAME:
+            name = makeUniqueName(name, nameToIndex)
+            existingIndex = None
+        if existingIndex is None and action != MergeAction.SKIP:
+            existingIndex = nextIndex
+            nextIndex += 1
+            nameToIndex[name] = existingIndex
+        plan.append(MergePlanItem(action, payload, existingIndex, name, None))
+    return plan
+
+def applyMergePlan(config, plan):
+    """
+        Applies merge plan to config, rebuilding it only once.
+        Returns new QJConfig.
+    """
+    d = config.asDict()
+    siteDicts = d['sites']
+    for item in plan:
+        if item.action == MergeAction.SKIP:
+            continue
+        siteDict = dict(item.site)
+        siteDict['name'] = item.name
+        if item.existingIndex == len(siteDicts):
+            siteDicts.append(siteDict)
+        elif item.action == MergeAction.MERGE_BOOKMARKS:
+            existing = siteDicts[item.existingIndex]
+            existing['bookmarks'] = mergeBookmarks(existing['bookmarks'], siteDict['bookmarks'])
+        else:
+            siteDicts[item.existingIndex] = siteDict
+    return QJConfig(d)
+
+def describeMergePlan(plan):
+    names = {
+        MergeAction.NEW: _("added"),
+        MergeAction.OVERWRITE: _("overwritten"),
+        MergeAction.MERGE_BOOKMARKS: _("bookmarks merged"),
+        MergeAction.RENAME: _("added under a new name"),
+        MergeAction.SKIP: _("skipped"),
+    }
+    lines = []
+    for item in plan:
+        line = f"{item.name or item.site.get('domain', '')}: {names[item.action]}"
+        if item.error is not None:
+            line += f" ({item.error})"
+        lines.append(line)
+    return lines
+
+def loadWebsitePayloads(fileName):
+    """
+        A file can contain a single exported website, a list of websites, or a whole BrowserNav configuration.
+    """
+    with open(fileName, 'r', encoding='utf-8') as f:
+        j = json.load(f)
+    if isinstance(j, list):
+        return j
+    if 'sites' in j:
+        return j['sites']
+    return [j]
+
 def importImpl(self, sites, site):
     if len(site.name) == 0 or len(site.version) == 0:
         if len(site.name) == 0:
@@ -3578,16 +4015,7 @@ def importImpl(self, sites, site):
         elif result == wx.ID_YES + 1:
             # Only overwrite the bookmarks
             d = existingSite.asDict()
-            existingBookmarks =d['bookmarks']
-            newBookmarks = site.asDict()['bookmarks']
-            for bookmark in newBookmarks:
-                uuid = bookmark['uuid']
-                ii = [i for i, bookmark in enumerate(existingBookmarks) if bookmark['uuid'] == uuid]
-                if len(ii) == 0:
-                    existingBookmarks.append(bookmark)
-                else:
-                    i = ii[0]
-                    existingBookmarks[i] = bookmark
+            d['bookmarks'] = mergeBookmarks(d['bookmarks'], site.asDict()['bookmarks'])
             newSite = QJSite(d)
             sites[existingSiteIndex] = newSite
             return sites
@@ -3622,22 +4050,18 @@ def importImpl(self, sites, site):
                     return None
 
 
-def downloadAllWebsitesFromStore():
-    url = "https://raw.githubusercontent.com/mltony/nvda-browser-nav-bookmark-store/refs/heads/main/output/websites.json"
-    response = requests.get(url)
-    response.raise_for_status()
-    data = json.loads(response.text)
-    return data
+websiteStore = WebsiteStore(os.path.join(globalVars.appArgs.configPath, "browserNavStoreCache.json"))
 
 class WebsiteStoreDialog(
     gui.dpiScalingHelper.DpiScalingHelperMixinWithoutInit,
     wx.Dialog,
 ):
-    def __init__(self, parent, j):
+    def __init__(self, parent, store):
         title=_("Available BrowserNav websites")
         super().__init__(parent,title=title)
-        self.j = j
-        self.sites = list(j['websites'].values())
+        self.store = store
+        self.catalog = None
+        self.entries = []
         mainSizer=wx.BoxSizer(wx.VERTICAL)
         sHelper = guiHelper.BoxSizerHelper(self, orientation=wx.VERTICAL)
       # websites table
@@ -3654,27 +4078,61 @@ class WebsiteStoreDialog(
         self.sitesList.InsertColumn(1, _("Version"))
         self.sitesList.InsertColumn(2, _("URL"))
         self.sitesList.Bind(wx.EVT_LIST_ITEM_FOCUSED, self.onListItemFocused)
-        self.sitesList.ItemCount = len(self.sites)
+        self.sitesList.ItemCount = 0
 
         bHelper = sHelper.addItem(guiHelper.ButtonHelper(orientation=wx.HORIZONTAL))
       # Description edit field
         self.textCtrl = wx.TextCtrl(self, style=wx.TE_MULTILINE|wx.TE_DONTWRAP)
         sHelper.addItem(self.textCtrl)
-        self.textCtrl.SetValue("")
+        self.textCtrl.SetValue(_("Loading BrowserNav bookmark store..."))
 
       # OK/Cancel buttons
         sHelper.addDialogDismissButtons(self.CreateButtonSizer(wx.OK|wx.CANCEL))
         self.Bind(wx.EVT_BUTTON,self.onOk,id=wx.ID_OK)
         self.sitesList.SetFocus()
+        store.fetch(self.onCatalog, self.onError, callAfter=wx.CallAfter)
+
+    def onCatalog(self, catalog):
+        if not self or catalog is self.catalog:
+            # Dialog has been closed, or catalog is unchanged
+            return
+        selectedKey = None
+        if self.sitesList.GetSelectedItemCount() == 1:
+            selectedKey = self.entries[self.sitesList.GetFirstSelected()].key
+        self.catalog = catalog
+        self.entries = catalog.entries
+        self.sitesList.ItemCount = len(self.entries)
+        self.sitesList.Refresh()
+        keys = [entry.key for entry in self.entries]
+        index = keys.index(selectedKey) if selectedKey in keys else 0
+        if len(self.entries) > 0:
+            self.sitesList.Select(index)
+            self.sitesList.Focus(index)
+            self.sitesList.sendListItemFocusedEvent(index)
+        else:
+            self.textCtrl.SetValue("")
+
+    def onError(self, e):
+        if not self:
+            return
+        if self.catalog is not None:
+            log.warning(f"Failed to refresh BrowserNav bookmark store, using cached copy: {e}")
+            return
+        errorMsg = _(
+            "Error retrieving contents of BrowserNav bookmark store: {}.\n"
+            "Please check your Internet connectivity and try again.\n"
+        ).format(str(e))
+        gui.messageBox(errorMsg, _("Bookmark store communication error"), wx.OK|wx.ICON_ERROR, self)
+        self.EndModal(wx.ID_CANCEL)
 
     def getItemTextForList(self, item, column):
-        site = self.sites[item]['website']
+        entry = self.entries[item]
         if column == 0:
-            return site['name']
+            return entry.name
         elif column == 1:
-            return site['version']
+            return entry.version
         elif column == 2:
-            return site['domain']
+            return entry.domain
         else:
             raise ValueError("Unknown column: %d" % column)
 
@@ -3682,14 +4140,13 @@ class WebsiteStoreDialog(
         if self.sitesList.GetSelectedItemCount()!=1:
             return
         index=self.sitesList.GetFirstSelected()
-        site = self.sites[index]['website']
-        self.textCtrl.SetValue(site['description'])
+        self.textCtrl.SetValue(self.entries[index].description)
 
     def onOk(self,evt):
         if self.sitesList.GetSelectedItemCount()!=1:
             return
         index=self.sitesList.GetFirstSelected()
-        self.site = self.sites[index]['website']
+        self.site = self.catalog.getSitePayload(self.entries[index].key)
         evt.Skip()
 
 
@@ -3701,9 +4158,15 @@ class SettingsDialog(SettingsPanel):
 
     def makeSettings(self, settingsSizer):
         global globalConfig
+        # Sites are edited in filteredSites; config is only rebuilt from them when needed, see getConfig()
         self.config = copy.deepcopy(globalConfig)
+        self.filteredSites = FilteredList(self.config.sites, getSiteSearchText)
+        self.sitesChanged = False
 
         sHelper = gui.guiHelper.BoxSizerHelper(self, sizer=settingsSizer)
+      # Filter edit box
+        self.filterTextCtrl = sHelper.addLabeledControl(_("&Filter"), wx.TextCtrl)
+        self.filterTextCtrl.Bind(wx.EVT_TEXT, self.onFilterChange)
       # Sites table
         sitesText = _("&Sites")
         self.sitesList = sHelper.addLabeledControl(
@@ -3718,7 +4181,7 @@ class SettingsDialog(SettingsPanel):
         self.sitesList.InsertColumn(1, _("Domain"))
         self.sitesList.InsertColumn(2, _("Type"))
         self.sitesList.Bind(wx.EVT_LIST_ITEM_FOCUSED, self.onListItemFocused)
-        self.sitesList.ItemCount = len(self.config.sites)
+        self.sitesList.ItemCount = len(self.filteredSites)
 
         bHelper = sHelper.addItem(guiHelper.ButtonHelper(orientation=wx.HORIZONTAL))
       # Buttons
@@ -3744,8 +4207,36 @@ class SettingsDialog(SettingsPanel):
     def postInit(self):
         self.sitesList.SetFocus()
 
+    def getConfig(self):
+        """
+            Applies pending site changes to config, rebuilding it only if sites have changed.
+        """
+        if self.sitesChanged:
+            self.config = self.config.updateSites(self.filteredSites.items)
+            self.sitesChanged = False
+            # Keep site objects identical to those of config, since dialogs look sites up in config
+            self.filteredSites.items = list(self.config.sites)
+        return self.config
+
+    def setConfig(self, config):
+        self.config = config
+        self.sitesChanged = False
+        self.filteredSites.reset(config.sites)
+        self.refreshList()
+
+    def refreshList(self, index=None):
+        self.sitesList.ItemCount = len(self.filteredSites)
+        self.sitesList.Refresh()
+        if index is not None and 0 <= index < len(self.filteredSites):
+            self.sitesList.Select(index)
+            self.sitesList.Focus(index)
+
+    def onFilterChange(self, evt):
+        self.filteredSites.setFilter(self.filterTextCtrl.GetValue())
+        self.refreshList(0)
+
     def getItemTextForList(self, item, column):
-        site = self.config.sites[item]
+        site = self.filteredSites[item]
         if column == 0:
             return site.getDisplayName()
         elif column == 2:
@@ -3759,18 +4250,19 @@ class SettingsDialog(SettingsPanel):
         if self.sitesList.GetSelectedItemCount()!=1:
             return
         index=self.sitesList.GetFirstSelected()
-        site = self.config.sites[index]
+        site = self.filteredSites[index]
 
     def OnAddClick(self,evt):
-        entryDialog=EditSiteDialog(self, knownSites=self.config.sites, config=self.config)
+        config = self.getConfig()
+        entryDialog=EditSiteDialog(self, knownSites=config.sites, config=config)
         if entryDialog.ShowModal()==wx.ID_OK:
-            sites = list(self.config.sites) + [entryDialog.site]
-            self.config = entryDialog.config
-            self.config = self.config.updateSites(sites)
-            self.sitesList.ItemCount = len(self.config.sites)
-            index = self.sitesList.ItemCount - 1
-            self.sitesList.Select(index)
-            self.sitesList.Focus(index)
+            if entryDialog.config is not config:
+                self.setConfig(entryDialog.config)
+            index = self.filteredSites.append(entryDialog.site)
+            self.sitesChanged = True
+            if len(self.filterTextCtrl.GetValue()) > 0 and len(self.filteredSites.words) == 0:
+                self.filterTextCtrl.ChangeValue("")
+            self.refreshList(index)
             # We don't get a new focus event with the new index.
             self.sitesList.sendListItemFocusedEvent(index)
             self.sitesList.SetFocus()
@@ -3782,17 +4274,20 @@ class SettingsDialog(SettingsPanel):
         editIndex=self.sitesList.GetFirstSelected()
         if editIndex<0:
             return
+        config = self.getConfig()
+        modelIndex = self.filteredSites.toModelIndex(editIndex)
         entryDialog=EditSiteDialog(
             self,
-            site=self.config.sites[editIndex],
-            knownSites=self.config.sites[:editIndex] + self.config.sites[editIndex+1:],
-            config=self.config,
+            site=config.sites[modelIndex],
+            knownSites=config.sites[:modelIndex] + config.sites[modelIndex+1:],
+            config=config,
         )
         if entryDialog.ShowModal()==wx.ID_OK:
-            self.config = entryDialog.config
-            sites = list(self.config.sites)
-            sites[editIndex] = entryDialog.site
-            self.config = self.config.updateSites(sites)
+            if entryDialog.config is not config:
+                self.setConfig(entryDialog.config)
+            self.filteredSites.replace(editIndex, entryDialog.site)
+            self.sitesChanged = True
+            self.sitesList.RefreshItem(editIndex)
             self.sitesList.SetFocus()
         entryDialog.Destroy()
 
@@ -3802,27 +4297,28 @@ class SettingsDialog(SettingsPanel):
         editIndex=self.sitesList.GetFirstSelected()
         if editIndex<0:
             return
+        config = self.getConfig()
+        site = config.sites[self.filteredSites.toModelIndex(editIndex)]
         entryDialog=BookmarksListDialog(
             self,
-            site=self.config.sites[editIndex],
-            config=self.config,
+            site=site,
+            config=config,
         )
         if entryDialog.ShowModal()==wx.ID_OK:
-            self.config = entryDialog.config
-            sites = list(self.config.sites)
-            sites[editIndex] = sites[editIndex].updateBookmarks(entryDialog.bookmarks)
-            self.config = self.config.updateSites(sites)
+            if entryDialog.config is not config:
+                self.setConfig(entryDialog.config)
+            self.filteredSites.replace(editIndex, site.updateBookmarks(entryDialog.bookmarks))
+            self.sitesChanged = True
             self.sitesList.SetFocus()
         entryDialog.Destroy()
 
     def OnRemoveClick(self,evt):
-        sites = list(self.config.sites)
         index=self.sitesList.GetFirstSelected()
-        while index>=0:
-            self.sitesList.DeleteItem(index)
-            del sites[index]
-            index=self.sitesList.GetNextSelected(index)
-        self.config = self.config.updateSites(sites)
+        if index<0:
+            return
+        self.filteredSites.remove(index)
+        self.sitesChanged = True
+        self.refreshList(min(index, len(self.filteredSites) - 1))
         self.sitesList.SetFocus()
 
     def OnMoveClick(self,evt, increment):
@@ -3831,39 +4327,35 @@ class SettingsDialog(SettingsPanel):
         index=self.sitesList.GetFirstSelected()
         if index<0:
             return
-        newIndex = index + increment
-        if 0 <= newIndex < len(self.config.sites):
-            sites = list(self.config.sites)
-            # Swap
-            tmp = sites[index]
-            sites[index] = sites[newIndex]
-            sites[newIndex] = tmp
-            self.config = self.config.updateSites(sites)
-            self.sitesList.Select(newIndex)
-            self.sitesList.Focus(newIndex)
-        else:
+        newIndex = self.filteredSites.move(index, increment)
+        if newIndex is None:
             return
+        self.sitesChanged = True
+        self.refreshList(newIndex)
 
     def OnSortClick(self,evt):
-        sites = list(self.config.sites)
-        sites.sort(key=QJSite.getDisplayName)
-        self.config = self.config.updateSites(sites)
+        self.filteredSites.sort(key=QJSite.getDisplayName)
+        self.sitesChanged = True
+        self.refreshList(0)
 
     def OnImportClick(self,evt):
-        sites = list(self.config.sites)
         file_dialog = wx.FileDialog(
             self,
             message="Select a directory and enter a filename",
             defaultDir="C:",
             wildcard="BrowserNav website (*.browsernav-website)|*.browsernav-website",
             #style=wx.FD_OPEN | wx.FD_CREATE_DIR | wx.FD_OVERWRITE_PROMPT
-            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST,
+            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST | wx.FD_MULTIPLE,
         )
-        if file_dialog.ShowModal() == wx.ID_OK:
-            fileName = file_dialog.GetPath()
+        result = file_dialog.ShowModal()
+        fileNames = file_dialog.GetPaths()
+        file_dialog.Destroy()
+        if result != wx.ID_OK:
+            return
+        payloads = []
+        for fileName in fileNames:
             try:
-                j = json.loads(open(fileName, 'r', encoding='utf-8').read())
-                site = QJSite(j)
+                payloads.extend(loadWebsitePayloads(fileName))
             except Exception as e:
                 errorMsg = _("Could not load website from {}: {}").format(
                     fileName,
@@ -3871,34 +4363,77 @@ class SettingsDialog(SettingsPanel):
                 )
                 gui.messageBox(errorMsg, _("Site Entry Error"), wx.OK|wx.ICON_WARNING, self)
                 return
-        file_dialog.Destroy()
-        sites = importImpl(self, sites, site)
-        if sites is not None:
-            self.config = self.config.updateSites(sites)
-            self.sitesList.ItemCount = len(self.config.sites)
-
-    def OnImportFromStoreClick(self,evt):
+        if len(payloads) == 1:
+            try:
+                site = QJSite(payloads[0])
+            except Exception as e:
+                errorMsg = _("Could not load website from {}: {}").format(
+                    fileNames[0],
+                    str(e),
+                )
+                gui.messageBox(errorMsg, _("Site Entry Error"), wx.OK|wx.ICON_WARNING, self)
+                return
+            self.importSite(site)
+            return
+        self.importBatch(payloads)
+
+    def importBatch(self, payloads):
+        config = self.getConfig()
+        plan = computeMergePlan(config.sites, payloads, MergeAction.SKIP)
+        conflicts = [item for item in plan if item.action == MergeAction.SKIP and item.error is None]
+        if len(conflicts) > 0:
+            title = _("BrowserNav website import conflict")
+            message = _(
+                "{} of {} websites to be imported already exist in your BrowserNav configuration:\n"
+                "{}\n"
+                "What would you like to do with all of them?"
+            ).format(
+                len(conflicts),
+                len(payloads),
+                ", ".join(item.name for item in conflicts[:20]) + ("..." if len(conflicts) > 20 else ""),
+            )
+            dialog = OverwriteSiteDialog(parent=self, title=title, message=message)
+            result = dialog.ShowModal()
+            dialog.Destroy()
+            conflictAction = {
+                wx.ID_YES: MergeAction.OVERWRITE,
+                wx.ID_YES + 1: MergeAction.MERGE_BOOKMARKS,
+                wx.ID_YES + 2: MergeAction.RENAME,
+            }.get(result, None)
+            if conflictAction is None:
+                return
+            plan = computeMergePlan(config.sites, payloads, conflictAction)
         try:
-            self.j = downloadAllWebsitesFromStore()
+            newConfig = applyMergePlan(config, plan)
         except Exception as e:
-            errorMsg = _(
-                "Error retrieving contents of BrowserNav bookmark store: {}.\n"
-                "Please check your Internet connectivity and try again.\n"
-            ).format(str(e))
-            gui.messageBox(errorMsg, _("Bookmark store communication error"), wx.OK|wx.ICON_ERROR, self)
+            errorMsg = _("Could not import websites: {}").format(str(e))
+            gui.messageBox(errorMsg, _("Site Entry Error"), wx.OK|wx.ICON_WARNING, self)
             return
-        dialog=WebsiteStoreDialog(self, self.j)
-        if dialog.ShowModal()!=wx.ID_OK:
+        self.setConfig(newConfig)
+        skipped = [item for item in plan if item.action == MergeAction.SKIP]
+        if len(skipped) > 0:
+            errorMsg = _("Some websites could not be imported:\n{}").format("\n".join(describeMergePlan(skipped)))
+            gui.messageBox(errorMsg, _("Site Entry Error"), wx.OK|wx.ICON_WARNING, self)
+
+    def OnImportFromStoreClick(self,evt):
+        dialog=WebsiteStoreDialog(self, websiteStore)
+        result = dialog.ShowModal()
+        payload = getattr(dialog, 'site', None)
+        dialog.Destroy()
+        if result!=wx.ID_OK or payload is None:
             return
-        site = QJSite(dialog.site)
-        sites = list(self.config.sites)
-        sites = importImpl(self, sites, site)
+        site = QJSite(payload)
+        self.importSite(site)
+
+    def importSite(self, site):
+        sites = importImpl(self, list(self.filteredSites.items), site)
         if sites is not None:
-            self.config = self.config.updateSites(sites)
-            self.sitesList.ItemCount = len(self.config.sites)
+            self.filteredSites.reset(sites)
+            self.sitesChanged = True
+            self.refreshList()
 
 
     def onSave(self):
         global globalConfig
-        globalConfig = self.config
+        globalConfig = self.getConfig()
         saveConfig()
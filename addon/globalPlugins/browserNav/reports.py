@@ -0,0 +1,66 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Diagnostic reports shown from BrowserNav popup menu.
+# Each report is produced by its own subsystem; this module only displays them and saves profiler output.
+
+import globalVars
+import gui
+from logHandler import log
+import os
+import time
+import ui
+import wx
+
+from .documentState import registry
+from .tracing import tracer
+from .watchdog import watchdog
+from .sampler import profiler
+
+def showReport(title, lines):
+    report = "\n".join(lines)
+    log.info(f"{title}\n{report}")
+    dlg = wx.TextEntryDialog(gui.mainFrame, title, title, style = wx.OK | wx.TE_MULTILINE | wx.TE_READONLY)
+    dlg.SetValue(report)
+    dlg.ShowModal()
+    dlg.Destroy()
+
+def describeDocument(doc):
+    try:
+        name = doc.rootNVDAObject.name
+    except Exception:
+        name = None
+    return name or repr(doc)
+
+def runMemoryReport():
+    showReport(_("BrowserNav document caches"), registry.getReport(describeDocument))
+
+def runTraceReport():
+    showReport(_("BrowserNav performance trace"), tracer.getReport())
+
+def runLatencyReport():
+    showReport(_("BrowserNav command latency"), watchdog.getReport())
+
+def toggleSamplingProfiler():
+    if not profiler.running:
+        profiler.start()
+        ui.message(_("Sampling profiler started. Run slow BrowserNav commands, then stop the profiler from this menu."))
+        return
+    profiler.stop()
+    if profiler.samples == 0:
+        ui.message(_("Sampling profiler stopped. No samples have been collected."))
+        return
+    fileName = os.path.join(
+        globalVars.appArgs.configPath,
+        time.strftime("browserNavProfile-%Y%m%d-%H%M%S.collapsed"),
+    )
+    try:
+        profiler.save(fileName)
+    except OSError as e:
+        log.error(f"Failed to save BrowserNav profile to {fileName}", exc_info=True)
+        ui.message(_("Failed to save profile: {}").format(e))
+        return
+    log.info(f"BrowserNav profile with {profiler.samples} samples saved to {fileName}")
+    ui.message(_("Sampling profiler stopped. {} samples saved to {}").format(profiler.samples, fileName))
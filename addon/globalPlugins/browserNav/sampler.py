@@ -0,0 +1,117 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Sampling profiler for BrowserNav commands.
+# While started, a background thread periodically samples the stack of the thread running a BrowserNav command
+# or a step of an asynchronous BrowserNav generator; nothing is sampled while NVDA is doing anything else.
+# Samples are aggregated into collapsed stacks, one "frame;frame;frame count" line per stack,
+# the format understood by flamegraph.pl, speedscope and similar tools.
+
+from collections import Counter
+import os
+import sys
+import threading
+import time
+
+from .tracing import NULL_SPAN
+
+class ActiveSection:
+    __slots__ = ["profiler"]
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def __enter__(self):
+        profiler = self.profiler
+        if profiler.depth == 0:
+            profiler.threadId = threading.get_ident()
+            profiler.activeEvent.set()
+        profiler.depth += 1
+        return self
+
+    def __exit__(self, *args):
+        profiler = self.profiler
+        if profiler.depth > 0:
+            # Profiler might have been stopped and reset while this section was running
+            profiler.depth -= 1
+            if profiler.depth == 0:
+                profiler.activeEvent.clear()
+        return False
+
+def formatFrame(frame):
+    code = frame.f_code
+    name = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+    return name.replace(";", "_").replace(" ", "_")
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, maxStacks=100000):
+        self.interval = interval
+        self.maxStacks = maxStacks
+        self.running = False
+        self.depth = 0
+        self.threadId = None
+        self.activeEvent = threading.Event()
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread = None
+
+    def active(self):
+        """
+            Marks a section of BrowserNav code during which the current thread is sampled.
+            Sections are expected to run on NVDA main thread and may be nested.
+        """
+        if not self.running:
+            return NULL_SPAN
+        return ActiveSection(self)
+
+    def start(self):
+        if self.running:
+            return
+        self.stacks = Counter()
+        self.samples = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="BrowserNav sampling profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+            Stops sampling; returns collected stacks.
+        """
+        if not self.running:
+            return self.stacks
+        self.running = False
+        # Wake up the sampling thread so that it can exit
+        self.activeEvent.set()
+        self.thread.join()
+        self.thread = None
+        self.depth = 0
+        self.activeEvent.clear()
+        return self.stacks
+
+    def run(self):
+        while self.running:
+            self.activeEvent.wait()
+            time.sleep(self.interval)
+            if not self.running or self.depth == 0:
+                continue
+            frame = sys._current_frames().get(self.threadId, None)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(formatFrame(frame))
+                frame = frame.f_back
+            del frame
+            stack = ";".join(reversed(names))
+            if stack in self.stacks or len(self.stacks) < self.maxStacks:
+                self.stacks[stack] += 1
+            self.samples += 1
+
+    def save(self, fileName):
+        with open(fileName, "w", encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                print(f"{stack} {count}", file=f)
+
+profiler = SamplingProfiler()
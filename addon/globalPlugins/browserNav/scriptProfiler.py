@@ -0,0 +1,156 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Time budgets and per-bookmark execution statistics for bookmark scripts.
+
+import sys
+import threading
+import time
+from logHandler import log
+
+from .addonConfig import getConfig
+from .paragraph import ScriptError
+
+SCRIPT_FILENAME = "<bookmarkScript>"
+
+class ScriptBudgetExceededError(ScriptError):
+    pass
+
+class BookmarkStats:
+    def __init__(self):
+        self.calls = 0
+        self.totalTime = 0.0
+        self.maxTime = 0.0
+        self.budgetExceeded = 0
+
+# Maps bookmark uuid to BookmarkStats
+stats = {}
+statsLock = threading.Lock()
+
+def record(bookmark, elapsed, budgetExceeded):
+    with statsLock:
+        try:
+            s = stats[bookmark.uuid]
+        except KeyError:
+            s = BookmarkStats()
+            stats[bookmark.uuid] = s
+        s.calls += 1
+        s.totalTime += elapsed
+        s.maxTime = max(s.maxTime, elapsed)
+        if budgetExceeded:
+            s.budgetExceeded += 1
+
+def resetStats(bookmarks):
+    with statsLock:
+        for bookmark in bookmarks:
+            stats.pop(bookmark.uuid, None)
+
+class ScriptBudget:
+    """
+        Context manager that measures execution time of a bookmark script against configured time budget.
+        A script that runs longer than the budget is reported in the log once it finishes.
+        If slow scripts are to be aborted, a trace function is installed while the script runs,
+        so that it can be interrupted on its next line once the budget is exceeded.
+        Python calls trace function on every function call, including calls into NVDA and libraries,
+        so that slows scripts down and is only done when aborting is enabled; even then a single long call into NVDA cannot be interrupted.
+    """
+    def __init__(self, bookmark):
+        self.bookmark = bookmark
+        self.budget = getConfig("scriptTimeBudgetMs") / 1000
+        self.abort = self.budget > 0 and getConfig("abortSlowScripts")
+        self.elapsed = 0.0
+        self.exceeded = False
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        self.end()
+        self.record()
+        return False
+
+    def begin(self):
+        self.start = time.perf_counter()
+        self.deadline = self.start + self.budget
+        if self.abort:
+            self.oldTrace = sys.gettrace()
+            sys.settrace(self.traceCall)
+
+    def end(self):
+        elapsed = time.perf_counter() - self.start
+        if self.abort:
+            sys.settrace(self.oldTrace)
+        self.elapsed += elapsed
+        if elapsed > self.budget > 0 and not self.exceeded:
+            self.exceeded = True
+            log.warning(self.getMessage())
+
+    def record(self):
+        record(self.bookmark, self.elapsed, self.exceeded)
+
+    def timeSteps(self, generator):
+        """
+            Body of a generator script only runs as it is iterated, so every step of the generator is timed against the budget instead.
+            Time between steps, when NVDA is free to do other work, is not counted; statistics are recorded once the generator is done.
+        """
+        try:
+            while True:
+                self.begin()
+                try:
+                    value = next(generator)
+                finally:
+                    self.end()
+                yield value
+        except StopIteration:
+            pass
+        finally:
+            self.record()
+
+    def getMessage(self):
+        return _("Script of bookmark {name} exceeded time budget of {budget} ms.").format(
+            name=self.bookmark.getDisplayName(),
+            budget=int(self.budget * 1000),
+        )
+
+    def traceCall(self, frame, event, arg):
+        if frame.f_code.co_filename != SCRIPT_FILENAME:
+            return None
+        return self.traceLine
+
+    def traceLine(self, frame, event, arg):
+        if event == 'line' and not self.exceeded and time.perf_counter() > self.deadline:
+            self.exceeded = True
+            raise ScriptBudgetExceededError(self.getMessage())
+        return self.traceLine
+
+def getReport(bookmarks):
+    lines = []
+    totalCalls = 0
+    totalTime = 0.0
+    with statsLock:
+        items = [
+            (bookmark, stats[bookmark.uuid])
+            for bookmark in bookmarks
+            if bookmark.uuid in stats
+        ]
+    items.sort(key=lambda item: item[1].totalTime, reverse=True)
+    for bookmark, s in items:
+        totalCalls += s.calls
+        totalTime += s.totalTime
+        lines.append(
+            _("{name}: {calls} calls, total {total:.0f} ms, average {average:.1f} ms, max {max:.0f} ms, over budget {exceeded} times").format(
+                name=bookmark.getDisplayName(),
+                calls=s.calls,
+                total=s.totalTime * 1000,
+                average=s.totalTime * 1000 / s.calls,
+                max=s.maxTime * 1000,
+                exceeded=s.budgetExceeded,
+            )
+        )
+    if len(lines) == 0:
+        return _("No bookmark scripts of this website have been executed yet.")
+    lines.insert(0, _("Total: {calls} calls, {total:.0f} ms").format(calls=totalCalls, total=totalTime * 1000))
+    return "\n".join(lines)
@@ -0,0 +1,215 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Lightweight tracing of BrowserNav commands.
+# A command is a single keypress or automated action; spans are named phases within it, such as bookmark lookup or matching.
+# Spans of a command are aggregated by name rather than recorded one by one,
+# since a single QuickJump can match thousands of paragraphs.
+# Finished commands go into a ring buffer of recent commands and into histograms per command, site and span.
+# When tracing is disabled, command() and span() return a shared no-op context manager.
+
+from collections import OrderedDict, deque
+import threading
+import time
+
+class NullSpan:
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Histogram:
+    """
+        Latency histogram with logarithmic buckets; bucket i holds samples below 0.1 * 2**i milliseconds.
+    """
+    bucketCount = 24
+
+    def __init__(self):
+        self.counts = [0] * self.bucketCount
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed):
+        ms = elapsed * 1000
+        i = min(self.bucketCount - 1, int(ms * 10).bit_length())
+        self.counts[i] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        threshold = self.count * p / 100
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return min(self.max, 0.1 * 2 ** i)
+        return self.max
+
+    def format(self):
+        return (
+            f"n={self.count}"
+            f" p50<={self.percentile(50):.1f}"
+            f" p95<={self.percentile(95):.1f}"
+            f" max={self.max:.1f}"
+            f" mean={self.total / self.count:.1f} ms"
+        )
+
+class CommandRecord:
+    maxEvents = 100
+
+    def __init__(self, tracer, name, site):
+        self.tracer = tracer
+        self.name = name
+        self.site = site
+        self.start = None
+        self.elapsed = None
+        # Span name -> [count, total seconds], in order of first appearance
+        self.spans = {}
+        self.events = []
+
+    def add(self, name, elapsed):
+        try:
+            entry = self.spans[name]
+        except KeyError:
+            entry = [0, 0.0]
+            self.spans[name] = entry
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def __enter__(self):
+        self.tracer.local.record = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.elapsed = time.perf_counter() - self.start
+        self.tracer.local.record = None
+        self.tracer.finish(self)
+        return False
+
+    def format(self):
+        spans = ", ".join(
+            f"{name} {count}x {total * 1000:.1f}" if count > 1 else f"{name} {total * 1000:.1f}"
+            for name, (count, total) in self.spans.items()
+        )
+        result = f"{self.name} @ {self.site}: {self.elapsed * 1000:.1f} ms"
+        if len(spans) > 0:
+            result += f" ({spans})"
+        for event in self.events:
+            result += f"\n    {event}"
+        return result
+
+class Span:
+    __slots__ = ["record", "name", "start"]
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.record.add(self.name, time.perf_counter() - self.start)
+        return False
+
+class Tracer:
+    def __init__(self, ringSize=200, maxHistograms=500):
+        self.enabled = False
+        self.ringSize = ringSize
+        self.maxHistograms = maxHistograms
+        self.lock = threading.Lock()
+        # Current command of each thread
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.recent = deque(maxlen=self.ringSize)
+            # (command, site, span) -> Histogram; span None stands for the whole command
+            self.histograms = OrderedDict()
+
+    def currentRecord(self):
+        return getattr(self.local, 'record', None)
+
+    def command(self, name, site):
+        """
+            Traces a command. Nested commands are traced as spans of the outer one.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        record = self.currentRecord()
+        if record is not None:
+            return Span(record, name)
+        return CommandRecord(self, name, site)
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        record = self.currentRecord()
+        if record is None:
+            return NULL_SPAN
+        return Span(record, name)
+
+    def event(self, message):
+        if not self.enabled:
+            return
+        record = self.currentRecord()
+        if record is not None:
+            if len(record.events) < record.maxEvents:
+                record.events.append(str(message))
+            return
+        with self.lock:
+            self.recent.append(str(message))
+
+    def finish(self, record):
+        with self.lock:
+            self.recent.append(record)
+            self.getHistogram(record.name, record.site, None).add(record.elapsed)
+            for name, (_, total) in record.spans.items():
+                self.getHistogram(record.name, record.site, name).add(total)
+
+    def getHistogram(self, command, site, span):
+        key = (command, site, span)
+        histogram = self.histograms.get(key, None)
+        if histogram is None:
+            histogram = Histogram()
+            self.histograms[key] = histogram
+            while len(self.histograms) > self.maxHistograms:
+                self.histograms.popitem(last=False)
+        return histogram
+
+    def getReport(self, maxRecent=50):
+        lines = []
+        with self.lock:
+            if not self.enabled and len(self.recent) == 0:
+                return [_("Tracing is disabled. Enable it in BrowserNav settings and repeat slow commands.")]
+            commands = [
+                (key, histogram)
+                for key, histogram in self.histograms.items()
+                if key[2] is None
+            ]
+            commands.sort(key=lambda item: -item[1].total)
+            lines.append(_("Commands by total time:"))
+            for (command, site, __), histogram in commands:
+                lines.append(f"{command} @ {site}: {histogram.format()}")
+                for (spanCommand, spanSite, span), spanHistogram in self.histograms.items():
+                    if span is not None and spanCommand == command and spanSite == site:
+                        lines.append(f"    {span}: {spanHistogram.format()}")
+            lines.append("")
+            lines.append(_("Recent commands, latest first:"))
+            for item in list(reversed(self.recent))[:maxRecent]:
+                lines.append(item.format() if isinstance(item, CommandRecord) else item)
+        return lines
+
+tracer = Tracer()
@@ -4,6 +4,7 @@
 #See the file LICENSE  for more details.
 
 from .constants import *
+from .sampler import profiler
 import controlTypes
 import core
 import _ctypes
@@ -76,7 +77,8 @@ def executeAsynchronously(gen):
     if not isinstance(gen, types.GeneratorType):
         raise Exception("Generator function required")
     try:
-        value = gen.__next__()
+        with profiler.active():
+            value = gen.__next__()
     except StopIteration:
         return
     l = lambda gen=gen: executeAsynchronously(gen)
@@ -450,3 +452,7 @@ def getSoundsPath():
     )[0]
     soundsPath = os.path.join(addonPath, "sounds")
     return soundsPath
+
+def wcharLength(s):
+    # Virtual buffer offsets are measured in UTF-16 code units
+    return len(s.encode("utf_16_le")) // 2
@@ -0,0 +1,228 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Latency watchdog for BrowserNav commands.
+# Every command is timed and rolling percentiles are kept per command and site.
+# A background thread watches the running command: once it exceeds the configured threshold,
+# stack of the thread running it is sampled and written to the log, so that slow pages and bookmarks can be diagnosed in the field.
+# Threshold of 0 disables the watchdog altogether, so that commands don't pay for looking up their site.
+
+from collections import OrderedDict, deque
+import sys
+import threading
+import time
+import traceback
+from logHandler import log
+
+from .tracing import NULL_SPAN
+
+def formatMs(seconds):
+    return f"{seconds * 1000:.1f}"
+
+class RollingStats:
+    def __init__(self, windowSize):
+        self.samples = deque(maxlen=windowSize)
+        self.count = 0
+        self.slowCount = 0
+
+    def add(self, elapsed, slow):
+        self.samples.append(elapsed)
+        self.count += 1
+        if slow:
+            self.slowCount += 1
+
+    def percentile(self, p):
+        samples = sorted(self.samples)
+        i = min(len(samples) - 1, int(len(samples) * p / 100))
+        return samples[i]
+
+    def format(self):
+        return (
+            f"n={self.count}"
+            f" slow={self.slowCount}"
+            f" p50={formatMs(self.percentile(50))}"
+            f" p95={formatMs(self.percentile(95))}"
+            f" p99={formatMs(self.percentile(99))} ms"
+        )
+
+class RunningCommand:
+    def __init__(self, watchdog, name, site):
+        self.watchdog = watchdog
+        self.name = name
+        self.site = site
+        self.threadId = threading.get_ident()
+        self.start = None
+        self.samplesTaken = 0
+        self.nextSampleTime = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.watchdog.begin(self)
+        return self
+
+    def __exit__(self, *args):
+        self.watchdog.end(self, time.perf_counter() - self.start)
+        return False
+
+class CommandWatchdog:
+    """
+        Commands are expected to run on one thread at a time, which is NVDA main thread.
+        Threshold is in seconds; 0 disables the watchdog.
+        Stack of a slow command is sampled every threshold seconds, at most maxSamples times.
+        Stacks of the same command on the same site are logged at most once in minLogInterval seconds.
+        Stacks are formatted and logged outside of the lock, so that main thread finishing a command is never blocked by that.
+    """
+    def __init__(self, threshold=0, windowSize=200, maxSamples=3, minLogInterval=60, maxKeys=500):
+        self.threshold = threshold
+        self.windowSize = windowSize
+        self.maxSamples = maxSamples
+        self.minLogInterval = minLogInterval
+        self.maxKeys = maxKeys
+        self.condition = threading.Condition()
+        self.current = None
+        # (command, site) -> RollingStats
+        self.stats = OrderedDict()
+        # (command, site) -> time when its stack was last logged
+        self.lastLogged = {}
+        self.thread = None
+        self.terminated = False
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def setThreshold(self, threshold):
+        self.threshold = threshold
+
+    def command(self, name, site):
+        if not self.enabled:
+            return NULL_SPAN
+        return RunningCommand(self, name, site)
+
+    def begin(self, command):
+        threshold = self.threshold
+        with self.condition:
+            if self.current is not None:
+                # Nested command; outer one is being watched already
+                command.nextSampleTime = None
+                return
+            if threshold > 0:
+                command.nextSampleTime = command.start + threshold
+            self.current = command
+            if threshold > 0:
+                self.ensureThread()
+                self.condition.notify()
+
+    def end(self, command, elapsed):
+        threshold = self.threshold
+        with self.condition:
+            if self.current is command:
+                self.current = None
+            key = (command.name, command.site)
+            stats = self.stats.get(key, None)
+            if stats is None:
+                stats = RollingStats(self.windowSize)
+                self.stats[key] = stats
+                while len(self.stats) > self.maxKeys:
+                    self.stats.popitem(last=False)
+            slow = elapsed > threshold > 0
+            stats.add(elapsed, slow)
+            summary = stats.format()
+        if slow and command.samplesTaken > 0:
+            log.warning(f"BrowserNav command {command.name} on {command.site} took {elapsed * 1000:.0f} ms; {summary}")
+
+    def ensureThread(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="BrowserNav watchdog", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                command = self.waitForSample()
+            if command is None:
+                return
+            self.sample(command)
+
+    def waitForSample(self):
+        """
+            Called under the lock. Waits until running command is due to be sampled and returns it,
+            or returns None once terminated.
+        """
+        while not self.terminated:
+            command = self.current
+            if command is None or command.nextSampleTime is None:
+                self.condition.wait()
+                continue
+            delay = command.nextSampleTime - time.perf_counter()
+            if delay > 0:
+                self.condition.wait(delay)
+                continue
+            if self.scheduleNextSample(command):
+                return command
+        return None
+
+    def scheduleNextSample(self, command):
+        """
+            Called under the lock. Returns False if stack of this command shouldn't be logged, since it has been logged recently.
+        """
+        command.samplesTaken += 1
+        threshold = self.threshold
+        if command.samplesTaken >= self.maxSamples or threshold <= 0:
+            command.nextSampleTime = None
+        else:
+            command.nextSampleTime += threshold
+        key = (command.name, command.site)
+        now = time.monotonic()
+        if command.samplesTaken == 1:
+            lastLogged = self.lastLogged.get(key, None)
+            if lastLogged is not None and now - lastLogged < self.minLogInterval:
+                command.nextSampleTime = None
+                command.samplesTaken = 0
+                return False
+            self.lastLogged[key] = now
+        return True
+
+    def sample(self, command):
+        frame = sys._current_frames().get(command.threadId, None)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame))
+        del frame
+        with self.condition:
+            if self.current is not command:
+                # Command has finished while its stack was being formatted, so this might be a stack of something else
+                return
+        elapsed = time.perf_counter() - command.start
+        log.warning(
+            f"BrowserNav command {command.name} on {command.site} still running after {elapsed * 1000:.0f} ms,"
+            f" stack sample {command.samplesTaken}:\n{stack}"
+        )
+
+    def terminate(self):
+        with self.condition:
+            self.terminated = True
+            self.condition.notify()
+
+    def getReport(self):
+        with self.condition:
+            items = sorted(
+                self.stats.items(),
+                key=lambda item: -item[1].percentile(95),
+            )
+            lines = [
+                f"{name} @ {site}: {stats.format()}"
+                for (name, site), stats in items
+            ]
+        threshold = self.threshold
+        if threshold > 0:
+            lines.insert(0, _("Stacks of commands slower than {} ms are written to NVDA log.").format(int(threshold * 1000)))
+        else:
+            lines.insert(0, _("Latency watchdog is disabled. Set slow command threshold in BrowserNav settings to enable it."))
+        if len(lines) == 1 and threshold > 0:
+            lines.append(_("No BrowserNav commands have been run yet."))
+        return lines
+
+watchdog = CommandWatchdog()
@@ -0,0 +1,159 @@
+#A part of the BrowserNav addon for NVDA
+#Copyright (C) 2017-2022 Tony Malykh
+#This file is covered by the GNU General Public License.
+#See the file LICENSE  for more details.
+
+# Client of BrowserNav bookmark store.
+# Store catalog is cached on disk and revalidated with ETag/If-Modified-Since,
+# so that unchanged catalog is neither downloaded nor parsed again.
+# Catalog may be split into pages: a page links to the next one via optional 'next' URL, relative to the page itself.
+# Only the first page is revalidated; once it changes, all pages are downloaded again.
+# Network and disk access happens on a background thread; results are delivered via callbacks on a thread of caller's choosing.
+# This module doesn't depend on NVDA, so that it can be exercised against a local HTTP server.
+
+from collections import namedtuple
+import json
+import os
+import threading
+from urllib.parse import urljoin
+
+import requests
+
+STORE_URL = "https://raw.githubusercontent.com/mltony/nvda-browser-nav-bookmark-store/refs/heads/main/output/websites.json"
+TIMEOUT_SECONDS = 30
+MAX_PAGES = 100
+
+StoreEntry = namedtuple("StoreEntry", ["key", "name", "version", "domain", "description"])
+
+class StoreCatalog:
+    """
+        Index of websites available in the store.
+        Only fields needed for the list are extracted upfront;
+        full site payload is looked up by key once user selects a website.
+    """
+    def __init__(self, j):
+        self.websites = j['websites']
+        self.entries = []
+        for key, value in self.websites.items():
+            site = value['website']
+            self.entries.append(StoreEntry(
+                key,
+                site.get('name', ''),
+                site.get('version', ''),
+                site.get('domain', ''),
+                site.get('description', ''),
+            ))
+
+    def getSitePayload(self, key):
+        return self.websites[key]['website']
+
+class WebsiteStore:
+    def __init__(self, cacheFileName, url=STORE_URL, timeout=TIMEOUT_SECONDS):
+        self.cacheFileName = cacheFileName
+        self.url = url
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.catalog = None
+        self.etag = None
+        self.lastModified = None
+        self.cacheLoaded = False
+
+    def fetch(self, onCatalog, onError, callAfter=lambda func, *args: func(*args)):
+        """
+            Retrieves store catalog in background.
+            onCatalog(catalog) is called with cached catalog first, if there is one,
+            and again if store returns a newer version.
+            onError(e) is called if the store cannot be reached; caller might still have a cached catalog by then.
+            Both callbacks are dispatched through callAfter, e.g. wx.CallAfter.
+        """
+        def run():
+            try:
+                with self.lock:
+                    if not self.cacheLoaded:
+                        self.cacheLoaded = True
+                        self.loadCache()
+                    if self.catalog is not None:
+                        callAfter(onCatalog, self.catalog)
+                    if self.revalidate():
+                        callAfter(onCatalog, self.catalog)
+            except Exception as e:
+                callAfter(onError, e)
+        threading.Thread(target=run, daemon=True).start()
+
+    def loadCache(self):
+        try:
+            with open(self.cacheFileName, "r", encoding='utf-8') as f:
+                cache = json.load(f)
+            self.catalog = StoreCatalog(cache['catalog'])
+            self.etag = cache.get('etag')
+            self.lastModified = cache.get('lastModified')
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # Corrupted cache will be overwritten by the next download
+            self.catalog = self.etag = self.lastModified = None
+
+    def revalidate(self):
+        """
+            Returns True if a new catalog has been downloaded.
+            Raises ValueError if store returns malformed catalog; previous catalog is kept in that case.
+        """
+        headers = {}
+        if self.catalog is not None:
+            if self.etag is not None:
+                headers['If-None-Match'] = self.etag
+            if self.lastModified is not None:
+                headers['If-Modified-Since'] = self.lastModified
+        response = requests.get(self.url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and self.catalog is not None:
+            return False
+        response.raise_for_status()
+        etag = response.headers.get('ETag')
+        lastModified = response.headers.get('Last-Modified')
+        j = self.parsePage(response)
+        nextUrl = j.pop('next', None)
+        pageUrl = response.url
+        visited = {pageUrl}
+        while nextUrl is not None:
+            pageUrl = urljoin(pageUrl, nextUrl)
+            if pageUrl in visited or len(visited) >= MAX_PAGES:
+                raise ValueError(f"Store catalog has too many pages or a cycle at {pageUrl}")
+            visited.add(pageUrl)
+            response = requests.get(pageUrl, timeout=self.timeout)
+            response.raise_for_status()
+            page = self.parsePage(response)
+            nextUrl = page.get('next')
+            j['websites'].update(page['websites'])
+        self.catalog = StoreCatalog(j)
+        self.etag = etag
+        self.lastModified = lastModified
+        self.saveCache(j)
+        return True
+
+    def parsePage(self, response):
+        j = json.loads(response.text)
+        try:
+            websites = j['websites']
+            nextUrl = j.get('next')
+            for value in websites.values():
+                value['website'].get('name')
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Malformed store catalog page {response.url}") from e
+        if nextUrl is not None and not isinstance(nextUrl, str):
+            raise ValueError(f"Malformed next page link in store catalog page {response.url}")
+        return j
+
+    def saveCache(self, j):
+        cache = {
+            'etag': self.etag,
+            'lastModified': self.lastModified,
+            'catalog': j,
+        }
+        tmpFileName = self.cacheFileName + ".tmp"
+        try:
+            with open(tmpFileName, "w", encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(tmpFileName, self.cacheFileName)
+        except OSError:
+            # Cache is an optimization; store still works without it
+            pass
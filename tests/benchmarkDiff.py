@@ -0,0 +1,45 @@
+# Headless benchmark of AutoSpeak diff strategies on large pages.
+#
+# Usage: python tests/benchmarkDiff.py [lineCount ...]
+
+import random
+import sys
+import time
+
+import headless
+headless.install()
+
+from browserNav.autoSpeakDiff import diffAndExtractInterestingLines
+import diffFuzz
+
+diffStrategies = {
+    "context_diff": diffAndExtractInterestingLines,
+    "opcodes": diffFuzz.diffByOpcodes,
+}
+
+def benchmark(size, repeats=3, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    old = diffFuzz.makeLines(rng, size)
+    scenarios = {
+        "append chat lines": old + diffFuzz.makeLines(rng, 5, prefix="new"),
+        "change one line": old[:size // 2] + ["changed"] + old[size // 2 + 1:],
+        "reorder two lines": old[1:2] + old[:1] + old[2:],
+    }
+    for scenario, new in scenarios.items():
+        for name, strategy in diffStrategies.items():
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                list(strategy(old, new))
+                samples.append(time.perf_counter() - start)
+            lines.append(f"{size} lines, {scenario}, {name}: best={min(samples) * 1000:.2f} max={max(samples) * 1000:.2f} ms")
+    return lines
+
+def main(args):
+    sizes = [int(arg) for arg in args] or [10, 100, 1000, 10000, 100000]
+    for size in sizes:
+        print("\n".join(benchmark(size)))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,81 @@
+# Headless benchmark of BrowserNav document scans.
+# Runs on plain CPython without NVDA: NVDA modules are stubbed and the page is a synthetic virtual buffer.
+# For every document size it compares paragraph-by-paragraph walks, which is what BrowserNav does without document index,
+# against the same searches served from DocumentIndex and DocumentText,
+# reporting latency percentiles together with the number of buffer calls, which are cross-process round trips in NVDA.
+#
+# Usage: python tests/benchmarkHeadless.py [paragraphCount ...]
+
+import random
+import re
+import sys
+import time
+
+import headless
+headless.install()
+
+import controlTypes
+
+from browserNav import documentIndex
+import fakeBuffer
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+def formatMs(x):
+    return f"{x * 1000:.2f}"
+
+def measure(name, buf, func, offsets):
+    samples = []
+    buf.roundTrips = 0
+    for offset in offsets:
+        start = time.perf_counter()
+        func(offset)
+        samples.append(time.perf_counter() - start)
+    return (
+        f"{name}: n={len(samples)}"
+        f" p50={formatMs(percentile(samples, 50))}"
+        f" p95={formatMs(percentile(samples, 95))}"
+        f" max={formatMs(max(samples))} ms"
+        f" calls/op={buf.roundTrips / len(samples):.1f}"
+    )
+
+def naiveFirstMatch(buf, regexp, offset, direction):
+    return next(fakeBuffer.naiveScan(buf, regexp, offset, direction), None)
+
+def indexedFirstMatch(buf, regexp, offset, direction):
+    return next(fakeBuffer.indexedScan(buf, regexp, offset, direction), None)
+
+def benchmark(paragraphCount, queries=50, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    buf = fakeBuffer.makeBuffer(paragraphCount, seed=seed)
+    offsets = [rng.choice(buf.segmentStarts) for _ in range(queries)]
+    start = time.perf_counter()
+    documentIndex.getDocumentIndex(buf)
+    documentIndex.getDocumentText(buf)
+    lines.append(f"{paragraphCount} paragraphs, {buf.endOffset} offsets; index and snapshot built in {(time.perf_counter() - start) * 1000:.1f} ms")
+    roles = [controlTypes.Role.BUTTON]
+    regexp = re.compile(r"comment\s+posted")
+    cases = [
+        ("findByRole", fakeBuffer.naiveFindRole, fakeBuffer.indexedFindRole, (roles,)),
+        ("findFormatChange", fakeBuffer.naiveFindFormatChange, fakeBuffer.indexedFindFormatChange, ()),
+        ("QuickJump scan", naiveFirstMatch, indexedFirstMatch, (regexp,)),
+    ]
+    for name, naive, indexed, args in cases:
+        for direction in [1, -1]:
+            label = f"  {name} {'forward' if direction > 0 else 'backward'}"
+            for strategy, func in [("paragraph walk", naive), ("index", indexed)]:
+                def run(offset, func=func, args=args, direction=direction):
+                    return func(buf, *args, offset, direction)
+                lines.append(measure(f"{label}, {strategy}", buf, run, offsets))
+    return lines
+
+def main(args):
+    sizes = [int(arg) for arg in args] or [1000, 10000, 50000]
+    for size in sizes:
+        print("\n".join(benchmark(size)))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
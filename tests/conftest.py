@@ -0,0 +1,3 @@
+import headless
+
+headless.install()
@@ -0,0 +1,64 @@
+# Random page updates for fuzzing AutoSpeak diff.
+
+import difflib as dl
+
+def diffByOpcodes(s1, s2):
+    # Candidate diff strategy: same classification as context_diff, but without formatting the diff
+    if isinstance(s1, str):
+        s1 = s1.splitlines()
+    if isinstance(s2, str):
+        s2 = s2.splitlines()
+    for tag, i1, i2, j1, j2 in dl.SequenceMatcher(None, s1, s2).get_opcodes():
+        if tag == 'replace':
+            for line in s2[j1:j2]:
+                yield "! " + line
+        elif tag == 'insert':
+            for line in s2[j1:j2]:
+                yield "+ " + line
+        elif tag == 'delete':
+            for line in s1[i1:i2]:
+                yield "- " + line
+
+def makeLines(rng, n, prefix="line"):
+    return [f"{prefix} {i} {rng.randrange(1000000)}" for i in range(n)]
+
+mutationKinds = ["append", "remove", "change", "reorder", "replaceAll", "none"]
+
+def mutate(rng, lines, kind=None):
+    """
+        Applies a random page update to lines.
+        Returns kind of update, new lines and sets of lines that have been added and removed.
+    """
+    lines = list(lines)
+    if kind is None:
+        kind = rng.choice(mutationKinds)
+    added = set()
+    removed = set()
+    if kind == "append":
+        newLines = makeLines(rng, rng.randint(1, 5), prefix="new")
+        lines.extend(newLines)
+        added.update(newLines)
+    elif kind == "remove" and len(lines) > 0:
+        i = rng.randrange(len(lines))
+        j = min(len(lines), i + rng.randint(1, 3))
+        removed.update(lines[i:j])
+        del lines[i:j]
+    elif kind == "change" and len(lines) > 0:
+        i = rng.randrange(len(lines))
+        removed.add(lines[i])
+        lines[i] = lines[i] + " edited"
+        added.add(lines[i])
+    elif kind == "reorder" and len(lines) > 1:
+        i = rng.randrange(len(lines) - 1)
+        lines[i], lines[i + 1] = lines[i + 1], lines[i]
+    elif kind == "replaceAll":
+        # Huge single line change
+        removed.update(lines)
+        lines = ["x" * 100000]
+        added.update(lines)
+    return kind, lines, added, removed
+
+def makeCases(rng, count):
+    for _ in range(count):
+        old = makeLines(rng, rng.randint(0, 50))
+        yield (old,) + mutate(rng, old)
@@ -0,0 +1,330 @@
+# Synthetic virtual buffer for running BrowserNav document code outside of NVDA.
+# Like real virtual buffers, offsets are counted in UTF-16 code units.
+# By default every newline separated line is a paragraph; real virtual buffers break paragraphs on block elements,
+# so that a paragraph can span several lines or end in the middle of one, which can be simulated by giving paragraph starts explicitly.
+# Every call that would be a cross-process round trip in NVDA is counted in roundTrips,
+# so that benchmarks can report how many buffer calls a strategy makes in addition to its timing.
+
+import bisect
+import random
+
+import controlTypes
+import textInfos
+import textInfos.offsets
+import virtualBuffers
+
+def wcharLength(s):
+    return len(s.encode("utf_16_le")) // 2
+
+class Segment:
+    __slots__ = ["start", "end", "text", "controls", "formatField"]
+
+    def __init__(self, start, end, text, controls, formatField):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.controls = controls
+        self.formatField = formatField
+
+class FakeObject:
+    def __init__(self, role):
+        self.role = role
+
+class FakeBuffer(virtualBuffers.VirtualBuffer):
+    """
+        Buffer built from the output of getTextWithFields() for the whole document:
+        strings and controlStart, controlEnd and formatChange field commands.
+        paragraphStarts - offsets where paragraphs start, or None to start a paragraph after every newline.
+    """
+    def __init__(self, fields, paragraphStarts=None):
+        self.fields = fields
+        self.segments = []
+        stack = []
+        formatField = textInfos.FormatField()
+        offset = 0
+        for field in fields:
+            if isinstance(field, str):
+                length = wcharLength(field)
+                if length > 0:
+                    self.segments.append(Segment(offset, offset + length, field, tuple(stack), formatField))
+                    offset += length
+            elif field.command == "controlStart":
+                stack.append(field.field)
+            elif field.command == "controlEnd":
+                stack.pop()
+            elif field.command == "formatChange":
+                formatField = field.field
+        self.text = "".join(segment.text for segment in self.segments)
+        self.encoded = self.text.encode("utf_16_le")
+        self.endOffset = offset
+        self.segmentStarts = [segment.start for segment in self.segments]
+        self.lineStarts = [0]
+        offset = 0
+        for line in self.text.splitlines(keepends=True):
+            offset += wcharLength(line)
+            if offset < self.endOffset:
+                self.lineStarts.append(offset)
+        self.paragraphStarts = sorted(paragraphStarts) if paragraphStarts is not None else self.lineStarts
+        self.caretOffset = 0
+        self.roundTrips = 0
+
+    def makeTextInfo(self, position):
+        if position == textInfos.POSITION_ALL:
+            return FakeTextInfo(self, 0, self.endOffset)
+        if position in [textInfos.POSITION_CARET, textInfos.POSITION_SELECTION]:
+            return FakeTextInfo(self, self.caretOffset, self.caretOffset)
+        if isinstance(position, textInfos.offsets.Offsets):
+            return FakeTextInfo(self, position.startOffset, position.endOffset)
+        raise NotImplementedError(position)
+
+    def getText(self, start, end):
+        return self.encoded[2 * start:2 * end].decode("utf_16_le")
+
+    def getParagraphIndex(self, offset):
+        return bisect.bisect_right(self.paragraphStarts, offset) - 1
+
+    def getParagraphBounds(self, i):
+        start = self.paragraphStarts[i]
+        if i + 1 < len(self.paragraphStarts):
+            return start, self.paragraphStarts[i + 1]
+        return start, self.endOffset
+
+    def getSegmentAt(self, offset):
+        i = bisect.bisect_right(self.segmentStarts, offset) - 1
+        if i < 0 or i >= len(self.segments):
+            return None
+        return self.segments[i]
+
+    def getTextWithFields(self, start, end):
+        fields = []
+        i = max(0, bisect.bisect_right(self.segmentStarts, start) - 1)
+        while i < len(self.segments) and self.segments[i].start < end:
+            segment = self.segments[i]
+            i += 1
+            if segment.end <= start:
+                continue
+            for control in segment.controls:
+                fields.append(textInfos.FieldCommand("controlStart", control))
+            fields.append(textInfos.FieldCommand("formatChange", segment.formatField))
+            fields.append(self.getText(max(start, segment.start), min(end, segment.end)))
+            fields.extend(textInfos.FieldCommand("controlEnd", None) for _ in segment.controls)
+        return fields
+
+class FakeTextInfo(textInfos.offsets.OffsetsTextInfo):
+    def __init__(self, obj, startOffset, endOffset):
+        self.obj = obj
+        self._startOffset = startOffset
+        self._endOffset = endOffset
+
+    def __repr__(self):
+        return f"FakeTextInfo({self._startOffset}, {self._endOffset})"
+
+    @property
+    def text(self):
+        self.obj.roundTrips += 1
+        return self.obj.getText(self._startOffset, self._endOffset)
+
+    def getTextWithFields(self, formatConfig=None):
+        self.obj.roundTrips += 1
+        if self._startOffset == 0 and self._endOffset == self.obj.endOffset:
+            return list(self.obj.fields)
+        return self.obj.getTextWithFields(self._startOffset, self._endOffset)
+
+    @property
+    def NVDAObjectAtStart(self):
+        self.obj.roundTrips += 1
+        segment = self.obj.getSegmentAt(self._startOffset)
+        if segment is None or len(segment.controls) == 0:
+            return None
+        return FakeObject(segment.controls[-1].get('role'))
+
+    def copy(self):
+        return FakeTextInfo(self.obj, self._startOffset, self._endOffset)
+
+    def collapse(self, end=False):
+        if end:
+            self._startOffset = self._endOffset
+        else:
+            self._endOffset = self._startOffset
+
+    def expand(self, unit):
+        if unit == textInfos.UNIT_STORY:
+            self._startOffset, self._endOffset = 0, self.obj.endOffset
+            return
+        if unit != textInfos.UNIT_PARAGRAPH:
+            raise NotImplementedError(unit)
+        self.obj.roundTrips += 1
+        i = self.obj.getParagraphIndex(self._startOffset)
+        self._startOffset, self._endOffset = self.obj.getParagraphBounds(i)
+
+    def move(self, unit, direction, endPoint=None):
+        if unit != textInfos.UNIT_PARAGRAPH or endPoint is not None:
+            raise NotImplementedError(unit)
+        self.obj.roundTrips += 1
+        i = self.obj.getParagraphIndex(self._startOffset) + direction
+        if i < 0 or i >= len(self.obj.paragraphStarts):
+            return 0
+        self._startOffset = self._endOffset = self.obj.paragraphStarts[i]
+        return direction
+
+    def updateCaret(self):
+        self.obj.caretOffset = self._startOffset
+
+words = ["alpha", "beta", "gamma", "delta", "reply", "comment", "posted", "by", "user", "äöü", "日本語", "\U0001F600", "\U0001D11E"]
+roles = [
+    controlTypes.Role.PARAGRAPH,
+    controlTypes.Role.HEADING,
+    controlTypes.Role.LINK,
+    controlTypes.Role.LISTITEM,
+    controlTypes.Role.BUTTON,
+]
+formats = [
+    textInfos.FormatField({"font-family": "Arial", "font-size": "12pt"}),
+    textInfos.FormatField({"font-family": "Arial", "font-size": "12pt", "bold": True}),
+    textInfos.FormatField({"font-family": "Courier", "font-size": "10pt"}),
+]
+
+def makeFields(paragraphCount, seed=0):
+    """
+        Generates getTextWithFields() output of a random document.
+        Every paragraph is a control of random role containing one to three runs of random format;
+        text includes characters outside of BMP, which take two UTF-16 code units each.
+    """
+    rng = random.Random(seed)
+    fields = []
+    uniqueID = 0
+    for _ in range(paragraphCount):
+        uniqueID += 1
+        role = rng.choice(roles) if rng.random() < 0.3 else controlTypes.Role.PARAGRAPH
+        fields.append(textInfos.FieldCommand("controlStart", textInfos.ControlField({
+            'role': role,
+            'uniqueID': uniqueID,
+        })))
+        runs = rng.randint(1, 3)
+        for j in range(runs):
+            fields.append(textInfos.FieldCommand("formatChange", rng.choice(formats) if rng.random() < 0.2 else formats[0]))
+            text = " ".join(rng.choice(words) for k in range(rng.randint(1, 8)))
+            if j == runs - 1:
+                text += "\n"
+            else:
+                text += " "
+            fields.append(text)
+        fields.append(textInfos.FieldCommand("controlEnd", None))
+    return fields
+
+def makeBuffer(paragraphCount, seed=0):
+    return FakeBuffer(makeFields(paragraphCount, seed))
+
+def makeMisalignedBuffer(paragraphCount, seed=0):
+    """
+        Random document whose paragraphs don't coincide with lines:
+        some paragraphs span several lines and some start in the middle of a line, at a boundary between format runs.
+    """
+    rng = random.Random(seed)
+    buf = makeBuffer(paragraphCount, seed)
+    starts = {0}
+    starts.update(offset for offset in buf.lineStarts if rng.random() < 0.6)
+    starts.update(offset for offset in buf.segmentStarts if rng.random() < 0.3)
+    return FakeBuffer(buf.fields, paragraphStarts=starts)
+
+def naiveFindRole(buf, roles, offset, direction):
+    """
+        Reference implementation: walks paragraph by paragraph from the paragraph containing offset
+        and checks role of the innermost control at the start of each, like BrowserNav does without document index.
+        Returns start offset of the first matching paragraph or None.
+    """
+    textInfo = buf.makeTextInfo(textInfos.offsets.Offsets(offset, offset))
+    while True:
+        textInfo.collapse()
+        if textInfo.move(textInfos.UNIT_PARAGRAPH, direction) == 0:
+            return None
+        textInfo.expand(textInfos.UNIT_PARAGRAPH)
+        obj = textInfo.NVDAObjectAtStart
+        if obj is not None and obj.role in roles:
+            return textInfo._startOffset
+
+def naiveFindFormatChange(buf, offset, direction):
+    """
+        Reference implementation: walks paragraph by paragraph and inspects format fields of each,
+        returning (startOffset, endOffset) of the nearest run whose format differs from the one at offset.
+    """
+    from browserNav.documentIndex import getFormatKey
+    originalKey = getFormatKey(buf.getSegmentAt(offset).formatField)
+    textInfo = buf.makeTextInfo(textInfos.offsets.Offsets(offset, offset))
+    textInfo.expand(textInfos.UNIT_PARAGRAPH)
+    while True:
+        if direction > 0:
+            start, end = offset, textInfo._endOffset
+        else:
+            start, end = textInfo._startOffset, offset
+        runs = []
+        runStart = start
+        for field in buf.makeTextInfo(textInfos.offsets.Offsets(start, end)).getTextWithFields():
+            if isinstance(field, textInfos.FieldCommand) and field.command == "formatChange":
+                key = getFormatKey(field.field)
+            elif isinstance(field, str):
+                runEnd = runStart + wcharLength(field)
+                if len(runs) > 0 and runs[-1][2] == key and runs[-1][1] == runStart:
+                    runs[-1] = (runs[-1][0], runEnd, key)
+                else:
+                    runs.append((runStart, runEnd, key))
+                runStart = runEnd
+        if direction < 0:
+            runs.reverse()
+        for runStart, runEnd, key in runs:
+            if key != originalKey:
+                return (runStart, runEnd)
+        textInfo.collapse()
+        if textInfo.move(textInfos.UNIT_PARAGRAPH, direction) == 0:
+            return None
+        textInfo.expand(textInfos.UNIT_PARAGRAPH)
+        offset = textInfo._startOffset if direction > 0 else textInfo._endOffset
+
+def naiveScan(buf, regexp, offset, direction):
+    """
+        Reference implementation of QuickJump scan: yields start offsets of paragraphs matching regexp,
+        starting from the paragraph next to the one containing offset.
+    """
+    textInfo = buf.makeTextInfo(textInfos.offsets.Offsets(offset, offset))
+    while True:
+        textInfo.collapse()
+        if textInfo.move(textInfos.UNIT_PARAGRAPH, direction) == 0:
+            return
+        textInfo.expand(textInfos.UNIT_PARAGRAPH)
+        if regexp.search(textInfo.text) is not None:
+            yield textInfo._startOffset
+
+def indexedFindRole(buf, roles, offset, direction):
+    """
+        Same search using document index, following GlobalPlugin.findByRole and findByIndex.
+    """
+    from browserNav import documentIndex
+    index = documentIndex.getDocumentIndex(buf)
+    textInfo = buf.makeTextInfo(textInfos.offsets.Offsets(offset, offset))
+    textInfo.expand(textInfos.UNIT_PARAGRAPH)
+    while True:
+        offset = index.findRole(roles, textInfo._endOffset if direction > 0 else textInfo._startOffset, direction, innermostOnly=True)
+        if offset is None:
+            return None
+        textInfo = documentIndex.makeTextInfoAtOffset(buf, offset)
+        textInfo.expand(textInfos.UNIT_PARAGRAPH)
+        obj = textInfo.NVDAObjectAtStart
+        if obj is not None and obj.role in roles:
+            return textInfo._startOffset
+
+def indexedFindFormatChange(buf, offset, direction):
+    from browserNav import documentIndex
+    index = documentIndex.getDocumentIndex(buf)
+    return index.findFormatChange(offset, direction, index.getFormatKeyAt(offset))
+
+def indexedScan(buf, regexp, offset, direction):
+    """
+        Same scan using text snapshot, following Paragraph.findAllRegexp.
+    """
+    from browserNav import documentIndex
+    snapshot = documentIndex.getDocumentText(buf)
+    textInfo = buf.makeTextInfo(textInfos.offsets.Offsets(offset, offset))
+    textInfo.expand(textInfos.UNIT_PARAGRAPH)
+    offset = textInfo._endOffset if direction > 0 else textInfo._startOffset
+    for info, _ in documentIndex.iterMatchingParagraphs(buf, snapshot, regexp, offset, direction):
+        yield info._startOffset
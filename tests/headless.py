@@ -0,0 +1,24 @@
+# Runs BrowserNav modules outside of NVDA.
+# NVDA modules are replaced with minimal stubs from the stubs directory,
+# and browserNav package is registered without executing its __init__.py, which needs wx and a running NVDA.
+
+import builtins
+import os
+import sys
+import types
+
+testsDir = os.path.dirname(os.path.abspath(__file__))
+stubsDir = os.path.join(testsDir, "stubs")
+packageDir = os.path.join(os.path.dirname(testsDir), "addon", "globalPlugins", "browserNav")
+
+def install():
+    if stubsDir not in sys.path:
+        sys.path.insert(0, stubsDir)
+    if testsDir not in sys.path:
+        sys.path.insert(0, testsDir)
+    if not hasattr(builtins, "_"):
+        builtins._ = lambda s: s
+    if "browserNav" not in sys.modules:
+        package = types.ModuleType("browserNav")
+        package.__path__ = [packageDir]
+        sys.modules["browserNav"] = package
@@ -0,0 +1,4 @@
+from . import NVDAObject
+
+class IAccessible(NVDAObject):
+    pass
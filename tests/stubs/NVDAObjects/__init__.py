@@ -0,0 +1,2 @@
+class NVDAObject:
+    pass
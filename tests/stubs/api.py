@@ -0,0 +1,10 @@
+# Minimal stand-in for NVDA's api module.
+
+focusObject = None
+currentURL = None
+
+def getFocusObject():
+    return focusObject
+
+def getCurrentURL():
+    return currentURL
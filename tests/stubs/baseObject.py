@@ -0,0 +1,19 @@
+# Minimal stand-in for NVDA's baseObject module.
+# Like in NVDA, every _get_x method of AutoPropertyObject subclasses becomes a getter of x,
+# which is a non-data descriptor, so that an instance attribute of the same name takes precedence over it.
+
+class Getter:
+    def __init__(self, fget):
+        self.fget = fget
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return self.fget(instance)
+
+class AutoPropertyObject:
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, value in list(vars(cls).items()):
+            if name.startswith("_get_"):
+                setattr(cls, name[len("_get_"):], Getter(value))
@@ -0,0 +1,12 @@
+# Minimal stand-in for NVDA's config module.
+
+conf = {
+    "documentFormatting": {},
+    "browsernav": {
+        "documentCacheBudgetMb": 100,
+        "scriptTimeBudgetMs": 2000,
+        "abortSlowScripts": False,
+        "slowCommandThresholdMs": 1000,
+        "tracingEnabled": False,
+    },
+}
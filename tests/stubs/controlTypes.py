@@ -0,0 +1,56 @@
+# Minimal stand-in for NVDA's controlTypes module.
+
+from enum import Enum, IntEnum
+
+class Role(IntEnum):
+    UNKNOWN = 0
+    WINDOW = 1
+    TITLEBAR = 2
+    PANE = 3
+    DIALOG = 4
+    CHECKBOX = 5
+    RADIOBUTTON = 6
+    STATICTEXT = 7
+    EDITABLETEXT = 8
+    BUTTON = 9
+    MENUBAR = 10
+    MENUITEM = 11
+    POPUPMENU = 12
+    COMBOBOX = 13
+    LIST = 14
+    LISTITEM = 15
+    GRAPHIC = 16
+    LINK = 19
+    TREEVIEW = 20
+    TREEVIEWITEM = 21
+    TAB = 22
+    TABCONTROL = 23
+    TABLE = 29
+    TABLECELL = 30
+    TOOLBAR = 35
+    FRAME = 47
+    DOCUMENT = 52
+    HEADING = 54
+    PARAGRAPH = 58
+    SECTION = 86
+    APPLICATION = 87
+    MENU = 92
+    CHECKMENUITEM = 60
+    RADIOMENUITEM = 99
+    TEAROFFMENU = 100
+    MENUBUTTON = 101
+    ARTICLE = 140
+    LANDMARK = 150
+
+class State(IntEnum):
+    FOCUSED = 1
+    SELECTED = 2
+    CHECKED = 4
+    EXPANDED = 8
+    COLLAPSED = 16
+
+class OutputReason(Enum):
+    FOCUS = "focus"
+    CARET = "caret"
+    QUICKNAV = "quickNav"
+    MESSAGE = "message"
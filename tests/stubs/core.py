@@ -0,0 +1,12 @@
+# Minimal stand-in for NVDA's core module.
+# Delayed calls are queued and only run when a test calls runPendingCalls().
+
+pendingCalls = []
+
+def callLater(delay, callable, *args, **kwargs):
+    pendingCalls.append((delay, callable, args, kwargs))
+
+def runPendingCalls():
+    while len(pendingCalls) > 0:
+        delay, callable, args, kwargs = pendingCalls.pop(0)
+        callable(*args, **kwargs)
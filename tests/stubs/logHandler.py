@@ -0,0 +1,5 @@
+# Minimal stand-in for NVDA's logHandler module.
+
+import logging
+
+log = logging.getLogger("nvda")
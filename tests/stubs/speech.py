@@ -0,0 +1,18 @@
+# Minimal stand-in for NVDA's speech module; spoken text is recorded for inspection by tests.
+
+spoken = []
+
+def speakText(text, *args, **kwargs):
+    spoken.append(text)
+
+def speakTextInfo(info, *args, **kwargs):
+    spoken.append(info.text)
+
+def speakSelectionChange(*args, **kwargs):
+    pass
+
+def cancelSpeech():
+    pass
+
+def isBlank(text):
+    return len(text.strip()) == 0
@@ -0,0 +1,36 @@
+# Minimal stand-in for NVDA's textInfos module, enough to run BrowserNav document indexing outside of NVDA.
+
+POSITION_FIRST = "first"
+POSITION_LAST = "last"
+POSITION_CARET = "caret"
+POSITION_SELECTION = "selection"
+POSITION_ALL = "all"
+
+UNIT_CHARACTER = "character"
+UNIT_WORD = "word"
+UNIT_LINE = "line"
+UNIT_PARAGRAPH = "paragraph"
+UNIT_STORY = "story"
+
+class Field(dict):
+    pass
+
+class FormatField(Field):
+    pass
+
+class ControlField(Field):
+    pass
+
+class FieldCommand:
+    def __init__(self, command, field):
+        self.command = command
+        self.field = field
+
+    def __repr__(self):
+        return f"FieldCommand({self.command!r}, {self.field!r})"
+
+class TextInfo:
+    pass
+
+class DocumentWithPageTurns:
+    pass
@@ -0,0 +1,8 @@
+from collections import namedtuple
+
+from . import TextInfo
+
+Offsets = namedtuple("Offsets", ["startOffset", "endOffset"])
+
+class OffsetsTextInfo(TextInfo):
+    pass
@@ -0,0 +1,4 @@
+# Minimal stand-in for NVDA's virtualBuffers package.
+
+class VirtualBuffer:
+    pass
@@ -0,0 +1,4 @@
+from textInfos.offsets import OffsetsTextInfo
+
+class Gecko_ia2_TextInfo(OffsetsTextInfo):
+    pass
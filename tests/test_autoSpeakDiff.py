@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from browserNav.autoSpeakDiff import AutoSpeakMode, diffAndExtractInterestingLines, computeAutoSpeakUpdate
+import diffFuzz
+
+SEED = 0
+cases = list(diffFuzz.makeCases(random.Random(SEED), 300))
+
+def splitOutput(output):
+    spoken = {line[2:] for line in output if line[0] in "!+"}
+    deleted = {line[2:] for line in output if line[0] == "-"}
+    return spoken, deleted
+
+@pytest.mark.parametrize("strategy", [diffAndExtractInterestingLines, diffFuzz.diffByOpcodes])
+def test_diffProperties(strategy):
+    for old, kind, new, added, removed in cases:
+        spoken, deleted = splitOutput(list(strategy(old, new)))
+        context = f"{strategy.__name__} {kind}"
+        # Old text together with reported lines accounts for every line of new text
+        assert set(new).issubset(set(old) | spoken), context
+        assert spoken.issubset(set(new)), context
+        assert deleted.issubset(set(old)), context
+        assert added.issubset(spoken), context
+        if kind == "remove":
+            assert removed.issubset(deleted), context
+        if kind == "append":
+            assert len(deleted) == 0 and spoken == added, context
+        if kind == "none" or old == new:
+            assert len(spoken) == len(deleted) == 0, context
+
+def test_stringsAreSplitIntoLines():
+    assert list(diffAndExtractInterestingLines("a\nb", "a\nb\nc")) == ["+ c"]
+
+def test_paragraphDiffSpeaksNewLines():
+    for old, kind, new, _added, _removed in cases:
+        linesToSpeak, chime = computeAutoSpeakUpdate(AutoSpeakMode.PARAGRAPH_DIFF, old, new)
+        assert not chime
+        assert set(new).issubset(set(old) | set(linesToSpeak)), kind
+        if kind == "append":
+            assert linesToSpeak == new[len(old):]
+        if old == new:
+            assert linesToSpeak == []
+
+@pytest.mark.parametrize("mode, kinds", [
+    (AutoSpeakMode.CHIME_ON_ADD, {"append"}),
+    (AutoSpeakMode.CHIME_ON_REMOVE, {"remove"}),
+    (AutoSpeakMode.CHIME_ON_CHANGE, {"append", "remove", "change", "reorder", "replaceAll"}),
+])
+def test_chime(mode, kinds):
+    for old, kind, new, _added, _removed in cases:
+        linesToSpeak, chime = computeAutoSpeakUpdate(mode, old, new)
+        assert linesToSpeak == []
+        if old == new:
+            assert not chime, kind
+        elif kind in kinds:
+            assert chime, kind
+    # Removing a line is not an addition and vice versa
+    assert not computeAutoSpeakUpdate(AutoSpeakMode.CHIME_ON_ADD, ["a", "b"], ["a"])[1]
+    assert not computeAutoSpeakUpdate(AutoSpeakMode.CHIME_ON_REMOVE, ["a"], ["a", "b"])[1]
+
+@pytest.mark.parametrize("mode", [AutoSpeakMode.OFF, AutoSpeakMode.WORD_DIFF])
+def test_silentModes(mode):
+    assert computeAutoSpeakUpdate(mode, ["a"], ["a", "b"]) == ([], False)
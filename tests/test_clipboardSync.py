@@ -0,0 +1,219 @@
+from browserNav.clipboardSync import ClipboardSync, deleteEntryFromHistory, RETRY_LOCKED_MS
+
+class Timer:
+    def __init__(self, backend, time, func, args):
+        self.backend = backend
+        self.time = time
+        self.func = func
+        self.args = args
+        self.stopped = False
+
+    def Stop(self):
+        self.stopped = True
+
+class FakeBackend:
+    """
+        In-memory clipboard with a manual clock.
+        Clipboard can be locked for a number of reads, like after another process has just written to it.
+    """
+    def __init__(self, text=""):
+        self.text = text
+        self.lockedReads = 0
+        self.reads = 0
+        self.now = 0
+        self.timers = []
+        self.subscribers = []
+        # Clipboard history, newest first
+        self.history = []
+
+    def getText(self):
+        self.reads += 1
+        if self.lockedReads > 0:
+            self.lockedReads -= 1
+            raise OSError("Clipboard is locked")
+        return self.text
+
+    def callLater(self, ms, func, *args):
+        timer = Timer(self, self.now + ms, func, args)
+        self.timers.append(timer)
+        return timer
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def setText(self, text, lockedReads=0):
+        self.text = text
+        self.history.insert(0, text)
+        self.lockedReads = lockedReads
+        for callback in list(self.subscribers):
+            callback()
+
+    def advance(self, ms):
+        self.now += ms
+        while True:
+            due = [timer for timer in self.timers if timer.time <= self.now and not timer.stopped]
+            if len(due) == 0:
+                break
+            timer = min(due, key=lambda timer: timer.time)
+            self.timers.remove(timer)
+            timer.func(*timer.args)
+
+    def getHistoryItems(self, onDone):
+        onDone(list(self.history))
+
+    def getHistoryItemText(self, item, onDone):
+        self.reads += 1
+        onDone(item)
+
+    def deleteHistoryItem(self, item):
+        self.history.remove(item)
+        return True
+
+def waitForChange(sync, oldText, timeoutMs=3000):
+    result = []
+    waiter = sync.waitFor(
+        lambda text: text != oldText,
+        lambda text: result.append(text),
+        lambda: result.append(None),
+        timeoutMs=timeoutMs,
+    )
+    return waiter, result
+
+def test_matchOnUpdate():
+    backend = FakeBackend("old")
+    sync = ClipboardSync(backend)
+    waiter, result = waitForChange(sync, "old")
+    assert result == []
+    assert backend.subscribers == [sync.onClipboardUpdate]
+    backend.setText("new")
+    assert result == ["new"]
+    assert backend.subscribers == []
+    # Timeout timer has been stopped, so nothing fires later
+    backend.advance(10000)
+    assert result == ["new"]
+
+def test_clipboardIsNotPolled():
+    backend = FakeBackend("old")
+    sync = ClipboardSync(backend)
+    waiter, result = waitForChange(sync, "old")
+    backend.advance(1000)
+    assert backend.reads == 1
+
+def test_staleReadsDoNotMatch():
+    # Clipboard updates that still leave the old text, e.g. another format being added, keep waiting
+    backend = FakeBackend("old")
+    sync = ClipboardSync(backend)
+    waiter, result = waitForChange(sync, "old")
+    backend.setText("old")
+    backend.setText("old")
+    assert result == []
+    backend.setText("new")
+    assert result == ["new"]
+
+def test_alreadyChanged():
+    backend = FakeBackend("new")
+    sync = ClipboardSync(backend)
+    waiter, result = waitForChange(sync, "old")
+    assert result == ["new"]
+    assert backend.subscribers == []
+
+def test_retryWhenLocked():
+    backend = FakeBackend("old")
+    sync = ClipboardSync(backend)
+    waiter, result = waitForChange(sync, "old")
+    backend.setText("new", lockedReads=2)
+    assert result == []
+    backend.advance(RETRY_LOCKED_MS)
+    assert result == []
+    backend.advance(RETRY_LOCKED_MS)
+    assert result == ["new"]
+
+def test_singleRetryTimerForRepeatedUpdates():
+    backend = FakeBackend("old")
+    sync = ClipboardSync(backend)
+    waiter, result = waitForChange(sync, "old")
+    backend.setText("new", lockedReads=100)
+    backend.setText("new", lockedReads=100)
+    pending = [timer for timer in backend.timers if not timer.stopped and timer.func == sync.onClipboardUpdate]
+    assert len(pending) == 1
+    backend.lockedReads = 0
+    backend.advance(RETRY_LOCKED_MS)
+    assert result == ["new"]
+
+def test_timeout():
+    backend = FakeBackend("old")
+    sync = ClipboardSync(backend)
+    waiter, result = waitForChange(sync, "old", timeoutMs=500)
+    backend.advance(499)
+    assert result == []
+    backend.advance(1)
+    assert result == [None]
+    assert backend.subscribers == []
+    # Late update is ignored
+    backend.setText("new")
+    assert result == [None]
+
+def test_timeoutWhileLockedStopsRetrying():
+    backend = FakeBackend("old")
+    sync = ClipboardSync(backend)
+    waiter, result = waitForChange(sync, "old", timeoutMs=50)
+    backend.setText("new", lockedReads=1000)
+    backend.advance(50)
+    assert result == [None]
+    reads = backend.reads
+    backend.advance(1000)
+    assert backend.reads == reads
+
+def test_cancel():
+    backend = FakeBackend("old")
+    sync = ClipboardSync(backend)
+    waiter, result = waitForChange(sync, "old")
+    waiter.cancel()
+    backend.setText("new")
+    backend.advance(10000)
+    assert result == []
+    assert backend.subscribers == []
+
+def test_multipleWaiters():
+    backend = FakeBackend("a")
+    sync = ClipboardSync(backend)
+    w1, r1 = waitForChange(sync, "a")
+    w2 = sync.waitFor(lambda text: text == "c", lambda text: r1.append("w2 " + text))
+    backend.setText("b")
+    assert r1 == ["b"]
+    assert w1.done and not w2.done
+    assert backend.subscribers == [sync.onClipboardUpdate]
+    backend.setText("c")
+    assert r1 == ["b", "w2 c"]
+    assert w2.done
+    assert backend.subscribers == []
+
+def test_restoreClipboardHistory():
+    # Temporary text put on the clipboard is removed from history, leaving the original entries in place
+    backend = FakeBackend()
+    backend.setText("original")
+    backend.setText("temporary")
+    result = []
+    deleteEntryFromHistory(backend, "temporary", onDone=result.append)
+    assert result == [True]
+    assert backend.history == ["original"]
+
+def test_restoreClipboardHistoryOnlyChecksRecentEntries():
+    backend = FakeBackend()
+    for text in ["temporary", "a", "b", "c"]:
+        backend.setText(text)
+    result = []
+    deleteEntryFromHistory(backend, "temporary", maxEntries=2, onDone=result.append)
+    assert result == [False]
+    assert backend.reads == 2
+    assert "temporary" in backend.history
+
+def test_restoreClipboardHistoryUnavailable():
+    backend = FakeBackend()
+    backend.getHistoryItems = lambda onDone: onDone(None)
+    result = []
+    deleteEntryFromHistory(backend, "temporary", onDone=result.append)
+    assert result == [False]
@@ -0,0 +1,141 @@
+import random
+import re
+
+import pytest
+
+import controlTypes
+import textInfos
+
+from browserNav import documentIndex
+import fakeBuffer
+
+@pytest.fixture(scope="module")
+def buf():
+    return fakeBuffer.makeBuffer(300, seed=1)
+
+@pytest.fixture(scope="module", params=["lines", "misaligned"])
+def anyBuf(request):
+    # Real virtual buffers don't guarantee that paragraphs coincide with newline separated lines
+    if request.param == "lines":
+        return fakeBuffer.makeBuffer(300, seed=1)
+    return fakeBuffer.makeMisalignedBuffer(300, seed=1)
+
+def sampleOffsets(buf, count=60, seed=2):
+    # Offsets in the middle of a surrogate pair never occur in NVDA, so only segment boundaries are sampled
+    rng = random.Random(seed)
+    return [0, buf.endOffset - 1] + rng.sample(buf.segmentStarts, count)
+
+def test_fakeBufferCountsUtf16():
+    buf = fakeBuffer.FakeBuffer(["a\U0001F600b\n", "c\n"])
+    assert buf.endOffset == 7
+    assert buf.paragraphStarts == [0, 5]
+    assert buf.getText(1, 3) == "\U0001F600"
+
+def test_documentTextOffsets(buf):
+    snapshot = documentIndex.DocumentText(buf)
+    assert len(snapshot.lineStarts) == len(buf.lineStarts)
+    for i, start in enumerate(snapshot.lineStarts):
+        assert snapshot.toOffset(start) == buf.lineStarts[i]
+        assert snapshot.toIndex(buf.lineStarts[i]) == start
+
+def test_misalignedParagraphs():
+    # Paragraph boundaries in the middle of a line and a paragraph spanning two lines
+    buf = fakeBuffer.FakeBuffer(["one ", "two\n", "three\n", "four\n"], paragraphStarts=[0, 4, 13])
+    snapshot = documentIndex.DocumentText(buf)
+    assert list(snapshot.lineStarts) == [0, 8, 14]
+    infos = list(documentIndex.iterParagraphsInRange(buf, 0, buf.endOffset, 1))
+    assert [info.text for info in infos] == ["one ", "two\nthree", "\nfour\n"]
+    infos = list(documentIndex.iterParagraphsInRange(buf, 3, 9, -1))
+    assert [info.text for info in infos] == ["two\nthree", "one "]
+    matches = documentIndex.iterMatchingParagraphs(buf, snapshot, re.compile(r"^two$", re.MULTILINE), 0, 1)
+    assert [text for info, text in matches] == ["two\nthree"]
+    matches = documentIndex.iterMatchingParagraphs(buf, snapshot, re.compile(r"\Atwo"), 0, 1)
+    assert [text for info, text in matches] == ["two\nthree"]
+    matches = documentIndex.iterMatchingParagraphs(buf, snapshot, re.compile(r"o\s+t"), buf.endOffset, -1)
+    assert [text for info, text in matches] == ["two\nthree"]
+
+def test_findText(buf):
+    snapshot = documentIndex.DocumentText(buf)
+    for needle in ["reply", "\U0001F600 beta", "日本語"]:
+        offset = 0
+        while True:
+            result = snapshot.findText(needle, offset)
+            if result is None:
+                break
+            start, end = result
+            assert buf.getText(start, end).lower() == needle.lower()
+            offset = end
+
+@pytest.mark.parametrize("direction", [1, -1])
+@pytest.mark.parametrize("role", [controlTypes.Role.HEADING, controlTypes.Role.LINK, controlTypes.Role.BUTTON])
+def test_findRole(buf, role, direction):
+    for offset in sampleOffsets(buf):
+        expected = fakeBuffer.naiveFindRole(buf, [role], offset, direction)
+        assert fakeBuffer.indexedFindRole(buf, [role], offset, direction) == expected
+
+@pytest.mark.parametrize("direction", [1, -1])
+def test_findFormatChange(buf, direction):
+    # Index returns the whole format run, which might extend beyond the paragraph where naive search found it,
+    # so only the near end of the run is compared
+    near = 0 if direction > 0 else 1
+    for offset in sampleOffsets(buf):
+        expected = fakeBuffer.naiveFindFormatChange(buf, offset, direction)
+        result = fakeBuffer.indexedFindFormatChange(buf, offset, direction)
+        if expected is None:
+            assert result is None
+        else:
+            assert result[near] == expected[near]
+
+@pytest.mark.parametrize("direction", [1, -1])
+@pytest.mark.parametrize("pattern", [
+    r"reply", r"^alpha", r"\U0001F600$", r"gamma\s+delta", r"\Abeta", r"\bby\b", r"^user\s*$", r"beta(?= gamma)", r"(?i)ALPHA",
+    r"posted\nby", r"\d",
+])
+def test_quickJumpScan(anyBuf, pattern, direction):
+    regexp = re.compile(pattern)
+    for offset in sampleOffsets(anyBuf, count=20):
+        expected = list(fakeBuffer.naiveScan(anyBuf, regexp, offset, direction))
+        assert list(fakeBuffer.indexedScan(anyBuf, regexp, offset, direction)) == expected
+
+def test_indexRebuiltOnUpdate(buf):
+    index = documentIndex.getDocumentIndex(buf)
+    assert documentIndex.getDocumentIndex(buf) is index
+    documentIndex.onVirtualBufferUpdate(buf)
+    assert documentIndex.getDocumentIndex(buf) is not index
+
+def makePage(items):
+    # Every item is (role, uniqueID, text) of a paragraph
+    fields = []
+    for role, uniqueID, text in items:
+        fields.append(textInfos.FieldCommand("controlStart", textInfos.ControlField({'role': role, 'uniqueID': uniqueID})))
+        fields.append(text + "\n")
+        fields.append(textInfos.FieldCommand("controlEnd", None))
+    return fakeBuffer.FakeBuffer(fields)
+
+def autoClickPass(buf, regexp, clickedIds):
+    # Follows asyncAutoclick: candidate paragraphs are verified and objects already clicked are skipped
+    snapshot = documentIndex.getDocumentText(buf)
+    clicked = []
+    for info in documentIndex.iterCandidateParagraphs(buf, snapshot, [regexp]):
+        if regexp.search(info.text) is None:
+            continue
+        uniqueID = buf.getSegmentAt(info._startOffset).controls[-1]['uniqueID']
+        if uniqueID not in clickedIds:
+            clickedIds.add(uniqueID)
+            clicked.append(uniqueID)
+    return clicked
+
+def test_autoClickFindsNewElementWithSameText():
+    Role = controlTypes.Role
+    regexp = re.compile(r"^Show more replies$")
+    clickedIds = set()
+    page = [
+        (Role.PARAGRAPH, 1, "First comment"),
+        (Role.BUTTON, 2, "Show more replies"),
+        (Role.PARAGRAPH, 3, "Second comment"),
+    ]
+    assert autoClickPass(makePage(page), regexp, clickedIds) == [2]
+    # Replies loaded by the first button contain another button with identical text, inserted before the old one
+    page[1:1] = [(Role.PARAGRAPH, 4, "Reply"), (Role.BUTTON, 5, "Show more replies")]
+    assert autoClickPass(makePage(page), regexp, clickedIds) == [5]
+    assert autoClickPass(makePage(page), regexp, clickedIds) == []
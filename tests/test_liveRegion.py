@@ -0,0 +1,106 @@
+from browserNav.liveRegion import LiveRegionThrottler, maxPoliteness
+
+class FakeClock:
+    """
+        Manual clock in seconds together with a schedule(delayMs, func) that runs func once the clock gets there.
+    """
+    def __init__(self):
+        self.now = 0.0
+        self.scheduled = []
+
+    def __call__(self):
+        return self.now
+
+    def schedule(self, delayMs, func):
+        self.scheduled.append((self.now + delayMs / 1000, func))
+
+    def advance(self, seconds):
+        self.now += seconds
+        while True:
+            due = [item for item in self.scheduled if item[0] <= self.now]
+            if len(due) == 0:
+                break
+            item = min(due, key=lambda item: item[0])
+            self.scheduled.remove(item)
+            item[1]()
+
+def makeThrottler(minInterval=1.0, dedupWindow=5.0, maxPending=10):
+    clock = FakeClock()
+    spoken = []
+    throttler = LiveRegionThrottler(
+        emit=lambda text, politeness: spoken.append((text, politeness)),
+        schedule=clock.schedule,
+        minInterval=minInterval,
+        dedupWindow=dedupWindow,
+        maxPending=maxPending,
+        clock=clock,
+    )
+    return throttler, clock, spoken
+
+def test_firstUpdateIsSpokenRightAway():
+    throttler, clock, spoken = makeThrottler()
+    assert throttler.submit("hello", "polite")
+    assert spoken == [("hello", "polite")]
+    assert clock.scheduled == []
+
+def test_duplicatesAreSuppressed():
+    throttler, clock, spoken = makeThrottler()
+    assert throttler.submit("typing", "polite")
+    clock.advance(2)
+    assert not throttler.submit("typing", "polite")
+    clock.advance(2)
+    # Every duplicate refreshes the window, so text repeated more often than dedupWindow is never spoken again
+    assert not throttler.submit("typing", "polite")
+    assert spoken == [("typing", "polite")]
+    assert clock.scheduled == []
+
+def test_duplicateIsSpokenAgainAfterWindowExpires():
+    throttler, clock, spoken = makeThrottler()
+    throttler.submit("new message", "polite")
+    clock.advance(5)
+    assert throttler.submit("new message", "polite")
+    assert spoken == [("new message", "polite")] * 2
+
+def test_burstIsCoalescedIntoOneAnnouncement():
+    throttler, clock, spoken = makeThrottler()
+    throttler.submit("one", "polite")
+    clock.advance(0.1)
+    for text, politeness in [("two", "polite"), ("three", "assertive"), ("four", "polite")]:
+        assert throttler.submit(text, politeness)
+        clock.advance(0.1)
+    assert spoken == [("one", "polite")]
+    assert len(clock.scheduled) == 1
+    clock.advance(0.6)
+    # Politeness of the coalesced announcement is the highest among its updates
+    assert spoken == [("one", "polite"), ("two\nthree\nfour", "assertive")]
+
+def test_burstKeepsOnlyLatestUpdates():
+    throttler, clock, spoken = makeThrottler(maxPending=2)
+    throttler.submit("0", "polite")
+    for i in range(1, 6):
+        throttler.submit(str(i), "polite")
+    clock.advance(1)
+    assert spoken == [("0", "polite"), ("4\n5", "polite")]
+
+def test_updateAfterIntervalExpiresIsSpokenRightAway():
+    throttler, clock, spoken = makeThrottler()
+    throttler.submit("one", "polite")
+    clock.advance(0.5)
+    throttler.submit("two", "polite")
+    clock.advance(0.5)
+    assert spoken == [("one", "polite"), ("two", "polite")]
+    # Interval now counts from the coalesced announcement
+    clock.advance(0.5)
+    throttler.submit("three", "polite")
+    assert spoken[-1] == ("two", "polite")
+    clock.advance(0.5)
+    assert spoken[-1] == ("three", "polite")
+    clock.advance(1)
+    throttler.submit("four", "polite")
+    assert spoken[-1] == ("four", "polite")
+    assert clock.scheduled == []
+
+def test_maxPoliteness():
+    assert maxPoliteness("polite", "assertive") == "assertive"
+    assert maxPoliteness("assertive", "off") == "assertive"
+    assert maxPoliteness("unknown", "polite") == "unknown"
@@ -0,0 +1,66 @@
+import sys
+import types
+
+import pytest
+
+# Paragraph only needs quickJump for attribute extraction, which is not exercised here; real quickJump needs wx.
+sys.modules.setdefault("browserNav.quickJump", types.ModuleType("browserNav.quickJump"))
+
+from browserNav import documentIndex
+from browserNav.paragraph import NotFoundError, Paragraph
+import fakeBuffer
+
+@pytest.fixture(scope="module")
+def buf():
+    return fakeBuffer.makeMisalignedBuffer(100, seed=3)
+
+def paragraphAt(buf, offset):
+    return Paragraph(documentIndex.makeTextInfoAtOffset(buf, offset))
+
+def bounds(p):
+    return p.textInfo._startOffset, p.textInfo._endOffset
+
+def walk(p, direction, limit=None):
+    # Reference: repeated p.next or p.previous
+    result = []
+    while limit is None or len(result) < limit:
+        try:
+            p = p.move(direction)
+        except NotFoundError:
+            return result
+        result.append((bounds(p), p.textInfo.text))
+    return result
+
+@pytest.mark.parametrize("direction", [1, -1])
+def test_iterMatchesRepeatedMove(buf, direction):
+    for offset in [0, buf.paragraphStarts[7], buf.paragraphStarts[40] + 1, buf.endOffset - 1]:
+        p = paragraphAt(buf, offset)
+        iterate = p.iterForward if direction > 0 else p.iterBackward
+        assert [(bounds(q), q.text) for q in iterate()] == walk(p, direction)
+        assert [(bounds(q), q.text) for q in iterate(limit=5)] == walk(p, direction, limit=5)
+
+def test_iterFromHomeAndEnd(buf):
+    expected = [bounds(paragraphAt(buf, start)) for start in buf.paragraphStarts[:3]]
+    assert [bounds(q) for q in paragraphAt(buf, 0).home.iterForward(limit=3)] == expected
+    assert list(paragraphAt(buf, 0).home.iterBackward()) == []
+    end = paragraphAt(buf, 0).end
+    assert [(bounds(q), q.text) for q in end.iterBackward(limit=2)] == walk(end, -1, limit=2)
+
+def test_iterCreatesTextInfoOnlyWhenAsked(buf):
+    p = paragraphAt(buf, 0)
+    buf.roundTrips = 0
+    paragraphs = list(p.iterForward(limit=10, predicate=lambda q: "reply" in q.text))
+    # One move and one expand per paragraph stepped over; text comes from the snapshot
+    assert buf.roundTrips == 2 * 10
+    assert all("textInfo" not in vars(q) for q in paragraphs)
+    for q in paragraphs:
+        assert q.textInfo.text == q.text
+
+@pytest.mark.parametrize("reverse", [False, True])
+def test_findAllRegexpMatchesWalk(buf, reverse):
+    direction = -1 if reverse else 1
+    for offset in [0, buf.paragraphStarts[30], buf.endOffset - 1]:
+        p = paragraphAt(buf, offset)
+        expected = [item for item in walk(p, direction) if "by" in item[1].split()]
+        result = [(bounds(q), q.text) for q in p.findAllRegexp(r"\bby\b", caseSensitive=True, reverse=reverse)]
+        assert result == expected
@@ -0,0 +1,79 @@
+import sys
+import types
+
+import pytest
+
+# scriptProfiler imports paragraph, which imports quickJump; real quickJump needs wx.
+sys.modules.setdefault("browserNav.quickJump", types.ModuleType("browserNav.quickJump"))
+
+import config
+
+from browserNav import scriptProfiler
+
+SCRIPT = compile("""
+def spin(seconds):
+    import time
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+def steps(seconds, count):
+    for i in range(count):
+        spin(seconds)
+        yield i
+""", scriptProfiler.SCRIPT_FILENAME, "exec")
+scriptGlobals = {}
+exec(SCRIPT, scriptGlobals)
+spin = scriptGlobals["spin"]
+steps = scriptGlobals["steps"]
+
+class Bookmark:
+    def __init__(self, uuid):
+        self.uuid = uuid
+
+    def getDisplayName(self):
+        return self.uuid
+
+@pytest.fixture
+def budget(monkeypatch):
+    def setBudget(ms, abort=False):
+        monkeypatch.setitem(config.conf["browsernav"], "scriptTimeBudgetMs", ms)
+        monkeypatch.setitem(config.conf["browsernav"], "abortSlowScripts", abort)
+    return setBudget
+
+def test_slowScriptIsReportedWithoutTracing(budget):
+    budget(20)
+    bookmark = Bookmark("slow")
+    with scriptProfiler.ScriptBudget(bookmark):
+        assert sys.gettrace() is None
+        spin(0.05)
+    stats = scriptProfiler.stats["slow"]
+    assert stats.calls == 1 and stats.budgetExceeded == 1
+
+def test_slowScriptIsAborted(budget):
+    budget(20, abort=True)
+    bookmark = Bookmark("aborted")
+    oldTrace = sys.gettrace()
+    with pytest.raises(scriptProfiler.ScriptBudgetExceededError):
+        with scriptProfiler.ScriptBudget(bookmark):
+            spin(1)
+    assert sys.gettrace() is oldTrace
+    assert scriptProfiler.stats["aborted"].budgetExceeded == 1
+
+def test_generatorStepsAreTimed(budget):
+    budget(20)
+    bookmark = Bookmark("generator")
+    scriptBudget = scriptProfiler.ScriptBudget(bookmark)
+    generator = scriptBudget.timeSteps(steps(0.01, 3))
+    assert list(generator) == [0, 1, 2]
+    stats = scriptProfiler.stats["generator"]
+    # Every step fits into the budget, though all of them together don't
+    assert stats.calls == 1 and stats.budgetExceeded == 0
+    assert stats.totalTime >= 0.03
+
+def test_slowGeneratorStepIsAborted(budget):
+    budget(20, abort=True)
+    generator = scriptProfiler.ScriptBudget(Bookmark("slowStep")).timeSteps(steps(1, 3))
+    with pytest.raises(scriptProfiler.ScriptBudgetExceededError):
+        next(generator)
+    assert scriptProfiler.stats["slowStep"].budgetExceeded == 1
@@ -0,0 +1,55 @@
+import threading
+import time
+
+from browserNav import watchdog as watchdogModule
+from browserNav.watchdog import CommandWatchdog
+from browserNav.tracing import NULL_SPAN
+
+class Log:
+    def __init__(self):
+        self.warnings = []
+
+    def warning(self, message):
+        self.warnings.append(message)
+
+def makeWatchdog(monkeypatch, threshold):
+    log = Log()
+    monkeypatch.setattr(watchdogModule, "log", log)
+    watchdog = CommandWatchdog(threshold=threshold, minLogInterval=0)
+    return watchdog, log
+
+def test_disabled(monkeypatch):
+    watchdog, log = makeWatchdog(monkeypatch, 0)
+    assert not watchdog.enabled
+    assert watchdog.command("script", "site") is NULL_SPAN
+    assert watchdog.thread is None
+
+def test_slowCommandIsSampled(monkeypatch):
+    watchdog, log = makeWatchdog(monkeypatch, 0.02)
+    with watchdog.command("script", "site"):
+        time.sleep(0.2)
+    watchdog.terminate()
+    assert any("still running" in message and "test_slowCommandIsSampled" in message for message in log.warnings)
+    assert "took" in log.warnings[-1]
+    assert "script @ site: n=1 slow=1" in "\n".join(watchdog.getReport())
+
+def test_endIsNotBlockedByStackFormatting(monkeypatch):
+    watchdog, log = makeWatchdog(monkeypatch, 0.02)
+    formatting = threading.Event()
+    release = threading.Event()
+    formatStack = watchdogModule.traceback.format_stack
+    def slowFormatStack(frame):
+        formatting.set()
+        release.wait(5)
+        return formatStack(frame)
+    monkeypatch.setattr(watchdogModule.traceback, "format_stack", slowFormatStack)
+    command = watchdog.command("script", "site")
+    with command:
+        assert formatting.wait(5)
+        start = time.perf_counter()
+    # Command has ended while its stack was still being formatted on the watchdog thread
+    assert time.perf_counter() - start < 1
+    release.set()
+    watchdog.terminate()
+    watchdog.thread.join(5)
+    assert not any("still running" in message for message in log.warnings)
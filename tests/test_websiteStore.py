@@ -0,0 +1,188 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+import requests
+
+from browserNav.websiteStore import WebsiteStore
+
+def makePage(*names, next=None):
+    page = {
+        'websites': {
+            name: {'website': {'name': name, 'version': '1', 'domain': f"{name}.com", 'description': ''}}
+            for name in names
+        },
+    }
+    if next is not None:
+        page['next'] = next
+    return page
+
+class StoreServer:
+    """
+        Local HTTP server serving store pages from a dict of path -> body.
+        Pages are served with ETag and honour If-None-Match; path listed in slowPaths sleeps before responding.
+    """
+    def __init__(self):
+        self.pages = {}
+        self.etags = {}
+        self.slowPaths = set()
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get('If-None-Match')))
+                if self.path in server.slowPaths:
+                    time.sleep(0.5)
+                body = server.pages.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                etag = server.etags.get(self.path)
+                if etag is not None and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                if etag is not None:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+    def setPage(self, path, page, etag=None):
+        self.pages[path] = page if isinstance(page, str) else json.dumps(page)
+        if etag is not None:
+            self.etags[path] = etag
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def server():
+    server = StoreServer()
+    yield server
+    server.close()
+
+@pytest.fixture
+def cacheFileName(tmp_path):
+    return str(tmp_path / "storeCache.json")
+
+def names(store):
+    return sorted(entry.name for entry in store.catalog.entries)
+
+def test_download(server, cacheFileName):
+    server.setPage("/websites.json", makePage("a", "b"))
+    store = WebsiteStore(cacheFileName, url=server.url("/websites.json"))
+    assert store.revalidate()
+    assert names(store) == ["a", "b"]
+    assert store.catalog.getSitePayload("a")['domain'] == "a.com"
+
+def test_paging(server, cacheFileName):
+    server.setPage("/websites.json", makePage("a", next="pages/2.json"), etag='"v1"')
+    server.setPage("/pages/2.json", makePage("b", next="3.json"))
+    server.setPage("/pages/3.json", makePage("c"))
+    store = WebsiteStore(cacheFileName, url=server.url("/websites.json"))
+    assert store.revalidate()
+    assert names(store) == ["a", "b", "c"]
+    assert [path for path, etag in server.requests] == ["/websites.json", "/pages/2.json", "/pages/3.json"]
+    # Merged catalog is cached as a single page
+    cached = WebsiteStore(cacheFileName, url=server.url("/websites.json"))
+    cached.loadCache()
+    assert names(cached) == ["a", "b", "c"]
+
+def test_pagingCycle(server, cacheFileName):
+    server.setPage("/websites.json", makePage("a", next="2.json"))
+    server.setPage("/2.json", makePage("b", next="websites.json"))
+    store = WebsiteStore(cacheFileName, url=server.url("/websites.json"))
+    with pytest.raises(ValueError):
+        store.revalidate()
+    assert store.catalog is None
+
+def test_etagRevalidation(server, cacheFileName):
+    server.setPage("/websites.json", makePage("a", next="2.json"), etag='"v1"')
+    server.setPage("/2.json", makePage("b"))
+    store = WebsiteStore(cacheFileName, url=server.url("/websites.json"))
+    assert store.revalidate()
+    server.requests.clear()
+    # Unchanged catalog is neither downloaded nor parsed again, and other pages are not requested
+    assert not store.revalidate()
+    assert server.requests == [("/websites.json", '"v1"')]
+    assert names(store) == ["a", "b"]
+    # Fresh store instance revalidates cached catalog with stored ETag
+    server.requests.clear()
+    restarted = WebsiteStore(cacheFileName, url=server.url("/websites.json"))
+    restarted.loadCache()
+    assert not restarted.revalidate()
+    assert server.requests == [("/websites.json", '"v1"')]
+    # Changed catalog is downloaded again
+    server.setPage("/websites.json", makePage("c"), etag='"v2"')
+    assert restarted.revalidate()
+    assert names(restarted) == ["c"]
+    assert restarted.etag == '"v2"'
+
+def test_timeout(server, cacheFileName):
+    server.setPage("/websites.json", makePage("a"))
+    server.slowPaths.add("/websites.json")
+    store = WebsiteStore(cacheFileName, url=server.url("/websites.json"), timeout=0.1)
+    with pytest.raises(requests.Timeout):
+        store.revalidate()
+
+@pytest.mark.parametrize("body", [
+    "{not json",
+    "[]",
+    json.dumps({'sites': {}}),
+    json.dumps({'websites': {'a': {'site': {}}}}),
+    json.dumps({'websites': {}, 'next': 5}),
+])
+def test_malformedCatalog(server, cacheFileName, body):
+    server.setPage("/websites.json", makePage("a"), etag='"v1"')
+    store = WebsiteStore(cacheFileName, url=server.url("/websites.json"))
+    assert store.revalidate()
+    server.setPage("/websites.json", body, etag='"v2"')
+    with pytest.raises(ValueError):
+        store.revalidate()
+    # Previous catalog and its validators are kept
+    assert names(store) == ["a"]
+    assert store.etag == '"v1"'
+
+def test_fetchDeliversCachedCatalogThenError(server, cacheFileName):
+    server.setPage("/websites.json", makePage("a"), etag='"v1"')
+    WebsiteStore(cacheFileName, url=server.url("/websites.json")).revalidate()
+    server.setPage("/websites.json", "{not json", etag='"v2"')
+    store = WebsiteStore(cacheFileName, url=server.url("/websites.json"))
+    catalogs = []
+    errors = []
+    done = threading.Event()
+    store.fetch(catalogs.append, lambda e: (errors.append(e), done.set()))
+    assert done.wait(5)
+    assert [sorted(entry.name for entry in catalog.entries) for catalog in catalogs] == [["a"]]
+    assert isinstance(errors[0], ValueError)
+
+def test_corruptedCache(server, cacheFileName):
+    with open(cacheFileName, "w") as f:
+        f.write("{corrupted")
+    server.setPage("/websites.json", makePage("a"))
+    store = WebsiteStore(cacheFileName, url=server.url("/websites.json"))
+    store.loadCache()
+    assert store.catalog is None
+    assert store.revalidate()
+    assert names(store) == ["a"]